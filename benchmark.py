@@ -0,0 +1,381 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import warnings
+import numpy as np
+
+from joblib import Parallel, delayed
+from truss import Truss
+from genetics import Genome
+from geometry import GeometryStatus
+from stiffness import StiffnessSolver
+from evolver import Evolver
+from workers import WorkerPool, get_default_worker_count
+
+
+def make_bridge_truss(panel_count, panel_width=3.5, height=3.0):
+    """
+    Returns a statically determinate Warren truss with {panel_count} panels,
+    pinned at the left end, on a roller at the right end and loaded at every deck node.
+    It has 2 * panel_count + 1 nodes and 4 * panel_count - 1 members.
+    """
+    deck_nodes = [
+        Truss.Node(
+            i * panel_width,
+            0,
+            support_type=(
+                Truss.Node.SupportTypes.FIXED
+                if i == 0
+                else Truss.Node.SupportTypes.ROLLER_HORIZONTAL
+                if i == panel_count
+                else Truss.Node.SupportTypes.NONE
+            ),
+            applied_force=Truss.Node.Force(0, -17500 / 2),
+        )
+        for i in range(panel_count + 1)
+    ]
+    top_nodes = [Truss.Node((i + 0.5) * panel_width, height) for i in range(panel_count)]
+
+    members = [Truss.Member(deck_nodes[i], deck_nodes[i + 1]) for i in range(panel_count)]
+    members += [Truss.Member(top_nodes[i], top_nodes[i + 1]) for i in range(panel_count - 1)]
+    for i in range(panel_count):
+        members.append(Truss.Member(deck_nodes[i], top_nodes[i]))
+        members.append(Truss.Member(top_nodes[i], deck_nodes[i + 1]))
+
+    return Truss(deck_nodes + top_nodes, members)
+
+
+def make_grown_genome(added_nodes):
+    """Returns a default genome that has grown by {added_nodes} removable nodes, as new_node_chance would."""
+    genome = Genome()
+    for __ in range(added_nodes):
+        node_a, node_b = random.sample(range(genome.node_count()), k=2)
+        genome.add_node(20 * (random.random() - 0.5), 20 * (random.random() - 0.5), node_a, node_b)
+
+    return genome
+
+
+def time_repeated(function, repeats, min_time=0.0):
+    """Calls {function} at least {repeats} times and for at least {min_time} seconds, returns timing stats in seconds."""
+    timings = []
+    start = time.perf_counter()
+
+    while len(timings) < repeats or time.perf_counter() - start < min_time:
+        call_start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - call_start)
+
+    return {
+        "calls": len(timings),
+        "mean_s": statistics.fmean(timings),
+        "median_s": statistics.median(timings),
+        "min_s": min(timings),
+    }
+
+
+def geometry_fitnesses(genomes, geometry_checker):
+    """
+    Returns unsolvable_fitness for the genomes {geometry_checker} rejects and NaN for the others, which are left
+    to solve, counting rejections in Genome.geometry_rejection_count as evaluate_population does.
+    """
+    fitnesses = np.full(len(genomes), np.nan)
+    if geometry_checker is None:
+        return fitnesses
+
+    for genome_index, genome in enumerate(genomes):
+        if geometry_checker.check(genome.positions, genome.members) != GeometryStatus.VALID:
+            fitnesses[genome_index] = Genome.unsolvable_fitness
+    Genome.geometry_rejection_count += int(np.sum(fitnesses == Genome.unsolvable_fitness))
+
+    return fitnesses
+
+
+class SerialBackend:
+    """
+    Evaluates one genome at a time through Genome.get_assignment_fitness_gentle instead of one batched solve.
+    It goes through Genome.fitness_cache and always pre-screens like that path, so it gets the same fitnesses
+    as the batched backend and the comparison measures batching alone. It is not the uncached scalar
+    Truss.get_assignment_cost loop main.py ran before batching, whose fitnesses differ for near-singular trusses.
+    """
+
+    def evaluate(self, genomes, prescreen=False, load_cases=None, solver=None, geometry_checker=None):
+        # The scalar path always pre-screens, see Genome.get_assignment_result
+        fitnesses = geometry_fitnesses(genomes, geometry_checker)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for genome_index in np.flatnonzero(np.isnan(fitnesses)):
+                fitnesses[genome_index] = genomes[genome_index].get_assignment_fitness_gentle(load_cases, solver)
+
+        return fitnesses
+
+    def mutate(self, genomes, rng=None, **mutation_parameters):
+        if rng is not None:
+            return Genome.mutate_population(genomes, rng, **mutation_parameters)
+
+        return [genome.create_mutation(**mutation_parameters) for genome in genomes]
+
+
+class JoblibBackend:
+    """Dispatches one genome per joblib task, like main.py before the worker pool."""
+
+    def __init__(self, n_jobs):
+        self.n_jobs = n_jobs
+
+    def evaluate(self, genomes, prescreen=False, load_cases=None, solver=None, geometry_checker=None):
+        fitnesses = geometry_fitnesses(genomes, geometry_checker)
+        solved_indices = np.flatnonzero(np.isnan(fitnesses))
+        fitnesses[solved_indices] = Parallel(n_jobs=self.n_jobs)(
+            delayed(Genome.get_assignment_fitness_gentle)(genomes[genome_index], load_cases, solver)
+            for genome_index in solved_indices
+        )
+
+        return fitnesses
+
+    def mutate(self, genomes, rng=None, **mutation_parameters):
+        # One task per genome has no stream to give every task, so the numpy Generator is ignored
+        return Parallel(n_jobs=self.n_jobs)(
+            delayed(Genome.create_mutation)(genome, **mutation_parameters) for genome in genomes
+        )
+
+
+def benchmark_solve(panel_counts, repeats, min_time):
+    results = []
+
+    for panel_count in panel_counts:
+        truss = make_bridge_truss(panel_count)
+        result = {"nodes": len(truss.nodes), "members": len(truss.members)}
+
+        result["solve"] = time_repeated(truss.solve, repeats, min_time)
+        result["get_assignment_cost"] = time_repeated(truss.get_assignment_cost, repeats, min_time)
+
+        # The same truss 100 times over, as a population sharing one topology
+        batch = [truss] * 100
+        batch_timing = time_repeated(lambda: Truss.get_assignment_cost_batch(batch), repeats, min_time)
+        result["get_assignment_cost_batch_per_truss"] = {
+            name: value / len(batch) if name != "calls" else value for name, value in batch_timing.items()
+        }
+
+        # Several load cases, solved one at a time or against one factorization
+        positions, members, support_types, applied_forces, distributed_forces = truss.to_arrays()
+        load_cases = Truss.LoadCase.moving_load(range(panel_count + 1), Truss.Node.Force(0, -17500))
+        load_case_applied_forces, load_case_distributed_forces = Truss.LoadCase.stack(
+            load_cases, applied_forces, distributed_forces
+        )
+        result["load_cases"] = len(load_cases)
+        result["solve_arrays_per_load_case"] = time_repeated(
+            lambda: [
+                Truss.solve_arrays(
+                    positions[None],
+                    members[None],
+                    support_types,
+                    load_case_applied_forces[None, case_index],
+                    load_case_distributed_forces[None, case_index],
+                )
+                for case_index in range(len(load_cases))
+            ],
+            repeats,
+            min_time,
+        )
+        result["solve_arrays_all_load_cases"] = time_repeated(
+            lambda: Truss.solve_arrays(
+                positions[None],
+                members[None],
+                support_types,
+                load_case_applied_forces[None],
+                load_case_distributed_forces[None],
+            ),
+            repeats,
+            min_time,
+        )
+
+        # Re-solving after one node moved, with and without updating the previous factorization
+        __, __, factorization = Truss.solve_with_factorization(
+            positions, members, support_types, applied_forces, distributed_forces
+        )
+        moved_positions = positions.copy()
+        moved_positions[-1] += 0.1
+
+        result["solve_with_factorization_full"] = time_repeated(
+            lambda: Truss.solve_with_factorization(
+                moved_positions, members, support_types, applied_forces, distributed_forces
+            ),
+            repeats,
+            min_time,
+        )
+        result["solve_with_factorization_update"] = time_repeated(
+            lambda: Truss.solve_with_factorization(
+                moved_positions, members, support_types, applied_forces, distributed_forces, factorization
+            ),
+            repeats,
+            min_time,
+        )
+
+        results.append(result)
+
+    return results
+
+
+def benchmark_stiffness(panel_counts, repeats, min_time):
+    """Times the sparse stiffness method against the dense method of joints, which is skipped past 128 panels."""
+    results = []
+    solver = StiffnessSolver()
+
+    for panel_count in panel_counts:
+        truss = make_bridge_truss(panel_count)
+        arrays = [array[None] for array in truss.to_arrays()]
+        arrays[2] = arrays[2][0]
+
+        result = {"nodes": len(truss.nodes), "members": len(truss.members)}
+        result["stiffness_solve_arrays"] = time_repeated(lambda: solver.solve_arrays(*arrays), repeats, min_time)
+        if panel_count <= 128:
+            result["joints_solve_arrays"] = time_repeated(lambda: Truss.solve_arrays(*arrays), repeats, min_time)
+
+        results.append(result)
+
+    return results
+
+
+def benchmark_mutation(added_node_counts, repeats, min_time, seed):
+    results = []
+    topology_mutation_parameters = {
+        **Evolver.default_mutation_parameters,
+        "remove_node_chance": 0.2,
+        "change_member_connection_chance": 0.2,
+    }
+
+    for added_nodes in added_node_counts:
+        random.seed(seed)
+        genome = make_grown_genome(added_nodes)
+        population = [genome] * 100
+        rng = np.random.default_rng(seed)
+
+        results.append(
+            {
+                "nodes": genome.node_count(),
+                "members": genome.member_count(),
+                "create_mutation": time_repeated(
+                    lambda: genome.create_mutation(**Evolver.default_mutation_parameters), repeats, min_time
+                ),
+                # Every removable node and rewirable member is drawn with these, stressing topology mutations
+                "create_mutation_topology": time_repeated(
+                    lambda: genome.create_mutation(**topology_mutation_parameters), repeats, min_time
+                ),
+                # A population of 100 mutated genome by genome, and with all draws made at once
+                "population_create_mutation": time_repeated(
+                    lambda: [
+                        member.create_mutation(**Evolver.default_mutation_parameters) for member in population
+                    ],
+                    repeats,
+                    min_time,
+                ),
+                "population_mutate_population": time_repeated(
+                    lambda: Genome.mutate_population(population, rng, **Evolver.default_mutation_parameters),
+                    repeats,
+                    min_time,
+                ),
+            }
+        )
+
+    return results
+
+
+def benchmark_generations(backends, population_size, generations, seed):
+    results = []
+
+    for name, make_backend in backends.items():
+        with make_backend() as backend:
+            Genome.fitness_cache.clear()
+            random.seed(seed)
+
+            evolver = Evolver(population_size=population_size, workers=backend)
+            evolver.initialize()
+
+            start = time.perf_counter()
+            evolver.run(generations=generations)
+            elapsed = time.perf_counter() - start
+
+        results.append(
+            {
+                "backend": name,
+                "population_size": population_size,
+                "generations": generations,
+                "elapsed_s": elapsed,
+                "generations_per_s": generations / elapsed,
+                "best_fitness": float(evolver.best_fitness),
+                "cache_hit_rate": Genome.fitness_cache.hit_rate(),
+            }
+        )
+
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks the solver, mutation and generation throughput.")
+    parser.add_argument("--output", default=None, help="JSON file to write, printed to stdout by default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and repeats, for a smoke test")
+    parser.add_argument("--workers", type=int, default=None, help="workers for the parallel backends")
+    parser.add_argument(
+        "--backends",
+        default="serial,batched,joblib,worker_pool",
+        help="comma separated generation backends out of serial, batched, joblib and worker_pool",
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    n_workers = get_default_worker_count() if args.workers is None else args.workers
+
+    # Singular trusses are expected and only produce noise here
+    warnings.simplefilter("ignore", RuntimeWarning)
+
+    if args.quick:
+        panel_counts, added_node_counts, stiffness_panel_counts = [4, 16], [0, 16], [16, 256]
+        repeats, min_time, population_size, generations = 3, 0.0, 50, 3
+    else:
+        panel_counts, added_node_counts = [4, 8, 16, 32, 64, 128], [0, 4, 16, 64, 256]
+        stiffness_panel_counts = [16, 128, 512, 2048]
+        repeats, min_time, population_size, generations = 20, 0.2, 100, 20
+
+    all_backends = {
+        "serial": lambda: contextlib.nullcontext(SerialBackend()),
+        "batched": lambda: contextlib.nullcontext(None),
+        "joblib": lambda: contextlib.nullcontext(JoblibBackend(n_workers)),
+        "worker_pool": lambda: WorkerPool(n_workers, seed=args.seed),
+    }
+    backends = {name: all_backends[name] for name in args.backends.split(",")}
+
+    results = {
+        "metadata": {
+            "timestamp": time.time(),
+            "seed": args.seed,
+            "python": sys.version,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": n_workers,
+        },
+        "solve": benchmark_solve(panel_counts, repeats, min_time),
+        "stiffness": benchmark_stiffness(stiffness_panel_counts, repeats, min_time),
+        "mutation": benchmark_mutation(added_node_counts, repeats, min_time, args.seed),
+        "generations": benchmark_generations(backends, population_size, generations, args.seed),
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
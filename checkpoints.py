@@ -0,0 +1,232 @@
+import io
+import json
+import os
+import struct
+import time
+import numpy as np
+
+from pathlib import Path
+from genetics import pack_population, unpack_population
+
+
+def find_latest_log(directory="truss_checkpoints"):
+    """Returns the path of the most recently written .trusslog in {directory}, or None if there is none."""
+    paths = list(Path(directory).glob("*.trusslog"))
+
+    return max(paths, key=lambda path: path.stat().st_mtime) if paths else None
+
+
+def new_log_path(directory="truss_checkpoints"):
+    """Returns a path in {directory} for the log of a new run, named after its start time, that no log uses yet."""
+    name = time.strftime("run-%Y%m%d-%H%M%S")
+    path = Path(directory) / f"{name}.trusslog"
+    suffix = 1
+    while path.exists():
+        suffix += 1
+        path = Path(directory) / f"{name}-{suffix}.trusslog"
+
+    return path
+
+
+class CheckpointStore:
+    """
+    Append-only checkpoint log of whole populations.
+
+    Every record in the log file is a magic number, a payload length and an .npz payload holding the packed population,
+    the generation, the random state and the configuration of the run. A second append-only file indexes the records
+    by generation, with their offset, length and best fitness, so checkpoints can be listed without reading the log.
+    A log holds a single run, as fitnesses of runs with other settings are not comparable, see new_log_path.
+    """
+
+    class Entry:
+        def __init__(self, generation, offset, length, best_fitness):
+            self.generation = generation
+            self.offset = offset
+            self.length = length
+            self.best_fitness = best_fitness
+
+        def __repr__(self):
+            return f"CheckpointStore.Entry(generation={self.generation}, best_fitness={self.best_fitness})"
+
+    __record_magic = b"TCKP"
+    __record_header = struct.Struct("<4sQ")
+    __index_entry = struct.Struct("<qqqd")
+
+    def __init__(
+        self,
+        path="truss_checkpoints/run.trusslog",
+        every=1,
+        keep=None,
+        keep_best=True,
+        store_population=True,
+        configuration=None,
+    ):
+        # A checkpoint is written every {every} generations. With {keep} set, only the last {keep} checkpoints
+        # (and the best one if {keep_best}) are retained. Without {store_population} only the best genome is stored,
+        # which is smaller but cannot be resumed from.
+        # {configuration}, a JSON serializable dict of the run's settings, is stored with every checkpoint.
+        self.path = Path(path)
+        self.configuration = configuration
+        self.index_path = self.path.with_name(self.path.name + ".idx")
+        self.every = every
+        self.keep = keep
+        self.keep_best = keep_best
+        self.store_population = store_population
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.__entries = self.__read_index()
+
+    def __read_index(self):
+        if not self.index_path.exists():
+            return self.__rebuild_index()
+
+        log_size = self.path.stat().st_size if self.path.exists() else 0
+        data = self.index_path.read_bytes()
+
+        entries = []
+        for offset in range(0, len(data) - self.__index_entry.size + 1, self.__index_entry.size):
+            entry = self.Entry(*self.__index_entry.unpack_from(data, offset))
+
+            # Entries past the end of the log come from a crash between the two writes
+            if entry.offset + entry.length > log_size:
+                break
+            entries.append(entry)
+
+        return entries
+
+    def __rebuild_index(self):
+        entries = []
+
+        if self.path.exists():
+            with open(self.path, "rb") as log:
+                while True:
+                    offset = log.tell()
+                    header = log.read(self.__record_header.size)
+                    if len(header) < self.__record_header.size:
+                        break
+
+                    magic, payload_length = self.__record_header.unpack(header)
+                    payload = log.read(payload_length)
+                    if magic != self.__record_magic or len(payload) < payload_length:
+                        break
+
+                    with np.load(io.BytesIO(payload)) as record:
+                        entries.append(
+                            self.Entry(
+                                int(record["generation"]),
+                                offset,
+                                self.__record_header.size + payload_length,
+                                float(record["best_fitness"]),
+                            )
+                        )
+
+        self.__write_index(entries)
+        return entries
+
+    def __write_index(self, entries):
+        with open(self.index_path, "wb") as index:
+            for entry in entries:
+                index.write(
+                    self.__index_entry.pack(entry.generation, entry.offset, entry.length, entry.best_fitness)
+                )
+
+    def entries(self):
+        return list(self.__entries)
+
+    def observe(self, evolver):
+        """Evolver observer, checkpoints the ranked population every {every} generations."""
+        if evolver.generation % self.every == 0:
+            self.append(evolver.generation, evolver.population, evolver.get_random_state())
+
+    def append(self, generation, population, random_state):
+        """Appends a checkpoint of {population}, which must be ranked best first."""
+        stored_population = population if self.store_population else population[:1]
+        best_fitness = population[0].assignment_fitness
+
+        payload = io.BytesIO()
+        np.savez_compressed(
+            payload,
+            generation=np.int64(generation),
+            best_fitness=np.float64(np.nan if best_fitness is None else best_fitness),
+            complete_population=np.bool_(self.store_population),
+            random_state=np.frombuffer(random_state, dtype=np.uint8),
+            configuration=np.array(json.dumps(self.configuration)),
+            **pack_population(stored_population),
+        )
+        payload = payload.getvalue()
+
+        # Dropping any partially written record left by a crash
+        offset = self.__entries[-1].offset + self.__entries[-1].length if self.__entries else 0
+        with open(self.path, "ab") as log:
+            log.truncate(offset)
+            log.write(self.__record_header.pack(self.__record_magic, len(payload)))
+            log.write(payload)
+
+        entry = self.Entry(
+            generation,
+            offset,
+            self.__record_header.size + len(payload),
+            np.nan if best_fitness is None else best_fitness,
+        )
+        with open(self.index_path, "ab") as index:
+            index.truncate(len(self.__entries) * self.__index_entry.size)
+            index.write(
+                self.__index_entry.pack(entry.generation, entry.offset, entry.length, entry.best_fitness)
+            )
+        self.__entries.append(entry)
+
+        if self.keep is not None and len(self.__entries) > 2 * self.keep + 1:
+            self.compact()
+
+    def compact(self):
+        """Rewrites the log with only the retained checkpoints."""
+        retained = self.__entries[-self.keep :] if self.keep else []
+        if self.keep_best and self.__entries:
+            best = min(self.__entries, key=lambda entry: entry.best_fitness)
+            if best not in retained:
+                retained = [best] + retained
+
+        temporary_path = self.path.with_name(self.path.name + ".tmp")
+        new_entries = []
+        with open(self.path, "rb") as log, open(temporary_path, "wb") as new_log:
+            for entry in retained:
+                log.seek(entry.offset)
+                new_entries.append(self.Entry(entry.generation, new_log.tell(), entry.length, entry.best_fitness))
+                new_log.write(log.read(entry.length))
+
+        os.replace(temporary_path, self.path)
+        self.__write_index(new_entries)
+        self.__entries = new_entries
+
+    def load(self, entry=None):
+        """
+        Returns the checkpoint for {entry} (the latest by default) as a dict with
+        generation, population, complete_population, random_state and configuration,
+        None for checkpoints written before configurations were stored.
+        """
+        if entry is None:
+            if not self.__entries:
+                raise FileNotFoundError(f"No checkpoints in {self.path}.")
+            entry = self.__entries[-1]
+
+        with open(self.path, "rb") as log:
+            log.seek(entry.offset)
+            magic, payload_length = self.__record_header.unpack(log.read(self.__record_header.size))
+            if magic != self.__record_magic:
+                raise ValueError(f"Corrupt checkpoint record at offset {entry.offset} in {self.path}.")
+            payload = log.read(payload_length)
+
+        # Reading every array once, NpzFile decompresses again on each access
+        with np.load(io.BytesIO(payload)) as record:
+            record = {name: record[name] for name in record.files}
+
+        return {
+            "generation": int(record["generation"]),
+            "population": unpack_population(record),
+            "complete_population": bool(record["complete_population"]),
+            "random_state": record["random_state"].tobytes(),
+            "configuration": json.loads(str(record["configuration"])) if "configuration" in record else None,
+        }
+
+    def best_entry(self):
+        return min(self.__entries, key=lambda entry: entry.best_fitness) if self.__entries else None
@@ -0,0 +1,347 @@
+import pickle
+import random
+import time
+import numpy as np
+
+from contextlib import contextmanager
+
+from genetics import Genome, evaluate_population
+from geometry import GeometryStatus
+
+
+class Evolver:
+    """
+    Runs the genetic algorithm without any user interface.
+    Each generation the population is evaluated and ranked, observers are notified,
+    then the best {survivor_count} are selected and the rest of the pool is refilled with their mutations.
+    """
+
+    # Points in a generation observers can be called at
+    observer_events = ("start", "ranked", "end")
+
+    default_mutation_parameters = {
+        "position_mutation_chance": 0.5,
+        "position_mutation_rate": 0.1,
+        "new_node_chance": 0.25,
+        "remove_node_chance": 0.1,
+        "change_member_connection_chance": 0,
+        "infeasible_retries": 0,
+        "new_member_chance": 0,
+    }
+
+    def __init__(
+        self,
+        population_size=100,
+        survivor_count=None,
+        selection_exponent=2,
+        mutation_parameters=None,
+        initial_mutation_rounds=10,
+        workers=None,
+        reuse_factorizations=False,
+        prescreen=False,
+        load_cases=None,
+        solver=None,
+        rng=None,
+        deduplicate=False,
+        position_quantum=1e-3,
+        deduplication_retries=3,
+        initializer=None,
+        geometry_checker=None,
+    ):
+        self.population_size = population_size
+        self.survivor_count = population_size // 2 if survivor_count is None else survivor_count
+        self.mutation_parameters = {**self.default_mutation_parameters, **(mutation_parameters or {})}
+        self.initial_mutation_rounds = initial_mutation_rounds
+
+        # Rank i of the sorted pool is selected with weight (population_size - i - 1) ** selection_exponent
+        self.selection_weights = [
+            (population_size - i - 1) ** selection_exponent for i in range(population_size)
+        ]
+
+        # A WorkerPool to evaluate and mutate in, None runs everything in this process
+        self.workers = workers
+        # Re-solve offspring with low-rank updates of their parent's factorization, see evaluate_population.
+        # Only used when evaluating in this process.
+        self.reuse_factorizations = reuse_factorizations
+        # Reject trusses that can never be solved before solving, see evaluate_population
+        self.prescreen = prescreen
+        # Truss.LoadCase list every truss is sized for, None for only the genomes' own applied forces
+        self.load_cases = load_cases
+        # StiffnessSolver to solve trusses with, None for the method of joints, see evaluate_population
+        self.solver = solver
+        # GeometryChecker rejecting trusses that cannot be built before solving them, see evaluate_population
+        self.geometry_checker = geometry_checker
+        # How many times grow() redraws seed positions and retries mutations the geometry_checker rejects
+        self.seed_redraws = 1000
+        self.geometry_retries = 3
+        # numpy Generator to mutate whole populations with, see Genome.mutate_population.
+        # None mutates genome by genome with the random module.
+        self.rng = rng
+        # Replace bred genomes building the same truss as another one (see Genome.canonical_fingerprint,
+        # with positions rounded to {position_quantum}) with fresh offspring, drawn up to {deduplication_retries} times
+        self.deduplicate = deduplicate
+        self.position_quantum = position_quantum
+        self.deduplication_retries = deduplication_retries
+        # Duplicates found by the last breed() when deduplicating, and how many of them could not be replaced
+        self.duplicate_count = 0
+        self.remaining_duplicate_count = 0
+        # Builds the starting population with build(evolver), e.g. a PopulationBuilder, None mutates Genome() only
+        self.initializer = initializer
+
+        self.population = []
+        # Parent of each genome of the population as last bred, None for survivors, see MutationSchedule
+        self.parents = []
+        # Fitnesses of the population as last ranked, stale once breed() has replaced it
+        self.fitnesses = np.zeros(0)
+        self.best_genome = None
+        self.best_fitness = None
+        self.generation = 0
+
+        # Wall time in seconds spent in each phase of the current generation
+        self.phase_times = {}
+
+        self.__observers = {event: [] for event in self.observer_events}
+        self.__stop_requested = False
+
+    def add_observer(self, observer, event="ranked"):
+        """
+        Registers observer(evolver), called every generation at {event}:
+        "start" before evaluation, "ranked" once the population is ranked, "end" once the next population is bred.
+        """
+        self.__observers[event].append(observer)
+
+    def remove_observer(self, observer, event="ranked"):
+        self.__observers[event].remove(observer)
+
+    @contextmanager
+    def timed(self, phase):
+        """Adds the wall time spent in the with block to phase_times[{phase}]."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_times[phase] = self.phase_times.get(phase, 0.0) + time.perf_counter() - start
+
+    def __notify(self, event):
+        # Observers may remove themselves while being notified
+        for observer in list(self.__observers[event]):
+            if event == "ranked":
+                name = getattr(observer, "__qualname__", type(observer).__qualname__)
+                with self.timed(f"observer_{name}"):
+                    observer(self)
+            else:
+                observer(self)
+
+    def initialize(self):
+        if self.initializer is not None:
+            self.population = self.initializer.build(self)
+        else:
+            self.population = self.grow(self.population_size)
+
+        self.generation = 0
+
+    def grow(self, count):
+        """
+        Returns {count} new genomes, each Genome() mutated initial_mutation_rounds times.
+        With a geometry_checker every returned genome passes it: seeds it rejects get new random positions,
+        and a mutation it rejects is drawn again up to {geometry_retries} times before the genome skips that round.
+        """
+        genomes = [Genome() for __ in range(count)]
+        if self.geometry_checker is None:
+            for __ in range(self.initial_mutation_rounds):
+                genomes = self.mutate(genomes)
+            return genomes
+
+        # Few random seeds are buildable, about 1 in 80 with the default checker, but redrawing them costs no solve
+        rejected = self.__geometry_rejected(genomes)
+        for __ in range(self.seed_redraws):
+            if not rejected:
+                break
+            for genome_index in rejected:
+                genomes[genome_index].randomize_positions()
+            rejected = [rejected[i] for i in self.__geometry_rejected([genomes[j] for j in rejected])]
+        else:
+            if rejected:
+                raise RuntimeError("No seed truss passes the geometry checker, it is too strict for Genome().")
+
+        for __ in range(self.initial_mutation_rounds):
+            pending = range(len(genomes))
+            for __ in range(self.geometry_retries + 1):
+                mutations = self.mutate([genomes[genome_index] for genome_index in pending])
+                rejected = set(self.__geometry_rejected(mutations))
+                for i, (genome_index, genome) in enumerate(zip(pending, mutations)):
+                    if i not in rejected:
+                        genomes[genome_index] = genome
+                pending = [pending[i] for i in sorted(rejected)]
+                if not pending:
+                    break
+
+        return genomes
+
+    def __geometry_rejected(self, genomes):
+        """Returns the indices of {genomes} the geometry_checker rejects."""
+        return [
+            i
+            for i, genome in enumerate(genomes)
+            if self.geometry_checker.check(genome.positions, genome.members) != GeometryStatus.VALID
+        ]
+
+    def get_random_state(self):
+        if self.rng is None:
+            return pickle.dumps(random.getstate())
+
+        # Streams spawned for workers (see WorkerPool.mutate) are counted by the seed sequence, not in the state
+        return pickle.dumps(
+            {
+                "random": random.getstate(),
+                "numpy": self.rng.bit_generator.state,
+                "seed_sequence": self.rng.bit_generator.seed_seq,
+            }
+        )
+
+    def restore(self, generation, population, random_state):
+        """
+        Continues from a population ranked and observed at {generation} with {random_state},
+        as returned by get_random_state() at that point, e.g. when resuming from a checkpoint.
+        """
+        self.population = population
+        self.generation = generation
+        self.rank()
+
+        random_state = pickle.loads(random_state)
+        if isinstance(random_state, dict):
+            random.setstate(random_state["random"])
+            if self.rng is not None:
+                # Random states saved before the seed sequence was kept respawn streams from the start
+                if "seed_sequence" in random_state:
+                    self.rng = np.random.Generator(type(self.rng.bit_generator)(random_state["seed_sequence"]))
+                self.rng.bit_generator.state = random_state["numpy"]
+        else:
+            random.setstate(random_state)
+        self.breed()
+        self.generation += 1
+
+    def evaluate(self, genomes):
+        if self.workers is None:
+            return evaluate_population(
+                genomes,
+                reuse_factorizations=self.reuse_factorizations,
+                prescreen=self.prescreen,
+                load_cases=self.load_cases,
+                solver=self.solver,
+                geometry_checker=self.geometry_checker,
+            )
+
+        return self.workers.evaluate(
+            genomes,
+            prescreen=self.prescreen,
+            load_cases=self.load_cases,
+            solver=self.solver,
+            geometry_checker=self.geometry_checker,
+        )
+
+    def mutate(self, genomes):
+        if self.workers is not None:
+            return self.workers.mutate(genomes, rng=self.rng, **self.mutation_parameters)
+
+        if self.rng is not None:
+            return Genome.mutate_population(genomes, self.rng, **self.mutation_parameters)
+
+        return [genome.create_mutation(**self.mutation_parameters) for genome in genomes]
+
+    def rank(self):
+        with self.timed("evaluation"):
+            fitnesses = self.evaluate(self.population)
+
+        with self.timed("ranking"):
+            order = np.argsort(fitnesses, kind="stable")
+
+            self.population = [self.population[i] for i in order]
+            self.fitnesses = fitnesses[order]
+            self.best_genome = self.population[0]
+            self.best_fitness = self.fitnesses[0]
+
+    def breed(self):
+        with self.timed("selection"):
+            selection = random.sample(self.population, k=self.survivor_count, counts=self.selection_weights)
+
+            parents = [
+                selection[i % self.survivor_count] for i in range(self.population_size - self.survivor_count)
+            ]
+
+        with self.timed("mutation"):
+            offspring = self.mutate(parents)
+
+        self.population = selection + offspring
+        self.parents = [None] * self.survivor_count + parents
+
+        if self.deduplicate:
+            with self.timed("deduplication"):
+                # Survivors selected more than once are replaced by offspring of their own
+                self.__deduplicate(selection + parents)
+
+    def __deduplicate(self, parents):
+        """Replaces genomes of the population equal to an earlier one with new mutations of parents[i]."""
+        seen = set()
+        pending = range(len(self.population))
+        self.duplicate_count = 0
+
+        for attempt in range(self.deduplication_retries + 1):
+            duplicates = []
+            for genome_index in pending:
+                fingerprint = self.population[genome_index].canonical_fingerprint(self.position_quantum)
+                if fingerprint in seen:
+                    duplicates.append(genome_index)
+                else:
+                    seen.add(fingerprint)
+
+            if attempt == 0:
+                self.duplicate_count = len(duplicates)
+            if not duplicates or attempt == self.deduplication_retries:
+                break
+
+            replacements = self.mutate([parents[genome_index] for genome_index in duplicates])
+            for genome_index, genome in zip(duplicates, replacements):
+                self.population[genome_index] = genome
+                self.parents[genome_index] = parents[genome_index]
+            pending = duplicates
+
+        self.remaining_duplicate_count = len(duplicates)
+
+    def step(self):
+        self.phase_times = {}
+        self.__notify("start")
+
+        self.rank()
+        self.__notify("ranked")
+
+        self.breed()
+        self.__notify("end")
+
+        self.generation += 1
+
+    def stop(self):
+        """Makes run() return after the current generation, safe to call from an observer or another thread."""
+        self.__stop_requested = True
+
+    def run(self, generations=None, time_budget=None):
+        """
+        Runs until {generations} more generations have completed, {time_budget} seconds have passed or stop() is called.
+        With neither limit it runs until stopped. Returns the best genome of the last ranked generation.
+        """
+        if not self.population:
+            self.initialize()
+
+        self.__stop_requested = False
+        start_time = time.perf_counter()
+        start_generation = self.generation
+
+        while not self.__stop_requested:
+            if generations is not None and self.generation - start_generation >= generations:
+                break
+            if time_budget is not None and time.perf_counter() - start_time >= time_budget:
+                break
+
+            self.step()
+
+        return self.best_genome
@@ -0,0 +1,338 @@
+import numpy as np
+from collections import OrderedDict
+from enum import Enum
+from truss import Truss
+
+
+class FeasibilityStatus(Enum):
+    FEASIBLE = 0
+    # Members plus reaction components don't match the 2 equations per node, the system is not square
+    COUNT_MISMATCH = 1
+    # A member connects a node to itself or to a node at the same position
+    DEGENERATE_MEMBER = 2
+    # Two members connect the same pair of nodes
+    DUPLICATE_MEMBER = 3
+    # Some nodes are not connected to any support through members
+    DISCONNECTED = 4
+    # All members and reactions at a node are parallel, so it cannot resist loads across them
+    COLINEAR_JOINT = 5
+    # Some part of the truss is overbraced and another is a mechanism
+    NOT_RIGID = 6
+    # Passed the checks above but its force coefficient matrix turned out singular
+    SINGULAR = 7
+
+
+class EvaluationResult:
+    """
+    Outcome of evaluating a truss, {cost} is None unless {status} is FEASIBLE.
+    {utilizations} holds the per member utilizations of a feasible truss, see Truss.Member.get_utilizations.
+    """
+
+    def __init__(self, status, cost=None, utilizations=None):
+        self.status = status
+        self.cost = cost
+        self.utilizations = utilizations
+
+    def is_feasible(self):
+        return self.status == FeasibilityStatus.FEASIBLE
+
+    def __repr__(self):
+        return f"EvaluationResult(status={self.status.name}, cost={self.cost})"
+
+
+# Unit directions of the reaction components of each support type, as in Truss.assemble_arrays
+_reaction_directions = {
+    Truss.Node.SupportTypes.NONE.value: [],
+    Truss.Node.SupportTypes.FIXED.value: [(1.0, 0.0), (0.0, 1.0)],
+    Truss.Node.SupportTypes.ROLLER_HORIZONTAL.value: [(0.0, 1.0)],
+    Truss.Node.SupportTypes.ROLLER_VERTICAL.value: [(1.0, 0.0)],
+}
+
+
+class FeasibilityChecker:
+    """
+    Finds trusses that can never be solved without building their force coefficient matrix.
+
+    The counting rule m + r == 2n, self-connected and duplicate members, connectivity to the supports and
+    generic rigidity (a pebble game) only depend on the members and supports, so their outcome is cached per topology
+    in a bounded LRU. The pebble game is also cached by what is left after peeling off nodes held by two bars,
+    so offspring that only gained such nodes reuse their parent's result.
+    Coincident nodes and colinear joints depend on positions and are checked for whole stacks of trusses at once.
+    Every rejected truss has a singular or non-square matrix.
+    Trusses passing every check can still be singular through special geometry, see FeasibilityStatus.SINGULAR.
+    """
+
+    def __init__(self, max_cached_topologies=10000, parallel_tolerance=1e-9):
+        # Joints whose constraint directions have a cross product below {parallel_tolerance} are colinear
+        self.max_cached_topologies = max_cached_topologies
+        self.parallel_tolerance = parallel_tolerance
+
+        self.__topology_statuses = OrderedDict()
+        self.__core_rigidity = OrderedDict()
+
+    def check(self, positions, members, support_types):
+        """Returns the first FeasibilityStatus the truss fails, or FEASIBLE."""
+        return self.check_batch(positions[None], members[None], support_types)[0]
+
+    def check_batch(self, positions, members, support_types):
+        """
+        check for a stack of trusses sharing node count, member count and support layout,
+        with the argument shapes of Truss.solve_arrays. Returns a list of statuses.
+        """
+        statuses = [self.check_topology(truss_members, support_types) for truss_members in members]
+
+        candidates = [
+            truss_index for truss_index, status in enumerate(statuses) if status == FeasibilityStatus.FEASIBLE
+        ]
+        if not candidates:
+            return statuses
+
+        candidate_positions = positions[candidates]
+        candidate_members = members[candidates]
+        batch_index = np.arange(len(candidates))[:, None]
+        member_delta = (
+            candidate_positions[batch_index, candidate_members[:, :, 1]]
+            - candidate_positions[batch_index, candidate_members[:, :, 0]]
+        )
+
+        coincident = np.any(np.all(member_delta == 0, axis=2), axis=1)
+        for truss_index in np.array(candidates)[coincident].tolist():
+            statuses[truss_index] = FeasibilityStatus.DEGENERATE_MEMBER
+
+        colinear = _colinear_joints(
+            len(positions[0]),
+            candidate_members[~coincident],
+            member_delta[~coincident],
+            support_types,
+            self.parallel_tolerance,
+        )
+        for truss_index in np.array(candidates)[~coincident][colinear].tolist():
+            statuses[truss_index] = FeasibilityStatus.COLINEAR_JOINT
+
+        return statuses
+
+    def check_topology(self, members, support_types):
+        """Returns the status of the position independent checks, cached by topology."""
+        return self.__cached(
+            self.__topology_statuses,
+            members.tobytes() + b"/" + support_types.tobytes(),
+            lambda: self.__check_topology(members, support_types),
+        )
+
+    def __cached(self, entries, key, compute):
+        value = entries.get(key)
+        if value is None:
+            value = compute()
+            entries[key] = value
+
+        entries.move_to_end(key)
+        while len(entries) > self.max_cached_topologies:
+            entries.popitem(last=False)
+
+        return value
+
+    def __check_topology(self, members, support_types):
+        reactions = [_reaction_directions[support_type] for support_type in support_types.tolist()]
+
+        status = _check_member_counts(members, reactions)
+        if status != FeasibilityStatus.FEASIBLE:
+            return status
+
+        neighbours = [[] for __ in range(len(support_types))]
+        for node_a, node_b in members.tolist():
+            neighbours[node_a].append(node_b)
+            neighbours[node_b].append(node_a)
+
+        if not _connected_to_supports(neighbours, reactions):
+            return FeasibilityStatus.DISCONNECTED
+
+        core_node_count, core_bars = _rigidity_core(neighbours, reactions)
+        if core_node_count and not self.__cached(
+            self.__core_rigidity,
+            (core_node_count, tuple(core_bars)),
+            lambda: _pebble_game(core_node_count, core_bars),
+        ):
+            return FeasibilityStatus.NOT_RIGID
+
+        return FeasibilityStatus.FEASIBLE
+
+    def clear(self):
+        self.__topology_statuses.clear()
+        self.__core_rigidity.clear()
+
+
+def _check_member_counts(members, reactions):
+    """Checks the counting rule and that every member connects two different nodes, and no pair twice."""
+    node_count = len(reactions)
+    member_count = len(members)
+
+    if member_count + sum(len(directions) for directions in reactions) != 2 * node_count:
+        return FeasibilityStatus.COUNT_MISMATCH
+
+    if np.any(members[:, 0] == members[:, 1]):
+        return FeasibilityStatus.DEGENERATE_MEMBER
+
+    sorted_members = np.sort(members, axis=1).astype(np.int64)
+    if len(np.unique(sorted_members[:, 0] * node_count + sorted_members[:, 1])) < member_count:
+        return FeasibilityStatus.DUPLICATE_MEMBER
+
+    return FeasibilityStatus.FEASIBLE
+
+
+def _colinear_joints(node_count, members, member_delta, support_types, parallel_tolerance):
+    """Returns which trusses of a stack have a node whose members and reactions are all parallel."""
+    batch_size, member_count = members.shape[:2]
+
+    reaction_nodes = []
+    reaction_directions = []
+    for node_index, support_type in enumerate(support_types.tolist()):
+        for direction in _reaction_directions[support_type]:
+            reaction_nodes.append(node_index)
+            reaction_directions.append(direction)
+
+    # One row per member end and reaction component: the node it acts on, offset by truss, and its direction
+    node_offsets = node_count * np.arange(batch_size)[:, None]
+    constraint_nodes = np.concatenate(
+        [
+            np.array(reaction_nodes, dtype=np.intp)[None, :] + node_offsets,
+            members[:, :, 0] + node_offsets,
+            members[:, :, 1] + node_offsets,
+        ],
+        axis=1,
+    ).ravel()
+    constraint_directions = np.concatenate(
+        [
+            np.broadcast_to(np.reshape(reaction_directions, (1, -1, 2)), (batch_size, len(reaction_nodes), 2)),
+            member_delta,
+            member_delta,
+        ],
+        axis=1,
+    ).reshape(-1, 2)
+    constraint_directions = (
+        constraint_directions / np.hypot(constraint_directions[:, 0], constraint_directions[:, 1])[:, None]
+    )
+
+    # Comparing every direction with the first one at its node, assigning in reverse keeps the first
+    constraint_indices = np.arange(len(constraint_nodes))
+    first_constraint = np.zeros(batch_size * node_count, dtype=np.intp)
+    first_constraint[constraint_nodes[::-1]] = constraint_indices[::-1]
+    first_directions = constraint_directions[first_constraint[constraint_nodes]]
+
+    cross = np.abs(
+        constraint_directions[:, 0] * first_directions[:, 1] - constraint_directions[:, 1] * first_directions[:, 0]
+    )
+    non_parallel_counts = np.bincount(constraint_nodes[cross > parallel_tolerance], minlength=batch_size * node_count)
+
+    return np.any(non_parallel_counts.reshape(batch_size, node_count) == 0, axis=1)
+
+
+def _connected_to_supports(neighbours, reactions):
+    reached = [bool(directions) for directions in reactions]
+    stack = [node_index for node_index, is_reached in enumerate(reached) if is_reached]
+    while stack:
+        for neighbour in neighbours[stack.pop()]:
+            if not reached[neighbour]:
+                reached[neighbour] = True
+                stack.append(neighbour)
+
+    return all(reached)
+
+
+def _rigidity_core(neighbours, reactions):
+    """
+    Reduces generic rigidity of the members plus the supports, given the counting rule holds, to a pebble game.
+    Nodes held by exactly two bars (members or reaction components) are peeled off first, which keeps rigidity
+    (Henneberg's vertex addition in reverse). Returns (node_count, bars) of the pebble game for what is left,
+    with the ground modelled as a rigid triangle of three extra nodes and every reaction component as a bar to one
+    of them, node_count being 0 when nothing is left.
+    """
+    node_count = len(neighbours)
+
+    degrees = [len(node_neighbours) + len(directions) for node_neighbours, directions in zip(neighbours, reactions)]
+    removed = [False] * node_count
+    stack = [node_index for node_index, degree in enumerate(degrees) if degree == 2]
+    while stack:
+        node_index = stack.pop()
+        if removed[node_index] or degrees[node_index] != 2:
+            continue
+
+        removed[node_index] = True
+        for neighbour in neighbours[node_index]:
+            if not removed[neighbour]:
+                degrees[neighbour] -= 1
+                if degrees[neighbour] == 2:
+                    stack.append(neighbour)
+
+    core_nodes = [node_index for node_index in range(node_count) if not removed[node_index]]
+    if not core_nodes:
+        return 0, []
+
+    core_index = {node_index: index for index, node_index in enumerate(core_nodes)}
+    ground_nodes = [len(core_nodes), len(core_nodes) + 1, len(core_nodes) + 2]
+    bars = [(ground_nodes[0], ground_nodes[1]), (ground_nodes[1], ground_nodes[2]), (ground_nodes[0], ground_nodes[2])]
+
+    # Reactions of one node go to different ground nodes, so a fixed support doesn't become a duplicate bar
+    reaction_index = 0
+    for node_index in core_nodes:
+        for __ in reactions[node_index]:
+            bars.append((core_index[node_index], ground_nodes[reaction_index % 3]))
+            reaction_index += 1
+
+        for neighbour in neighbours[node_index]:
+            if neighbour > node_index and not removed[neighbour]:
+                bars.append((core_index[node_index], core_index[neighbour]))
+
+    return len(core_nodes) + 3, bars
+
+
+def _pebble_game(node_count, bars):
+    """Returns whether {bars} are independent in the (2, 3) pebble game on {node_count} nodes."""
+    pebbles = [2] * node_count
+    # out_edges[u] holds v for every bar covered by a pebble of u
+    out_edges = [[] for __ in range(node_count)]
+
+    def collect_pebble(root, other):
+        """Moves a free pebble to {root} by reversing a path of covered bars, without taking it from {other}."""
+        parents = {root: None, other: None}
+        stack = [root]
+
+        while stack:
+            node = stack.pop()
+            for next_node in out_edges[node]:
+                if next_node in parents:
+                    continue
+                parents[next_node] = node
+
+                if pebbles[next_node] > 0:
+                    pebbles[next_node] -= 1
+                    pebbles[root] += 1
+
+                    while next_node != root:
+                        node = parents[next_node]
+                        out_edges[node].remove(next_node)
+                        out_edges[next_node].append(node)
+                        next_node = node
+
+                    return True
+
+                stack.append(next_node)
+
+        return False
+
+    for node_a, node_b in bars:
+        while pebbles[node_a] + pebbles[node_b] < 4:
+            if not (
+                (pebbles[node_a] < 2 and collect_pebble(node_a, node_b))
+                or (pebbles[node_b] < 2 and collect_pebble(node_b, node_a))
+            ):
+                # The bar is redundant
+                return False
+
+        if pebbles[node_a] > 0:
+            pebbles[node_a] -= 1
+            out_edges[node_a].append(node_b)
+        else:
+            pebbles[node_b] -= 1
+            out_edges[node_b].append(node_a)
+
+    return True
@@ -0,0 +1,62 @@
+from collections import OrderedDict
+
+
+class FitnessCache:
+    """Bounded LRU cache of fitnesses keyed by (fitness kind, genome fingerprint)."""
+
+    def __init__(self, max_size=10000, position_quantum=None):
+        # Genomes whose node positions round to the same multiple of {position_quantum} share an entry,
+        # None only matches exact positions
+        self.max_size = max_size
+        self.position_quantum = position_quantum
+
+        self.hits = 0
+        self.misses = 0
+
+        self.__entries = OrderedDict()
+
+    def key(self, genome, kind):
+        return kind, genome.fingerprint(self.position_quantum)
+
+    def get(self, key):
+        """Returns the cached fitness for {key}, or None if it is not cached."""
+        fitness = self.__entries.get(key)
+
+        if fitness is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.__entries.move_to_end(key)
+
+        return fitness
+
+    def put(self, key, fitness):
+        self.__entries[key] = fitness
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute_fitness):
+        fitness = self.get(key)
+
+        if fitness is None:
+            fitness = compute_fitness()
+            self.put(key, fitness)
+
+        return fitness
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.__entries.clear()
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self.__entries)
@@ -1,9 +1,58 @@
+import hashlib
 import random
-from copy import deepcopy
+import numpy as np
+from enum import IntFlag
 from truss import Truss
+from fitness_cache import FitnessCache
+from feasibility import EvaluationResult, FeasibilityChecker, FeasibilityStatus
+from geometry import GeometryStatus
 
 
 class Genome:
+    class MutationOperators(IntFlag):
+        """Mutations create_mutation and mutate_population applied to an offspring, see mutation_operators."""
+
+        NONE = 0
+        POSITION = 1
+        ADD_NODE = 2
+        REMOVE_NODE = 4
+        REWIRE = 8
+        ADD_MEMBER = 16
+
+    # Genomes created by create_mutation share these arrays with their parent (copy-on-write),
+    # so they must only be written through __writable or replaced through __replace
+    __node_array_names = (
+        "node_ids",
+        "positions",
+        "support_types",
+        "applied_forces",
+        "position_is_mutable",
+        "existance_is_mutable",
+    )
+    __array_names = __node_array_names + ("members", "child_is_mutable")
+
+    # Shared by the _gentle fitness functions and evaluate_population
+    fitness_cache = FitnessCache()
+
+    # Rejects trusses that cannot be solved before any matrix is built
+    feasibility_checker = FeasibilityChecker()
+
+    # Checks the node to incident members index against the arrays after every topology mutation, which is slow
+    debug_invariants = False
+
+    # Fitness given to genomes whose truss cannot be solved
+    unsolvable_fitness = 999999999999
+
+    # Number of trusses solved in this process, and how many of them got unsolvable_fitness.
+    # Trusses rejected by feasibility_checker are not solved and only counted in prescreen_rejection_count,
+    # those rejected by a GeometryChecker in geometry_rejection_count.
+    solve_count = 0
+    solve_failure_count = 0
+    prescreen_rejection_count = 0
+    geometry_rejection_count = 0
+
+    # Object-graph genes used before genomes were array-backed.
+    # Only kept so that checkpoints pickled with them can still be loaded, see __setstate__.
     class GeneticNode:
         def __init__(
             self,
@@ -19,16 +68,6 @@ class Genome:
 
             self.node = Truss.Node(x, y, support_type, applied_force)
 
-        def set_pos(self, x, y):
-            if not self.position_is_mutable:
-                raise Exception("Node does not have mutable position.")
-
-            self.node.x = x
-            self.node.y = y
-
-        def randomize_position(self):
-            self.set_pos(20 * (random.random() - 0.5), 20 * (random.random() - 0.5))
-
     class GeneticMember:
         def __init__(
             self,
@@ -45,85 +84,479 @@ class Genome:
                 self.parent_genetic_node.node, self.child_genetic_node.node
             )
 
-        def change_child_node(self, new_child_genetic_node):
-            self.child_genetic_node = new_child_genetic_node
-            self.member.connected_node_b = new_child_genetic_node.node
-
     def __init__(self):
-        self.nodes = [
-            # Road trusses
-            self.GeneticNode(
-                -7,
-                0,
-                support_type=Truss.Node.SupportTypes.FIXED,
-                applied_force=Truss.Node.Force(0, -8750 / 2),
+        fixed = Truss.Node.SupportTypes.FIXED.value
+        roller = Truss.Node.SupportTypes.ROLLER_HORIZONTAL.value
+
+        # Per node arrays, the first 5 nodes are the road trusses,
+        # the rest are supporting trusses to make a simple truss.
+        # Node ids stay with a node while indices change as nodes are removed, new nodes get next_node_id.
+        self.node_ids = np.arange(9, dtype=np.int64)
+        self.next_node_id = 9
+        self.positions = np.array(
+            [[-7, 0], [-3.5, 0], [0, 0], [3.5, 0], [7.0, 0], [0, 0], [0, 0], [0, 0], [0, 0]],
+            dtype=np.float64,
+        )
+        self.support_types = np.array([fixed, 0, 0, 0, roller, 0, 0, 0, 0], dtype=np.int8)
+        self.applied_forces = np.array(
+            [
+                [0, -8750 / 2],
+                [0, -17500 / 2],
+                [0, -17500 / 2],
+                [0, -17500 / 2],
+                [0, -8750 / 2],
+                [0, 0],
+                [0, 0],
+                [0, 0],
+                [0, 0],
+            ],
+            dtype=np.float64,
+        )
+        self.position_is_mutable = np.array([False] * 5 + [True] * 4)
+        self.existance_is_mutable = np.zeros(9, dtype=bool)
+
+        # Per member arrays, each row of members is (parent node index, child node index)
+        self.members = np.array(
+            [
+                # Pavement members
+                [0, 1], [1, 2], [2, 3], [3, 4],
+                # Supporting members to make simple truss
+                [5, 0], [5, 1], [5, 6],
+                [6, 1], [6, 2], [6, 7],
+                [7, 2], [7, 3], [7, 8],
+                [8, 3], [8, 4],
+            ],
+            dtype=np.int32,
+        )
+        self.child_is_mutable = np.zeros(15, dtype=bool)
+
+        # Set by evaluate_population and carried over to offspring that no mutation changed
+        self.assignment_fitness = None
+        self.identical_to_parent = False
+        # MutationOperators that made this genome from its parent, as an int
+        self.mutation_operators = 0
+
+        # Truss.Factorization of the last solve with reuse_factorizations, inherited by offspring
+        # so they can be re-solved with a low-rank update
+        self.factorization = None
+
+        self.__owned_arrays = set(self.__array_names)
+
+        # Members incident to every node, {node index: set of member indices}, built on first use
+        # by a topology mutation and kept up to date by them. Offspring build their own.
+        self.__incidence = None
+
+        self.randomize_positions()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_Genome__owned_arrays"]
+        del state["_Genome__incidence"]
+        # Factorizations are large and cheap to rebuild
+        state["factorization"] = None
+
+        return state
+
+    def __setstate__(self, state):
+        if "positions" not in state:
+            state = self.__legacy_state_to_arrays(state)
+
+        self.assignment_fitness = None
+        self.identical_to_parent = False
+        self.mutation_operators = 0
+        self.factorization = None
+        self.__dict__.update(state)
+
+        # Genomes saved before nodes had ids
+        if "node_ids" not in state:
+            self.node_ids = np.arange(len(self.positions), dtype=np.int64)
+            self.next_node_id = len(self.positions)
+
+        # Unpickled arrays are never shared
+        self.__owned_arrays = set(self.__array_names)
+        self.__incidence = None
+
+    @staticmethod
+    def __legacy_state_to_arrays(state):
+        genetic_nodes = state["nodes"]
+        genetic_members = state["members"]
+        node_index_dict = {id(genetic_node): ind for ind, genetic_node in enumerate(genetic_nodes)}
+
+        return {
+            "positions": np.array(
+                [(gn.node.x, gn.node.y) for gn in genetic_nodes], dtype=np.float64
+            ).reshape(-1, 2),
+            "support_types": np.array(
+                [gn.node.support_type.value for gn in genetic_nodes], dtype=np.int8
             ),
-            self.GeneticNode(-3.5, 0, applied_force=Truss.Node.Force(0, -17500 / 2)),
-            self.GeneticNode(0, 0, applied_force=Truss.Node.Force(0, -17500 / 2)),
-            self.GeneticNode(3.5, 0, applied_force=Truss.Node.Force(0, -17500 / 2)),
-            self.GeneticNode(
-                7.0,
-                0,
-                support_type=Truss.Node.SupportTypes.ROLLER_HORIZONTAL,
-                applied_force=Truss.Node.Force(0, -8750 / 2),
+            "applied_forces": np.array(
+                [
+                    (gn.node.applied_force.magnitude_x, gn.node.applied_force.magnitude_y)
+                    for gn in genetic_nodes
+                ],
+                dtype=np.float64,
+            ).reshape(-1, 2),
+            "position_is_mutable": np.array(
+                [gn.position_is_mutable for gn in genetic_nodes], dtype=bool
             ),
-            # Supporting Trusses to make simple truss
-            self.GeneticNode(0, 0, mutable_position=True),
-            self.GeneticNode(0, 0, mutable_position=True),
-            self.GeneticNode(0, 0, mutable_position=True),
-            self.GeneticNode(0, 0, mutable_position=True),
-        ]
+            "existance_is_mutable": np.array(
+                [gn.existance_is_mutable for gn in genetic_nodes], dtype=bool
+            ),
+            "members": np.array(
+                [
+                    (
+                        node_index_dict[id(gm.parent_genetic_node)],
+                        node_index_dict[id(gm.child_genetic_node)],
+                    )
+                    for gm in genetic_members
+                ],
+                dtype=np.int32,
+            ).reshape(-1, 2),
+            "child_is_mutable": np.array(
+                [gm.child_is_mutable for gm in genetic_members], dtype=bool
+            ),
+        }
 
-        self.members = [
-            # Pavement members
-            self.GeneticMember(self.nodes[0], self.nodes[1]),
-            self.GeneticMember(self.nodes[1], self.nodes[2]),
-            self.GeneticMember(self.nodes[2], self.nodes[3]),
-            self.GeneticMember(self.nodes[3], self.nodes[4]),
-            # Supporting members to make simple truss
-            self.GeneticMember(self.nodes[5], self.nodes[0]),
-            self.GeneticMember(self.nodes[5], self.nodes[1]),
-            self.GeneticMember(self.nodes[5], self.nodes[6]),
-            self.GeneticMember(self.nodes[6], self.nodes[1]),
-            self.GeneticMember(self.nodes[6], self.nodes[2]),
-            self.GeneticMember(self.nodes[6], self.nodes[7]),
-            self.GeneticMember(self.nodes[7], self.nodes[2]),
-            self.GeneticMember(self.nodes[7], self.nodes[3]),
-            self.GeneticMember(self.nodes[7], self.nodes[8]),
-            self.GeneticMember(self.nodes[8], self.nodes[3]),
-            self.GeneticMember(self.nodes[8], self.nodes[4]),
-        ]
+    def copy(self):
+        """Returns a genome that shares no arrays with this one."""
+        genome = self.__shallow_copy()
+        for name in self.__array_names:
+            setattr(genome, name, getattr(self, name).copy())
+        genome.__owned_arrays = set(self.__array_names)
 
-        self.randomize_positions()
+        return genome
+
+    def __shallow_copy(self):
+        genome = Genome.__new__(Genome)
+        genome.__dict__.update(self.__dict__)
+
+        # Neither genome may write to the now shared arrays in place
+        genome.__owned_arrays = set()
+        self.__owned_arrays = set()
+        genome.__incidence = None
+
+        return genome
+
+    def __writable(self, name):
+        """Returns the array {name} for in-place modification, copying it first if it is shared."""
+        if name not in self.__owned_arrays:
+            setattr(self, name, getattr(self, name).copy())
+            self.__owned_arrays.add(name)
+
+        self.__mark_changed()
+        return getattr(self, name)
+
+    def __replace(self, name, array):
+        setattr(self, name, array)
+        self.__owned_arrays.add(name)
+        self.__mark_changed()
+
+    def __truncate(self, name, length):
+        """Drops the rows of {name} past {length} without copying, a view of an owned array stays owned."""
+        setattr(self, name, getattr(self, name)[:length])
+        self.__mark_changed()
+
+    def __mark_changed(self):
+        self.assignment_fitness = None
+        self.identical_to_parent = False
+
+    def fingerprint(self, position_quantum=None):
+        """
+        Returns a hash of node positions, supports, loads and member connectivity.
+        Positions are rounded to multiples of {position_quantum} when it is given.
+        """
+        if position_quantum is None:
+            # Adding 0.0 turns -0.0 into 0.0 so both hash the same
+            positions = self.positions + 0.0
+        else:
+            positions = np.round(self.positions / position_quantum).astype(np.int64)
+
+        fingerprint = hashlib.blake2b(digest_size=16)
+        for array in (positions, self.support_types, self.applied_forces + 0.0, self.members):
+            fingerprint.update(np.ascontiguousarray(array).tobytes())
+            fingerprint.update(str(array.shape).encode())
+
+        return fingerprint.digest()
+
+    def canonical_fingerprint(self, position_quantum=1e-3):
+        """
+        Returns a hash of the truss that ignores the order of nodes and members and which end of a member
+        is its parent, positions being rounded to multiples of {position_quantum}.
+        Genomes with the same one build the same truss up to rounding, and so have the same fitness.
+        Nodes at the same rounded position with the same support and load keep their relative order.
+        """
+        # Adding 0.0 turns -0.0 into 0.0 so both hash the same
+        node_keys = np.column_stack(
+            [
+                np.round(self.positions / position_quantum).astype(np.int64),
+                self.support_types.astype(np.int64),
+                (self.applied_forces + 0.0).view(np.int64),
+            ]
+        )
+        node_order = np.lexsort(node_keys.T[::-1])
+        node_ranks = np.empty(self.node_count(), dtype=np.int64)
+        node_ranks[node_order] = np.arange(self.node_count())
+
+        members = np.sort(node_ranks[self.members], axis=1)
+        members = members[np.lexsort(members.T[::-1])]
+
+        fingerprint = hashlib.blake2b(digest_size=16)
+        for array in (node_keys[node_order], members):
+            fingerprint.update(np.ascontiguousarray(array).tobytes())
+            fingerprint.update(str(array.shape).encode())
+
+        return fingerprint.digest()
+
+    def topology_signature(self):
+        """
+        Returns a summary of the truss' topology that ignores positions and ordering: its sorted node degrees
+        and support types. Different topologies can share one, but equal topologies always do.
+        """
+        degrees = np.bincount(self.members.ravel(), minlength=self.node_count())
+        degree_order = np.lexsort((degrees, self.support_types))
+
+        return (
+            self.member_count(),
+            degrees[degree_order].tobytes(),
+            self.support_types[degree_order].tobytes(),
+        )
+
+    def node_count(self):
+        return len(self.positions)
+
+    def member_count(self):
+        return len(self.members)
+
+    def set_pos(self, node_index, x, y):
+        if not self.position_is_mutable[node_index]:
+            raise Exception("Node does not have mutable position.")
+
+        self.__writable("positions")[node_index] = x, y
+
+    def moved(self, positions):
+        """Returns an offspring with the mutable nodes at {positions}, sharing every other array with this genome."""
+        genome = self.__shallow_copy()
+        genome.__replace("positions", np.where(self.position_is_mutable[:, None], positions, self.positions))
+
+        return genome
+
+    def randomize_position(self, node_index):
+        self.set_pos(node_index, 20 * (random.random() - 0.5), 20 * (random.random() - 0.5))
 
     def randomize_positions(self):
-        for genetic_node in self.nodes:
-            if genetic_node.position_is_mutable:
-                genetic_node.randomize_position()
+        for node_index in np.flatnonzero(self.position_is_mutable):
+            self.randomize_position(node_index)
 
-    def change_child_node(self, genetic_member):
-        if not genetic_member.child_is_mutable:
+    def change_child_node(self, member_index):
+        if not self.child_is_mutable[member_index]:
             raise Exception("Member's child is not mutable.")
 
-        possible_child_nodes = self.nodes.copy()
-        try:
-            possible_child_nodes.pop(
-                possible_child_nodes.index(genetic_member.parent_genetic_node)
-            )
-        except:
-            pass
-
-        for check_member in self.members:
-            if check_member.parent_genetic_node == genetic_member.parent_genetic_node:
-                # Members share a parent node, cannot change connection to this node
-                try:
-                    possible_child_nodes.pop(
-                        possible_child_nodes.index(check_member.parent_genetic_node)
-                    )
-                except:
-                    pass
+        parent_node_index = int(self.members[member_index, 0])
+        self.__set_child_node(member_index, self.__random_node_except(parent_node_index))
+
+        if self.debug_invariants:
+            self.check_invariants()
+
+    def __random_node_except(self, *excluded_node_indices, rng=None):
+        """
+        Returns a uniformly drawn node index other than {excluded_node_indices}, in constant time.
+        Draws the same as random.choice over the list of allowed indices, or from the numpy Generator {rng}.
+        """
+        allowed_count = self.node_count() - len(excluded_node_indices)
+        node_index = random.randrange(allowed_count) if rng is None else int(rng.integers(allowed_count))
+        for excluded_node_index in sorted(excluded_node_indices):
+            if node_index >= excluded_node_index:
+                node_index += 1
+
+        return node_index
+
+    def incident_members(self, node_index):
+        """Returns the set of indices of members starting or ending at {node_index}, do not modify it."""
+        return self.__get_incidence()[node_index]
+
+    def __get_incidence(self):
+        if self.__incidence is None:
+            self.__incidence = {node_index: set() for node_index in range(self.node_count())}
+            for member_index, (node_a, node_b) in enumerate(self.members.tolist()):
+                self.__incidence[node_a].add(member_index)
+                self.__incidence[node_b].add(member_index)
+
+        return self.__incidence
+
+    def check_invariants(self):
+        """Raises AssertionError if the incidence index or node ids disagree with the arrays."""
+        if self.__incidence is not None:
+            expected = {node_index: set() for node_index in range(self.node_count())}
+            for member_index, (node_a, node_b) in enumerate(self.members.tolist()):
+                expected[node_a].add(member_index)
+                expected[node_b].add(member_index)
+
+            if self.__incidence != expected:
+                raise AssertionError("Genome incidence index does not match its members.")
+
+        if len(np.unique(self.node_ids)) != self.node_count() or np.any(self.node_ids >= self.next_node_id):
+            raise AssertionError("Genome node ids are not unique.")
+        if self.member_count() and not 0 <= self.members.min() <= self.members.max() < self.node_count():
+            raise AssertionError("Genome member refers to a missing node.")
+
+    def __set_child_node(self, member_index, child_node_index):
+        incidence = self.__get_incidence()
+        old_child_node_index = int(self.members[member_index, 1])
+
+        # A self-connected member stays listed at its parent
+        if old_child_node_index != self.members[member_index, 0]:
+            incidence[old_child_node_index].discard(member_index)
+        incidence[child_node_index].add(member_index)
+
+        self.__writable("members")[member_index, 1] = child_node_index
+
+    def add_node(self, x, y, connected_node_a, connected_node_b):
+        """Adds a removable node at (x, y) with mutable members to two existing nodes, returns its index."""
+        new_node_index = self.node_count()
+        new_member_index = self.member_count()
+
+        self.__replace("node_ids", np.append(self.node_ids, np.int64(self.next_node_id)))
+        self.next_node_id += 1
+        self.__replace("positions", np.append(self.positions, [[x, y]], axis=0))
+        self.__replace("support_types", np.append(self.support_types, np.int8(0)))
+        self.__replace("applied_forces", np.append(self.applied_forces, [[0, 0]], axis=0))
+        self.__replace("position_is_mutable", np.append(self.position_is_mutable, True))
+        self.__replace("existance_is_mutable", np.append(self.existance_is_mutable, True))
+
+        self.__replace(
+            "members",
+            np.append(
+                self.members,
+                np.array(
+                    [[new_node_index, connected_node_a], [new_node_index, connected_node_b]],
+                    dtype=np.int32,
+                ),
+                axis=0,
+            ),
+        )
+        self.__replace("child_is_mutable", np.append(self.child_is_mutable, [True, True]))
+
+        if self.__incidence is not None:
+            self.__incidence[new_node_index] = {new_member_index, new_member_index + 1}
+            self.__incidence[connected_node_a].add(new_member_index)
+            self.__incidence[connected_node_b].add(new_member_index + 1)
+
+        if self.debug_invariants:
+            self.check_invariants()
+
+        return new_node_index
+
+    def add_member(self, node_a, node_b):
+        """Adds a member from {node_a} to {node_b} with a mutable child, returns its index."""
+        self.__replace(
+            "members",
+            np.append(self.members, np.array([[node_a, node_b]], dtype=np.int32), axis=0),
+        )
+        self.__replace("child_is_mutable", np.append(self.child_is_mutable, True))
+
+        member_index = self.member_count() - 1
+        if self.__incidence is not None:
+            self.__incidence[node_a].add(member_index)
+            self.__incidence[node_b].add(member_index)
 
-        genetic_member.change_child_node(random.choice(possible_child_nodes))
+        if self.debug_invariants:
+            self.check_invariants()
+
+        return member_index
+
+    def remove_node(self, node_index, rng=None):
+        """
+        Removes the node at {node_index}, the last node taking its index.
+        Reconnected members draw their new node from the numpy Generator {rng} if given, from random otherwise.
+        Members hanging off it are reconnected elsewhere and members leaving it are dropped, the last members
+        taking their indices, so apart from copying shared arrays this takes time proportional to the degree
+        of the removed and the last node.
+        """
+        if not self.existance_is_mutable[node_index]:
+            raise Exception("Node does not have mutable existance.")
+
+        incidence = self.__get_incidence()
+
+        for member_index in sorted(incidence[node_index], reverse=True):
+            parent_node_index, child_node_index = self.members[member_index].tolist()
+            if child_node_index == node_index and parent_node_index != node_index:
+                self.__set_child_node(
+                    member_index, self.__random_node_except(parent_node_index, node_index, rng=rng)
+                )
+
+        # Highest first, so the last member is never one still to be removed
+        for member_index in sorted(incidence[node_index], reverse=True):
+            self.__remove_member(member_index)
+
+        last_node_index = self.node_count() - 1
+        if node_index != last_node_index:
+            for name in self.__node_array_names:
+                array = self.__writable(name)
+                array[node_index] = array[last_node_index]
+
+            members = self.__writable("members")
+            for member_index in incidence[last_node_index]:
+                members[member_index][members[member_index] == last_node_index] = node_index
+            incidence[node_index] = incidence[last_node_index]
+
+        del incidence[last_node_index]
+        for name in self.__node_array_names:
+            self.__truncate(name, last_node_index)
+
+        if self.debug_invariants:
+            self.check_invariants()
+
+    def remove_nodes(self, node_indices, rng):
+        """
+        Removes the nodes at {node_indices} in a few array operations, keeping the order of the other nodes.
+        Members hanging off them are reconnected to a remaining node drawn from the numpy Generator {rng},
+        members leaving them are dropped, as removing them one at a time with remove_node would.
+        """
+        if not np.all(self.existance_is_mutable[node_indices]):
+            raise Exception("Node does not have mutable existance.")
+
+        removed_nodes = np.zeros(self.node_count(), dtype=bool)
+        removed_nodes[node_indices] = True
+        kept_nodes = np.flatnonzero(~removed_nodes)
+        new_node_indices = np.cumsum(~removed_nodes) - 1
+
+        members = self.members.copy()
+        rewired_members = removed_nodes[members[:, 1]] & ~removed_nodes[members[:, 0]]
+        if rewired_members.any():
+            # Uniform over the kept nodes but the parent
+            draws = rng.integers(len(kept_nodes) - 1, size=int(rewired_members.sum()))
+            draws += draws >= new_node_indices[members[rewired_members, 0]]
+            members[rewired_members, 1] = kept_nodes[draws]
+
+        kept_members = ~removed_nodes[members[:, 0]]
+        self.__replace("members", new_node_indices[members[kept_members]].astype(np.int32))
+        self.__replace("child_is_mutable", self.child_is_mutable[kept_members])
+        for name in self.__node_array_names:
+            self.__replace(name, getattr(self, name)[kept_nodes])
+
+        self.__incidence = None
+
+        if self.debug_invariants:
+            self.check_invariants()
+
+    def __remove_member(self, member_index):
+        """Removes the member at {member_index}, the last member taking its index."""
+        incidence = self.__get_incidence()
+        last_member_index = self.member_count() - 1
+
+        for node_index in self.members[member_index].tolist():
+            incidence[node_index].discard(member_index)
+
+        if member_index != last_member_index:
+            for node_index in self.members[last_member_index].tolist():
+                incidence[node_index].discard(last_member_index)
+                incidence[node_index].add(member_index)
+
+            self.__writable("members")[member_index] = self.members[last_member_index]
+            self.__writable("child_is_mutable")[member_index] = self.child_is_mutable[last_member_index]
+
+        self.__truncate("members", last_member_index)
+        self.__truncate("child_is_mutable", last_member_index)
 
     def create_mutation(
         self,
@@ -132,90 +565,662 @@ class Genome:
         new_node_chance=0.01,
         remove_node_chance=0.01,
         change_member_connection_chance=0.01,
+        infeasible_retries=0,
+        new_member_chance=0,
+    ):
+        # An offspring failing check_feasibility is drawn again up to {infeasible_retries} times,
+        # the last one is returned either way.
+        # A member added with {new_member_chance} makes the truss statically indeterminate,
+        # which only a StiffnessSolver can solve.
+        for __ in range(infeasible_retries):
+            mutated_genome = self.__mutated(
+                position_mutation_chance,
+                position_mutation_rate,
+                new_node_chance,
+                remove_node_chance,
+                change_member_connection_chance,
+                new_member_chance,
+            )
+            if mutated_genome.check_feasibility() == FeasibilityStatus.FEASIBLE:
+                return mutated_genome
+
+        return self.__mutated(
+            position_mutation_chance,
+            position_mutation_rate,
+            new_node_chance,
+            remove_node_chance,
+            change_member_connection_chance,
+            new_member_chance,
+        )
+
+    def __mutated(
+        self,
+        position_mutation_chance,
+        position_mutation_rate,
+        new_node_chance,
+        remove_node_chance,
+        change_member_connection_chance,
+        new_member_chance,
     ):
-        mutated_genome = deepcopy(self)
+        # Offspring share the parent's arrays until a mutation writes to them
+        mutated_genome = self.__shallow_copy()
+        mutated_genome.identical_to_parent = True
+        operators = Genome.MutationOperators.NONE
 
         if random.random() <= new_node_chance:
-            child_node_a, child_node_b = random.sample(mutated_genome.nodes, k=2)
-            
-            new_node = self.GeneticNode(
-                0, 0, mutable_position=True, mutable_existance=True
-            )
-            new_node.randomize_position()
-            
-            mutated_genome.nodes.append(new_node)
-            
-            mutated_genome.members.append(
-                self.GeneticMember(
-                    new_node,
-                    child_node_a,
-                    mutable_child=True,
-                )
-            )
-            mutated_genome.members.append(
-                self.GeneticMember(
-                    new_node,
-                    child_node_b,
-                    mutable_child=True,
-                )
+            child_node_a, child_node_b = random.sample(range(mutated_genome.node_count()), k=2)
+
+            mutated_genome.add_node(
+                20 * (random.random() - 0.5),
+                20 * (random.random() - 0.5),
+                child_node_a,
+                child_node_b,
             )
+            operators |= Genome.MutationOperators.ADD_NODE
 
-        for genetic_node in mutated_genome.nodes:
+        node_index = 0
+        while node_index < mutated_genome.node_count():
             # Changing position of a node
             if (
-                genetic_node.position_is_mutable
+                mutated_genome.position_is_mutable[node_index]
                 and random.random() <= position_mutation_chance
             ):
-                genetic_node.set_pos(
-                    random.normalvariate(genetic_node.node.x, position_mutation_rate),
-                    random.normalvariate(genetic_node.node.y, position_mutation_rate),
+                x, y = mutated_genome.positions[node_index]
+                mutated_genome.set_pos(
+                    node_index,
+                    random.normalvariate(x, position_mutation_rate),
+                    random.normalvariate(y, position_mutation_rate),
                 )
+                operators |= Genome.MutationOperators.POSITION
 
-            # Node deleted
+            # Node deleted, the last node moves into this index
             if (
-                genetic_node.existance_is_mutable
+                mutated_genome.existance_is_mutable[node_index]
                 and random.random() <= remove_node_chance
             ):
-                mutated_genome.nodes.pop(mutated_genome.nodes.index(genetic_node))
-                for member_index, mem in reversed(list(enumerate(mutated_genome.members))):
-                    genetic_member = mutated_genome.members[member_index]
-
-                    if genetic_member.child_genetic_node is genetic_node:
-                        mutated_genome.change_child_node(genetic_member)
+                mutated_genome.remove_node(node_index)
+                operators |= Genome.MutationOperators.REMOVE_NODE
+                continue
 
-                    if genetic_member.parent_genetic_node is genetic_node:
-                        mutated_genome.members.pop(member_index)
+            node_index += 1
 
         # Change member connection
-        for genetic_member in mutated_genome.members:
+        for member_index in range(mutated_genome.member_count()):
             if (
-                genetic_member.child_is_mutable
+                mutated_genome.child_is_mutable[member_index]
                 and random.random() <= change_member_connection_chance
             ):
-                mutated_genome.change_child_node(genetic_member)
+                mutated_genome.change_child_node(member_index)
+                operators |= Genome.MutationOperators.REWIRE
 
+        # Only drawn when enabled, so runs without it keep their random sequence
+        if new_member_chance and random.random() <= new_member_chance:
+            mutated_genome.add_member(*random.sample(range(mutated_genome.node_count()), k=2))
+            operators |= Genome.MutationOperators.ADD_MEMBER
+
+        mutated_genome.mutation_operators = int(operators)
         return mutated_genome
 
+    @staticmethod
+    def mutate_population(
+        genomes,
+        rng,
+        position_mutation_chance=0.01,
+        position_mutation_rate=0.1,
+        new_node_chance=0.01,
+        remove_node_chance=0.01,
+        change_member_connection_chance=0.01,
+        infeasible_retries=0,
+        new_member_chance=0,
+    ):
+        """
+        Returns one offspring per genome of {genomes}, mutated with the same chances as create_mutation.
+        Every random number comes from the numpy Generator {rng}, drawn for the whole population in a few array calls,
+        so a seeded {rng} reproduces the same offspring. Only offspring failing check_feasibility are drawn again.
+        """
+        mutation_parameters = (
+            position_mutation_chance,
+            position_mutation_rate,
+            new_node_chance,
+            remove_node_chance,
+            change_member_connection_chance,
+            new_member_chance,
+        )
+
+        offspring = Genome.__mutated_batch(genomes, rng, *mutation_parameters)
+        for __ in range(infeasible_retries):
+            retried = [
+                genome_index
+                for genome_index, genome in enumerate(offspring)
+                if genome.check_feasibility() != FeasibilityStatus.FEASIBLE
+            ]
+            if not retried:
+                break
+
+            retried_offspring = Genome.__mutated_batch(
+                [genomes[genome_index] for genome_index in retried], rng, *mutation_parameters
+            )
+            for genome_index, genome in zip(retried, retried_offspring):
+                offspring[genome_index] = genome
+
+        return offspring
+
+    @staticmethod
+    def __mutated_batch(
+        genomes,
+        rng,
+        position_mutation_chance,
+        position_mutation_rate,
+        new_node_chance,
+        remove_node_chance,
+        change_member_connection_chance,
+        new_member_chance,
+    ):
+        genome_count = len(genomes)
+        offspring = [genome.__shallow_copy() for genome in genomes]
+        for genome in offspring:
+            genome.identical_to_parent = True
+            genome.mutation_operators = 0
+
+        if not genome_count:
+            return offspring
+
+        # New nodes at a random position, connected to two distinct random nodes
+        node_counts = np.array([genome.node_count() for genome in genomes])
+        adds_node = rng.random(genome_count) <= new_node_chance
+        new_node_positions = 20 * (rng.random((genome_count, 2)) - 0.5)
+        connected_node_a = rng.integers(node_counts)
+        connected_node_b = rng.integers(node_counts - 1)
+        connected_node_b += connected_node_b >= connected_node_a
+
+        for genome_index in np.flatnonzero(adds_node):
+            x, y = new_node_positions[genome_index].tolist()
+            offspring[genome_index].add_node(
+                x, y, int(connected_node_a[genome_index]), int(connected_node_b[genome_index])
+            )
+            offspring[genome_index].mutation_operators |= Genome.MutationOperators.ADD_NODE
+        node_counts += adds_node
+
+        # Position changes and removals, drawn for every node of the population
+        node_offsets = np.concatenate([[0], np.cumsum(node_counts)])
+        moves_node = rng.random(node_offsets[-1]) <= position_mutation_chance
+        position_offsets = rng.normal(0, position_mutation_rate, (node_offsets[-1], 2))
+        removes_node = rng.random(node_offsets[-1]) <= remove_node_chance
+
+        # Only visiting the genomes with a node drawn
+        drawn_nodes = np.flatnonzero(moves_node | removes_node)
+        for genome_index in np.unique(np.searchsorted(node_offsets, drawn_nodes, side="right") - 1).tolist():
+            genome = offspring[genome_index]
+            node_slice = slice(node_offsets[genome_index], node_offsets[genome_index + 1])
+
+            moved_nodes = moves_node[node_slice] & genome.position_is_mutable
+            if moved_nodes.any():
+                genome.__writable("positions")[moved_nodes] += position_offsets[node_slice][moved_nodes]
+                genome.mutation_operators |= Genome.MutationOperators.POSITION
+
+            removed_nodes = np.flatnonzero(removes_node[node_slice] & genome.existance_is_mutable)
+            if len(removed_nodes):
+                genome.remove_nodes(removed_nodes, rng)
+                genome.mutation_operators |= Genome.MutationOperators.REMOVE_NODE
+
+        # Member connection changes, drawn for every member of the population
+        member_counts = np.array([genome.member_count() for genome in offspring])
+        member_offsets = np.concatenate([[0], np.cumsum(member_counts)])
+        rewires_member = rng.random(member_offsets[-1]) <= change_member_connection_chance
+        child_draws = rng.random(member_offsets[-1])
+
+        drawn_members = np.flatnonzero(rewires_member)
+        for genome_index in np.unique(np.searchsorted(member_offsets, drawn_members, side="right") - 1).tolist():
+            genome = offspring[genome_index]
+            member_slice = slice(member_offsets[genome_index], member_offsets[genome_index + 1])
+            rewired_members = np.flatnonzero(rewires_member[member_slice] & genome.child_is_mutable)
+
+            for member_index, child_draw in zip(
+                rewired_members.tolist(), child_draws[member_slice][rewired_members].tolist()
+            ):
+                # Uniform over every node but the parent, as change_child_node draws
+                parent_node_index = int(genome.members[member_index, 0])
+                child_node_index = int(child_draw * (genome.node_count() - 1))
+                child_node_index += child_node_index >= parent_node_index
+                genome.__set_child_node(member_index, child_node_index)
+                genome.mutation_operators |= Genome.MutationOperators.REWIRE
+
+            if genome.debug_invariants:
+                genome.check_invariants()
+
+        if new_member_chance:
+            node_counts = np.array([genome.node_count() for genome in offspring])
+            adds_member = rng.random(genome_count) <= new_member_chance
+            node_a = rng.integers(node_counts)
+            node_b = rng.integers(node_counts - 1)
+            node_b += node_b >= node_a
+
+            for genome_index in np.flatnonzero(adds_member):
+                offspring[genome_index].add_member(int(node_a[genome_index]), int(node_b[genome_index]))
+                offspring[genome_index].mutation_operators |= Genome.MutationOperators.ADD_MEMBER
+
+        return offspring
+
     def to_truss(self):
+        nodes = [
+            Truss.Node(x, y, Truss.Node.SupportTypes(support_type), Truss.Node.Force(fx, fy))
+            for (x, y), support_type, (fx, fy) in zip(
+                self.positions.tolist(), self.support_types.tolist(), self.applied_forces.tolist()
+            )
+        ]
+
         return Truss(
-            [genetic_node.node for genetic_node in self.nodes],
-            [genetic_member.member for genetic_member in self.members],
+            nodes,
+            [Truss.Member(nodes[a], nodes[b]) for a, b in self.members.tolist()],
         )
 
+    def check_feasibility(self):
+        """Returns the FeasibilityStatus of this genome's truss, FEASIBLE unless it can never be solved."""
+        return self.feasibility_checker.check(self.positions, self.members, self.support_types)
+
     def get_fitness(self):
         return self.to_truss().get_fitness_cost()
 
     def get_fitness_gentle(self):
+        return self.fitness_cache.get_or_compute(
+            self.fitness_cache.key(self, "fitness"), self.__get_fitness_uncached
+        )
+
+    def __get_fitness_uncached(self):
+        if self.check_feasibility() != FeasibilityStatus.FEASIBLE:
+            Genome.prescreen_rejection_count += 1
+            return self.unsolvable_fitness
+
+        Genome.solve_count += 1
         try:
             return self.get_fitness()
         except:
-            return 999999999999
-        
-    def get_assignment_fitness(self):
-        return self.to_truss().get_assignment_cost()
-    
-    def get_assignment_fitness_gentle(self):
-        try:
-            return self.get_assignment_fitness()
-        except:
-            return 999999999999
+            Genome.solve_failure_count += 1
+            return self.unsolvable_fitness
+
+    @staticmethod
+    def bridge_load_cases(truck_force=2000, wind_load=100):
+        """
+        Returns load cases for the default bridge: its own deck loads, a truck of {truck_force} N at each road node
+        and spread over the left half of the road, and a horizontal wind of {wind_load} N per metre of member height.
+        """
+        # The first 5 nodes are the road, see __init__
+        road_node_indices = range(5)
+        truck = Truss.Node.Force(0, -truck_force)
+        spread_truck = Truss.Node.Force(0, -truck_force / 3)
+
+        return [
+            Truss.LoadCase(name="deck"),
+            *Truss.LoadCase.moving_load(road_node_indices, truck),
+            Truss.LoadCase({0: spread_truck, 1: spread_truck, 2: spread_truck}, name="asymmetric"),
+            Truss.LoadCase(distributed_force=Truss.Member.DistributedForce(wind_load, 0), name="wind"),
+        ]
+
+    @staticmethod
+    def assignment_cache_kind(load_cases=None, solver=None, geometry_checker=None):
+        """
+        Returns the FitnessCache kind of assignment fitnesses under {load_cases}, solved by {solver},
+        of trusses that passed {geometry_checker}.
+        """
+        kind = "assignment"
+        if load_cases is not None:
+            kind = "assignment", tuple(load_case.key() for load_case in load_cases)
+
+        if solver is not None:
+            kind = kind, solver.key()
+
+        if geometry_checker is not None:
+            kind = kind, geometry_checker.key()
+
+        return kind
+
+    def get_load_case_forces(self, load_cases=None):
+        """
+        Returns (applied_forces, distributed_forces) of this genome's truss, with a leading load case axis
+        when {load_cases} are given. Genomes carry no distributed forces of their own.
+        """
+        distributed_forces = np.zeros((self.member_count(), 2))
+        if load_cases is None:
+            return self.applied_forces, distributed_forces
+
+        return Truss.LoadCase.stack(load_cases, self.applied_forces, distributed_forces)
+
+    def get_assignment_fitness(self, load_cases=None):
+        return self.to_truss().get_assignment_cost(load_cases)
+
+    def get_assignment_fitness_gentle(self, load_cases=None, solver=None):
+        return self.fitness_cache.get_or_compute(
+            self.fitness_cache.key(self, self.assignment_cache_kind(load_cases, solver)),
+            lambda: self.__get_assignment_fitness_uncached(load_cases, solver),
+        )
+
+    def get_assignment_result(self, load_cases=None, solver=None):
+        """
+        Returns an EvaluationResult with the assignment cost, or the reason the truss cannot be solved.
+        Solves the same way as evaluate_population, without raising or printing for unsolvable trusses.
+        With {load_cases} members are sized for the worst of them, and their utilizations are the worst ones.
+        With a StiffnessSolver as {solver} the feasibility checks are skipped, as they assume a determinate truss,
+        and mechanisms are reported as SINGULAR.
+        """
+        if solver is None:
+            status = self.check_feasibility()
+            if status != FeasibilityStatus.FEASIBLE:
+                return EvaluationResult(status)
+
+        applied_forces, distributed_forces = self.get_load_case_forces(load_cases)
+        solutions, lengths, solved = _solve_arrays(
+            solver,
+            self.positions[None],
+            self.members[None],
+            self.support_types,
+            applied_forces[None],
+            distributed_forces[None],
+        )
+        cost = Truss.get_assignment_cost_arrays(solutions, lengths, solved, self.node_count())[0]
+
+        if np.isnan(cost):
+            return EvaluationResult(FeasibilityStatus.SINGULAR)
+
+        utilizations = Truss.Member.get_utilizations(solutions[0, ..., : self.member_count()])
+        if load_cases is not None:
+            utilizations = utilizations.max(axis=0)
+
+        return EvaluationResult(FeasibilityStatus.FEASIBLE, float(cost), utilizations)
+
+    def __get_assignment_fitness_uncached(self, load_cases, solver):
+        result = self.get_assignment_result(load_cases, solver)
+
+        if result.is_feasible():
+            Genome.solve_count += 1
+            return result.cost
+
+        if result.status == FeasibilityStatus.SINGULAR:
+            Genome.solve_count += 1
+            Genome.solve_failure_count += 1
+        else:
+            Genome.prescreen_rejection_count += 1
+
+        return self.unsolvable_fitness
+
+
+def evaluate_population(
+    genomes,
+    cache=None,
+    reuse_factorizations=False,
+    prescreen=False,
+    load_cases=None,
+    solver=None,
+    geometry_checker=None,
+):
+    """
+    Returns an array of assignment fitnesses for {genomes}, solving every shared topology in one batched call.
+    Matches Genome.get_assignment_fitness_gentle, including its penalty for unsolvable trusses.
+    Fitnesses are stored on the genomes so unchanged offspring are not solved again,
+    a population must thus always be evaluated with the same {load_cases}, {solver} and {geometry_checker}.
+
+    {cache}: FitnessCache looked up before solving, Genome.fitness_cache by default.
+    {reuse_factorizations}: solve one genome at a time, re-solving offspring with a low-rank update
+    of their parent's factorization. Pays off for large trusses only.
+    {prescreen}: give trusses Genome.feasibility_checker rejects unsolvable_fitness without solving them.
+    {load_cases}: list of Truss.LoadCase, members are sized for the envelope of their forces.
+    {solver}: StiffnessSolver to solve with instead of the method of joints.
+    {prescreen} and {reuse_factorizations} only apply to the method of joints.
+    {geometry_checker}: GeometryChecker, trusses it rejects get unsolvable_fitness before any solve.
+    """
+    if cache is None:
+        cache = Genome.fitness_cache
+
+    fitnesses = np.full(len(genomes), Genome.unsolvable_fitness, dtype=np.float64)
+    cache_keys = {}
+    # Genomes that are identical to one queued earlier in this call, solved once and copied
+    duplicates = {}
+
+    groups = {}
+    for genome_index, genome in enumerate(genomes):
+        # Unchanged offspring and already evaluated genomes don't need another solve
+        if genome.assignment_fitness is not None:
+            fitnesses[genome_index] = genome.assignment_fitness
+            continue
+
+        cache_key = cache.key(genome, Genome.assignment_cache_kind(load_cases, solver, geometry_checker))
+        cached_fitness = cache.get(cache_key)
+        if cached_fitness is not None:
+            fitnesses[genome_index] = genome.assignment_fitness = cached_fitness
+            continue
+
+        if cache_key in cache_keys:
+            duplicates[genome_index] = cache_keys[cache_key]
+            continue
+        cache_keys[cache_key] = genome_index
+
+        group_key = (genome.node_count(), genome.member_count(), genome.support_types.tobytes())
+        groups.setdefault(group_key, []).append(genome_index)
+
+    for (node_count, member_count, __), genome_indices in groups.items():
+        if geometry_checker is not None:
+            statuses = geometry_checker.check_batch(
+                np.stack([genomes[genome_index].positions for genome_index in genome_indices]),
+                np.stack([genomes[genome_index].members for genome_index in genome_indices]),
+            )
+
+            rejected_indices = [
+                genome_index
+                for genome_index, status in zip(genome_indices, statuses)
+                if status != GeometryStatus.VALID
+            ]
+            for genome_index in rejected_indices:
+                genomes[genome_index].assignment_fitness = Genome.unsolvable_fitness
+            Genome.geometry_rejection_count += len(rejected_indices)
+
+            genome_indices = [
+                genome_index
+                for genome_index, status in zip(genome_indices, statuses)
+                if status == GeometryStatus.VALID
+            ]
+            if not genome_indices:
+                continue
+
+        if prescreen and solver is None:
+            statuses = Genome.feasibility_checker.check_batch(
+                np.stack([genomes[genome_index].positions for genome_index in genome_indices]),
+                np.stack([genomes[genome_index].members for genome_index in genome_indices]),
+                genomes[genome_indices[0]].support_types,
+            )
+
+            rejected_indices = [
+                genome_index
+                for genome_index, status in zip(genome_indices, statuses)
+                if status != FeasibilityStatus.FEASIBLE
+            ]
+            for genome_index in rejected_indices:
+                genomes[genome_index].assignment_fitness = Genome.unsolvable_fitness
+            Genome.prescreen_rejection_count += len(rejected_indices)
+
+            genome_indices = [
+                genome_index
+                for genome_index, status in zip(genome_indices, statuses)
+                if status == FeasibilityStatus.FEASIBLE
+            ]
+            if not genome_indices:
+                continue
+
+        group = [genomes[genome_index] for genome_index in genome_indices]
+
+        if reuse_factorizations and solver is None:
+            solutions, lengths, solved = _solve_reusing_factorizations(group, load_cases)
+        else:
+            load_case_forces = [genome.get_load_case_forces(load_cases) for genome in group]
+            solutions, lengths, solved = _solve_arrays(
+                solver,
+                np.stack([genome.positions for genome in group]),
+                np.stack([genome.members for genome in group]),
+                group[0].support_types,
+                np.stack([applied_forces for applied_forces, __ in load_case_forces]),
+                np.stack([distributed_forces for __, distributed_forces in load_case_forces]),
+            )
+        costs = Truss.get_assignment_cost_arrays(solutions, lengths, solved, node_count)
+
+        fitnesses[genome_indices] = np.where(np.isnan(costs), Genome.unsolvable_fitness, costs)
+        Genome.solve_count += len(group)
+        Genome.solve_failure_count += int(np.isnan(costs).sum())
+        for genome, fitness in zip(group, fitnesses[genome_indices].tolist()):
+            genome.assignment_fitness = fitness
+
+    for cache_key, genome_index in cache_keys.items():
+        cache.put(cache_key, genomes[genome_index].assignment_fitness)
+
+    for genome_index, original_index in duplicates.items():
+        fitnesses[genome_index] = genomes[genome_index].assignment_fitness = fitnesses[original_index]
+
+    return fitnesses
+
+
+def _solve_arrays(solver, positions, members, support_types, applied_forces, distributed_forces):
+    """Truss.solve_arrays, or the internal forces of {solver}.solve_arrays when a StiffnessSolver is given."""
+    if solver is None:
+        return Truss.solve_arrays(positions, members, support_types, applied_forces, distributed_forces)
+
+    internal_forces, __, lengths, solved = solver.solve_arrays(
+        positions, members, support_types, applied_forces, distributed_forces
+    )
+    return internal_forces, lengths, solved
+
+
+def _solve_reusing_factorizations(group, load_cases):
+    """solve_arrays for genomes of one group, going through Truss.solve_with_factorization genome by genome."""
+    solutions = []
+    lengths = []
+    solved = []
+
+    for genome in group:
+        applied_forces, distributed_forces = genome.get_load_case_forces(load_cases)
+        solution, genome_lengths, genome.factorization = Truss.solve_with_factorization(
+            genome.positions,
+            genome.members,
+            genome.support_types,
+            applied_forces,
+            distributed_forces,
+            genome.factorization,
+        )
+
+        solved.append(solution is not None)
+        # Only member forces are costed, the load case axis (if any) comes first
+        member_forces_shape = applied_forces.shape[:-2] + (genome.member_count(),)
+        solutions.append(
+            np.zeros(member_forces_shape) if solution is None else solution[..., : genome.member_count()]
+        )
+        lengths.append(genome_lengths)
+
+    return np.array(solutions), np.array(lengths), np.array(solved)
+
+
+def population_diversity(genomes, position_quantum=1e-3):
+    """
+    Returns diversity statistics of {genomes} as a dict: the fraction of distinct trusses
+    (by Genome.canonical_fingerprint), the number of distinct topologies (by Genome.topology_signature),
+    and the position spread, the root mean square distance of the movable seed nodes of Genome()
+    to their mean position across the population.
+    Only nodes that can't be removed count, as they are the same node in every genome. Nodes added by mutations
+    get ids per genome, so nodes sharing an id in two genomes need not have anything in common.
+    """
+    if not genomes:
+        return {"unique_fraction": 0.0, "topology_count": 0, "position_spread": 0.0}
+
+    fingerprints = {genome.canonical_fingerprint(position_quantum) for genome in genomes}
+    topologies = {genome.topology_signature() for genome in genomes}
+
+    node_ids = np.concatenate([genome.node_ids for genome in genomes])
+    positions = np.concatenate([genome.positions for genome in genomes])
+    seed_nodes = np.concatenate([genome.position_is_mutable & ~genome.existance_is_mutable for genome in genomes])
+
+    __, id_groups, id_counts = np.unique(node_ids[seed_nodes], return_inverse=True, return_counts=True)
+    position_spread = 0.0
+    if len(id_groups):
+        mean_positions = np.stack(
+            [np.bincount(id_groups, weights=positions[seed_nodes, axis]) / id_counts for axis in range(2)], axis=1
+        )
+        position_spread = float(
+            np.sqrt(np.mean(np.sum((positions[seed_nodes] - mean_positions[id_groups]) ** 2, axis=1)))
+        )
+
+    return {
+        "unique_fraction": len(fingerprints) / len(genomes),
+        "topology_count": len(topologies),
+        "position_spread": position_spread,
+    }
+
+
+def pack_population(genomes):
+    """
+    Concatenates the arrays of {genomes} into one flat array per field, with per genome node and member counts.
+    The result only holds plain numpy arrays, so it can be written to shared memory or an .npz file.
+    """
+    fitnesses = [genome.assignment_fitness for genome in genomes]
+
+    return {
+        "node_counts": np.array([genome.node_count() for genome in genomes], dtype=np.int32),
+        "next_node_ids": np.array([genome.next_node_id for genome in genomes], dtype=np.int64),
+        "node_ids": np.concatenate([genome.node_ids for genome in genomes]),
+        "member_counts": np.array([genome.member_count() for genome in genomes], dtype=np.int32),
+        "positions": np.concatenate([genome.positions for genome in genomes]).reshape(-1, 2),
+        "support_types": np.concatenate([genome.support_types for genome in genomes]),
+        "applied_forces": np.concatenate([genome.applied_forces for genome in genomes]).reshape(-1, 2),
+        "position_is_mutable": np.concatenate([genome.position_is_mutable for genome in genomes]),
+        "existance_is_mutable": np.concatenate([genome.existance_is_mutable for genome in genomes]),
+        "members": np.concatenate([genome.members for genome in genomes]).reshape(-1, 2),
+        "child_is_mutable": np.concatenate([genome.child_is_mutable for genome in genomes]),
+        "assignment_fitness": np.array(
+            [np.nan if fitness is None else fitness for fitness in fitnesses], dtype=np.float64
+        ),
+        "identical_to_parent": np.array(
+            [genome.identical_to_parent for genome in genomes], dtype=bool
+        ),
+        "mutation_operators": np.array([genome.mutation_operators for genome in genomes], dtype=np.uint8),
+    }
+
+
+def unpack_population(packed_population, start=0, stop=None):
+    """Rebuilds genomes {start} to {stop} from the output of pack_population, copying out of {packed_population}."""
+    node_offsets = np.concatenate([[0], np.cumsum(packed_population["node_counts"])])
+    member_offsets = np.concatenate([[0], np.cumsum(packed_population["member_counts"])])
+
+    if stop is None:
+        stop = len(packed_population["node_counts"])
+
+    genomes = []
+    for genome_index in range(start, stop):
+        node_slice = slice(node_offsets[genome_index], node_offsets[genome_index + 1])
+        member_slice = slice(member_offsets[genome_index], member_offsets[genome_index + 1])
+        fitness = packed_population["assignment_fitness"][genome_index]
+
+        mutation_state = {}
+        if "mutation_operators" in packed_population:
+            mutation_state["mutation_operators"] = int(packed_population["mutation_operators"][genome_index])
+
+        # Populations packed before nodes had ids get them from __setstate__
+        node_id_state = {}
+        if "node_ids" in packed_population:
+            node_id_state = {
+                "node_ids": packed_population["node_ids"][node_slice].copy(),
+                "next_node_id": int(packed_population["next_node_ids"][genome_index]),
+            }
+
+        genome = Genome.__new__(Genome)
+        genome.__setstate__(
+            {
+                **node_id_state,
+                "positions": packed_population["positions"][node_slice].copy(),
+                "support_types": packed_population["support_types"][node_slice].copy(),
+                "applied_forces": packed_population["applied_forces"][node_slice].copy(),
+                "position_is_mutable": packed_population["position_is_mutable"][node_slice].copy(),
+                "existance_is_mutable": packed_population["existance_is_mutable"][node_slice].copy(),
+                "members": packed_population["members"][member_slice].copy(),
+                "child_is_mutable": packed_population["child_is_mutable"][member_slice].copy(),
+                "assignment_fitness": None if np.isnan(fitness) else float(fitness),
+                "identical_to_parent": bool(packed_population["identical_to_parent"][genome_index]),
+                **mutation_state,
+            }
+        )
+        genomes.append(genome)
+
+    return genomes
@@ -0,0 +1,285 @@
+import numpy as np
+from enum import Enum
+
+
+class GeometryStatus(Enum):
+    VALID = 0
+    # Two nodes are closer than min_node_distance
+    NODES_TOO_CLOSE = 1
+    # A node lies on a member it is not an end of
+    NODE_ON_MEMBER = 2
+    # Two members that share no node cross
+    CROSSING_MEMBERS = 3
+
+
+class GeometryChecker:
+    """
+    Finds trusses that cannot be built as drawn, without solving them: nodes closer than {min_node_distance},
+    nodes within {clearance} of a member they are not an end of, and members crossing without a shared node.
+
+    Nodes and members are bucketed in a uniform grid, a member in every cell its bounding box overlaps,
+    so only nodes and members sharing a cell are compared. Bucketing is a sort of the (cell, item) pairs,
+    which takes O((n + m + k) log(n + m)) for n nodes, m members and k candidate pairs,
+    as long as members span few cells, which the cell size (the median member length) keeps true.
+    Trusses with at most {brute_force_size} nodes and members compare every pair instead, which is faster for them.
+    """
+
+    def __init__(self, min_node_distance=0.5, clearance=1e-3, brute_force_size=32):
+        self.min_node_distance = min_node_distance
+        self.clearance = clearance
+        self.brute_force_size = brute_force_size
+
+    def key(self):
+        """Returns what fitnesses computed with this checker depend on, for FitnessCache kinds."""
+        return "geometry", self.min_node_distance, self.clearance
+
+    def check(self, positions, members):
+        """Returns the first GeometryStatus the truss fails, or VALID."""
+        if len(self.close_nodes(positions)):
+            return GeometryStatus.NODES_TOO_CLOSE
+
+        cell_size, member_cells = self.__index(positions, members)
+        if len(self.nodes_on_members(positions, members, cell_size, member_cells)):
+            return GeometryStatus.NODE_ON_MEMBER
+        if len(self.crossing_members(positions, members, cell_size, member_cells)):
+            return GeometryStatus.CROSSING_MEMBERS
+
+        return GeometryStatus.VALID
+
+    def check_batch(self, positions, members):
+        """
+        check for a stack of trusses sharing node and member count, positions being (B, n, 2) and members (B, m, 2).
+        Small trusses are checked all at once, larger ones one by one. Returns a list of statuses.
+        """
+        batch_size, node_count = positions.shape[:2]
+        if max(node_count, members.shape[1]) > self.brute_force_size:
+            return [self.check(truss_positions, truss_members) for truss_positions, truss_members in zip(positions, members)]
+
+        statuses = np.full(batch_size, GeometryStatus.VALID)
+
+        node_a, node_b = np.triu_indices(node_count, 1)
+        distances = np.linalg.norm(positions[:, node_a] - positions[:, node_b], axis=2)
+        statuses[np.any(distances < self.min_node_distance, axis=1)] = GeometryStatus.NODES_TOO_CLOSE
+
+        batch_index = np.arange(batch_size)[:, None]
+        start = positions[batch_index, members[:, :, 0]]
+        delta = positions[batch_index, members[:, :, 1]] - start
+        squared_lengths = np.einsum("bmi,bmi->bm", delta, delta)[:, None]
+        safe_lengths = np.where(squared_lengths > 0, squared_lengths, 1)
+        # (B, n, m) of every node against every member
+        offsets = positions[:, :, None] - start[:, None]
+        along = np.einsum("bnmi,bmi->bnm", offsets, delta) / safe_lengths
+        across = np.abs(offsets[..., 0] * delta[:, None, :, 1] - offsets[..., 1] * delta[:, None, :, 0]) / np.sqrt(
+            safe_lengths
+        )
+        node_indices = np.arange(node_count)[None, :, None]
+        on_member = (
+            (along > 0)
+            & (along < 1)
+            & (across <= self.clearance)
+            & (squared_lengths > 0)
+            & (members[:, None, :, 0] != node_indices)
+            & (members[:, None, :, 1] != node_indices)
+        )
+        statuses[(statuses == GeometryStatus.VALID) & np.any(on_member, axis=(1, 2))] = GeometryStatus.NODE_ON_MEMBER
+
+        member_a, member_b = np.triu_indices(members.shape[1], 1)
+        ends_a, ends_b = members[:, member_a], members[:, member_b]
+        disjoint = (ends_a[..., :, None] != ends_b[..., None, :]).all(axis=(2, 3))
+        a_start, a_end = positions[batch_index, ends_a[..., 0]], positions[batch_index, ends_a[..., 1]]
+        b_start, b_end = positions[batch_index, ends_b[..., 0]], positions[batch_index, ends_b[..., 1]]
+        crossing = (
+            disjoint
+            & (_orientation(a_start, a_end, b_start) * _orientation(a_start, a_end, b_end) < 0)
+            & (_orientation(b_start, b_end, a_start) * _orientation(b_start, b_end, a_end) < 0)
+        )
+        statuses[(statuses == GeometryStatus.VALID) & np.any(crossing, axis=1)] = GeometryStatus.CROSSING_MEMBERS
+
+        return statuses.tolist()
+
+    def find_violations(self, positions, members):
+        """Returns every violation as a dict of (k, 2) index arrays: node pairs, (node, member) pairs and member pairs."""
+        cell_size, member_cells = self.__index(positions, members)
+
+        return {
+            "close_nodes": self.close_nodes(positions),
+            "nodes_on_members": self.nodes_on_members(positions, members, cell_size, member_cells),
+            "crossing_members": self.crossing_members(positions, members, cell_size, member_cells),
+        }
+
+    def close_nodes(self, positions):
+        """Returns the (a, b) node pairs, a < b, closer than {min_node_distance}."""
+        if len(positions) < 2 or self.min_node_distance <= 0:
+            return np.zeros((0, 2), dtype=np.intp)
+
+        if len(positions) <= self.brute_force_size:
+            pairs = np.stack(np.triu_indices(len(positions), 1), axis=1)
+        else:
+            pairs = self.__close_node_candidates(positions)
+        distances = np.linalg.norm(positions[pairs[:, 0]] - positions[pairs[:, 1]], axis=1)
+
+        return pairs[distances < self.min_node_distance]
+
+    def __close_node_candidates(self, positions):
+        # With cells as large as the distance, close nodes are in the same or a neighbouring cell
+        cells = np.floor(positions / self.min_node_distance).astype(np.int64)
+        cell_keys = _cell_keys(cells)
+        order = np.argsort(cell_keys, kind="stable")
+        sorted_keys = cell_keys[order]
+
+        pairs = []
+        for offset_x in (-1, 0, 1):
+            for offset_y in (-1, 0, 1):
+                neighbour_keys = _cell_keys(cells + (offset_x, offset_y))
+                starts = np.searchsorted(sorted_keys, neighbour_keys, side="left")
+                stops = np.searchsorted(sorted_keys, neighbour_keys, side="right")
+                node_a, node_b = _expand_ranges(np.arange(len(positions)), starts, stops)
+                pairs.append(np.stack([node_a, order[node_b]], axis=1))
+
+        pairs = np.concatenate(pairs)
+
+        return pairs[pairs[:, 0] < pairs[:, 1]]
+
+    def nodes_on_members(self, positions, members, cell_size=None, member_cells=None):
+        """Returns the (node, member) pairs of nodes within {clearance} of the inside of a member they don't end."""
+        if not len(members):
+            return np.zeros((0, 2), dtype=np.intp)
+        if cell_size is None:
+            cell_size, member_cells = self.__index(positions, members)
+
+        if member_cells is None:
+            node_indices, member_indices = (
+                indices.ravel() for indices in np.meshgrid(np.arange(len(positions)), np.arange(len(members)))
+            )
+        else:
+            cell_keys, cell_members = member_cells
+            node_keys = _cell_keys(np.floor(positions / cell_size).astype(np.int64))
+            starts = np.searchsorted(cell_keys, node_keys, side="left")
+            stops = np.searchsorted(cell_keys, node_keys, side="right")
+            node_indices, entry_indices = _expand_ranges(np.arange(len(positions)), starts, stops)
+            member_indices = cell_members[entry_indices]
+
+        ends = members[member_indices]
+        candidates = (ends[:, 0] != node_indices) & (ends[:, 1] != node_indices)
+        node_indices, member_indices, ends = node_indices[candidates], member_indices[candidates], ends[candidates]
+
+        start = positions[ends[:, 0]]
+        delta = positions[ends[:, 1]] - start
+        squared_lengths = np.einsum("ij,ij->i", delta, delta)
+        offsets = positions[node_indices] - start
+        along = np.einsum("ij,ij->i", offsets, delta) / np.where(squared_lengths > 0, squared_lengths, 1)
+        across = np.abs(offsets[:, 0] * delta[:, 1] - offsets[:, 1] * delta[:, 0]) / np.sqrt(
+            np.where(squared_lengths > 0, squared_lengths, 1)
+        )
+
+        on_member = (along > 0) & (along < 1) & (across <= self.clearance) & (squared_lengths > 0)
+        pairs = np.stack([node_indices[on_member], member_indices[on_member]], axis=1)
+
+        return _unique_pairs(pairs, len(members))
+
+    def crossing_members(self, positions, members, cell_size=None, member_cells=None):
+        """Returns the (a, b) member pairs, a < b, that share no node and intersect."""
+        if len(members) < 2:
+            return np.zeros((0, 2), dtype=np.intp)
+        if cell_size is None:
+            cell_size, member_cells = self.__index(positions, members)
+
+        if member_cells is None:
+            pairs = np.stack(np.triu_indices(len(members), 1), axis=1)
+        else:
+            # Every later entry of the same cell is a candidate, cells being contiguous after the sort
+            cell_keys, cell_members = member_cells
+            entry_indices = np.arange(len(cell_keys))
+            stops = np.searchsorted(cell_keys, cell_keys, side="right")
+            first_entries, second_entries = _expand_ranges(entry_indices, entry_indices + 1, stops)
+
+            pairs = _unique_pairs(
+                np.sort(np.stack([cell_members[first_entries], cell_members[second_entries]], axis=1), axis=1),
+                len(members),
+            )
+        ends_a = members[pairs[:, 0]]
+        ends_b = members[pairs[:, 1]]
+        disjoint = (ends_a[:, :, None] != ends_b[:, None, :]).all(axis=(1, 2))
+        pairs, ends_a, ends_b = pairs[disjoint], ends_a[disjoint], ends_b[disjoint]
+
+        a_start, a_end = positions[ends_a[:, 0]], positions[ends_a[:, 1]]
+        b_start, b_end = positions[ends_b[:, 0]], positions[ends_b[:, 1]]
+        side_b_start = _orientation(a_start, a_end, b_start)
+        side_b_end = _orientation(a_start, a_end, b_end)
+        side_a_start = _orientation(b_start, b_end, a_start)
+        side_a_end = _orientation(b_start, b_end, a_end)
+
+        # Proper crossings only, ends touching or lying on the other member are found by nodes_on_members
+        crossing = (side_b_start * side_b_end < 0) & (side_a_start * side_a_end < 0)
+
+        return pairs[crossing]
+
+    def __index(self, positions, members):
+        """Returns the cell size and member cells of the grid, with None cells when every pair is compared."""
+        if max(len(positions), len(members)) <= self.brute_force_size:
+            return None, None
+
+        cell_size = self.__cell_size(positions, members)
+        return cell_size, self.__member_cells(positions, members, cell_size)
+
+    @staticmethod
+    def __cell_size(positions, members):
+        if not len(members):
+            return 1.0
+
+        lengths = np.linalg.norm(positions[members[:, 1]] - positions[members[:, 0]], axis=1)
+        median_length = float(np.median(lengths))
+
+        return median_length if median_length > 0 else 1.0
+
+    def __member_cells(self, positions, members, cell_size):
+        """Returns the sorted cell keys of every (cell, member) pair, and the member of each, for members padded by clearance."""
+        ends = positions[members]
+        low = np.floor((ends.min(axis=1) - self.clearance) / cell_size).astype(np.int64)
+        high = np.floor((ends.max(axis=1) + self.clearance) / cell_size).astype(np.int64)
+        spans = high - low + 1
+        cell_counts = spans[:, 0] * spans[:, 1]
+
+        member_indices = np.repeat(np.arange(len(members)), cell_counts)
+        # Position of each entry within its member's block of cells, unravelled over the member's span
+        within = np.arange(len(member_indices)) - np.repeat(np.cumsum(cell_counts) - cell_counts, cell_counts)
+        cells = low[member_indices] + np.stack(
+            [within // spans[member_indices, 1], within % spans[member_indices, 1]], axis=1
+        )
+
+        cell_keys = _cell_keys(cells)
+        order = np.argsort(cell_keys, kind="stable")
+
+        return cell_keys[order], member_indices[order]
+
+
+def _cell_keys(cells):
+    # Cells far enough out to collide are only compared needlessly, never missed
+    return cells[:, 0] * 2_147_483_647 + cells[:, 1]
+
+
+def _unique_pairs(pairs, second_count):
+    """np.unique(pairs, axis=0) for pairs of non-negative indices below {second_count} in their second column."""
+    keys = np.unique(pairs[:, 0].astype(np.int64) * second_count + pairs[:, 1])
+
+    return np.stack([keys // second_count, keys % second_count], axis=1)
+
+
+def _expand_ranges(items, starts, stops):
+    """Returns (item, index) for every index in [starts[i], stops[i]) of every items[i]."""
+    counts = np.maximum(stops - starts, 0)
+    repeated_items = np.repeat(items, counts)
+    indices = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+
+    return repeated_items, indices
+
+
+def _orientation(start, end, point):
+    """Sign of the cross product of end - start and point - start: 1 left, -1 right, 0 on the line."""
+    direction = end - start
+    offset = point - start
+    cross = direction[..., 0] * offset[..., 1] - direction[..., 1] * offset[..., 0]
+    # Relative to the magnitudes involved, so points on the line read as on it despite rounding
+    scale = np.abs(direction).sum(axis=-1) * np.abs(offset).sum(axis=-1)
+
+    return np.sign(np.where(np.abs(cross) <= 1e-12 * scale, 0, cross))
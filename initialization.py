@@ -0,0 +1,203 @@
+import pickle
+import random
+import numpy as np
+
+from pathlib import Path
+from checkpoints import CheckpointStore
+from genetics import Genome, evaluate_population
+from feasibility import FeasibilityStatus
+from geometry import GeometryStatus
+
+
+def load_warm_start_genomes(
+    directory="truss_checkpoints", count=10, position_quantum=1e-3, evaluate=evaluate_population
+):
+    """
+    Returns up to {count} distinct genomes, best first, from the best checkpoint of every .trusslog in {directory}
+    and from the .truss files older versions pickled a run's best genome to.
+    Stored fitnesses are dropped, as earlier runs may have used other load cases, another solver or
+    another fitness function, and candidates are ranked by {evaluate} (e.g. Evolver.evaluate) instead.
+    Candidates it gives unsolvable_fitness, e.g. those the evolver's geometry checker rejects, are left out.
+    """
+    directory = Path(directory)
+    if not count or not directory.is_dir():
+        return []
+
+    candidates = []
+    for path in sorted(directory.glob("*.trusslog")):
+        checkpoints = CheckpointStore(path)
+        best_entry = checkpoints.best_entry()
+        if best_entry is not None:
+            candidates += checkpoints.load(best_entry)["population"]
+
+    # Named "<time> <fitness>.truss", Genome.__setstate__ converts their object graph genes
+    for path in sorted(directory.glob("*.truss")):
+        with open(path, "rb") as file:
+            candidates.append(pickle.load(file))
+
+    genomes = []
+    fingerprints = set()
+    for genome in candidates:
+        fingerprint = genome.canonical_fingerprint(position_quantum)
+        if fingerprint in fingerprints:
+            continue
+
+        fingerprints.add(fingerprint)
+        genome.assignment_fitness = None
+        genome.mutation_operators = 0
+        genomes.append(genome)
+
+    if not genomes:
+        return []
+
+    fitnesses = evaluate(genomes)
+    order = [i for i in np.argsort(fitnesses, kind="stable") if fitnesses[i] < Genome.unsolvable_fitness]
+
+    return [genomes[i] for i in order[:count]]
+
+
+class PopulationBuilder:
+    """
+    Builds the starting population of an Evolver, see Evolver.initialize.
+
+    Topologies are grown as Evolver.initialize grows them, see Evolver.grow,
+    a whole round at once through evolver.mutate (so across the workers when it has any).
+    Then the mutable nodes of all grown genomes are placed together by Latin hypercube sampling over
+    {position_bounds}: the i-th mutable node of every genome takes a different stratum of each axis,
+    so the population covers the box instead of clumping where random mutations left the nodes.
+    Layouts failing the FeasibilityChecker (coincident nodes, colinear joints...) or with members shorter than
+    {min_member_length} get uniformly drawn positions again, up to {max_redraws} times, which costs no solve.
+    Genomes still failing keep the positions they were grown with, which evolver.geometry_checker accepts.
+    With {candidate_count} above 1, that many layouts are sampled per genome and only the cheapest one is kept,
+    all of them being solved in one batch.
+    With {warm_start_directory} set, up to {warm_start_fraction} of the population are the best genomes
+    of the checkpoints found there as evolver.evaluate ranks them, see load_warm_start_genomes.
+    """
+
+    def __init__(
+        self,
+        latin_hypercube=True,
+        position_bounds=(-10, 10),
+        max_redraws=5,
+        candidate_count=1,
+        min_member_length=1.0,
+        warm_start_directory=None,
+        warm_start_fraction=0.25,
+        rng=None,
+    ):
+        # {rng} is a numpy Generator for position draws, by default the evolver's or one seeded from the random module
+        self.latin_hypercube = latin_hypercube
+        self.position_bounds = position_bounds
+        self.max_redraws = max_redraws
+        self.candidate_count = candidate_count
+        self.min_member_length = min_member_length
+        self.warm_start_directory = warm_start_directory
+        self.warm_start_fraction = warm_start_fraction
+        self.rng = rng
+
+        # Of the last build: genomes taken from checkpoints, and position draws the feasibility checks rejected
+        self.warm_start_count = 0
+        self.rejection_count = 0
+
+    def build(self, evolver):
+        """Returns a population of evolver.population_size genomes for {evolver}."""
+        rng = self.rng
+        if rng is None:
+            rng = evolver.rng if evolver.rng is not None else np.random.default_rng(random.getrandbits(64))
+
+        warm_genomes = []
+        if self.warm_start_directory is not None:
+            warm_genomes = load_warm_start_genomes(
+                self.warm_start_directory,
+                int(round(evolver.population_size * self.warm_start_fraction)),
+                evolver.position_quantum,
+                evolver.evaluate,
+            )
+        self.warm_start_count = len(warm_genomes)
+
+        genomes = evolver.grow(evolver.population_size - len(warm_genomes))
+
+        if self.latin_hypercube:
+            genomes = self.place_nodes(genomes, rng, evolver.evaluate, evolver.geometry_checker)
+
+        return warm_genomes + genomes
+
+    def place_nodes(self, genomes, rng, evaluate=None, geometry_checker=None):
+        """
+        Returns {genomes} with their mutable nodes placed by Latin hypercube sampling, feasible where possible.
+        With candidate_count above 1, the candidate layouts of every genome are solved together with {evaluate}
+        (e.g. Evolver.evaluate) and the cheapest is kept. Layouts {geometry_checker} rejects are redrawn too.
+        """
+        mutable_nodes = [np.flatnonzero(genome.position_is_mutable) for genome in genomes]
+        dimension_count = 2 * max((len(node_indices) for node_indices in mutable_nodes), default=0)
+        if not dimension_count:
+            return genomes
+
+        # Bounds are the same for both axes, or given per axis as ((x_low, y_low), (x_high, y_high))
+        low, high = (np.broadcast_to(np.asarray(bound, dtype=np.float64), 2) for bound in self.position_bounds)
+        candidate_count = self.candidate_count if evaluate is not None else 1
+        samples = self.latin_hypercube_samples(len(genomes) * candidate_count, dimension_count, rng)
+        samples = np.tile(low, dimension_count // 2) + np.tile(high - low, dimension_count // 2) * samples
+        samples = samples.reshape(len(genomes), candidate_count, dimension_count)
+
+        self.rejection_count = 0
+        candidates = []
+        for genome, node_indices, genome_samples in zip(genomes, mutable_nodes, samples):
+            candidates.append(
+                [
+                    self.__place_feasibly(
+                        genome, node_indices, sample[: 2 * len(node_indices)], low, high, rng, geometry_checker
+                    )
+                    for sample in genome_samples
+                ]
+            )
+
+        if candidate_count == 1:
+            return [genome_candidates[0] for genome_candidates in candidates]
+
+        fitnesses = evaluate([candidate for genome_candidates in candidates for candidate in genome_candidates])
+        best_candidates = fitnesses.reshape(len(genomes), candidate_count).argmin(axis=1)
+
+        return [genome_candidates[best] for genome_candidates, best in zip(candidates, best_candidates)]
+
+    def __place_feasibly(self, genome, node_indices, sample, low, high, rng, geometry_checker):
+        positions = genome.positions.copy()
+        positions[node_indices] = sample.reshape(-1, 2)
+        placed_genome = genome.moved(positions)
+
+        redraws = 0
+        while not self.__is_plausible(placed_genome, geometry_checker):
+            self.rejection_count += 1
+            if redraws == self.max_redraws:
+                # Keeping where mutations left the nodes rather than a layout known to be unsolvable,
+                # and always with a geometry checker, as grown genomes pass it but the layout does not
+                if geometry_checker is not None or self.__is_plausible(genome, None):
+                    return genome
+                return placed_genome
+
+            positions[node_indices] = rng.uniform(low, high, (len(node_indices), 2))
+            placed_genome = genome.moved(positions)
+            redraws += 1
+
+        return placed_genome
+
+    def __is_plausible(self, genome, geometry_checker):
+        # Members shorter than {min_member_length} are priced out by Truss.Member.get_fitness_costs anyway
+        member_lengths = np.linalg.norm(
+            genome.positions[genome.members[:, 1]] - genome.positions[genome.members[:, 0]], axis=1
+        )
+        if np.any(member_lengths < self.min_member_length):
+            return False
+
+        if geometry_checker is not None:
+            if geometry_checker.check(genome.positions, genome.members) != GeometryStatus.VALID:
+                return False
+
+        return genome.check_feasibility() == FeasibilityStatus.FEASIBLE
+
+    @staticmethod
+    def latin_hypercube_samples(sample_count, dimension_count, rng):
+        """Returns (sample_count, dimension_count) points in [0, 1) with one point in every 1/sample_count stratum of each axis."""
+        strata = rng.permuted(np.tile(np.arange(sample_count), (dimension_count, 1)), axis=1).T
+
+        return (strata + rng.random((sample_count, dimension_count))) / sample_count
@@ -0,0 +1,395 @@
+import hmac
+import io
+import multiprocessing as mp
+import os
+import queue
+import random
+import select
+import socket
+import struct
+import time
+import traceback
+import numpy as np
+
+from evolver import Evolver
+from genetics import pack_population, unpack_population
+from workers import get_default_worker_count
+
+
+def migration_targets(topology, island_index, island_count):
+    """Returns the islands {island_index} sends its migrants to, {topology} being "ring" or "full"."""
+    match topology:
+        case "ring":
+            return [(island_index + 1) % island_count] if island_count > 1 else []
+        case "full":
+            return [target for target in range(island_count) if target != island_index]
+
+    raise ValueError(f"Unknown migration topology {topology!r}.")
+
+
+def pack_migrants(genomes):
+    """Returns {genomes} as bytes for a channel, fitnesses included so they aren't solved again."""
+    payload = io.BytesIO()
+    np.savez(payload, **pack_population(genomes))
+
+    return payload.getvalue()
+
+
+def unpack_migrants(payload):
+    with np.load(io.BytesIO(payload)) as record:
+        return unpack_population({name: record[name] for name in record.files})
+
+
+class QueueChannel:
+    """
+    Carries migrants between islands on one machine, through one multiprocessing queue per island.
+    Create it before starting the islands, so every island process gets the queues.
+    """
+
+    def __init__(self, island_count):
+        self.island_count = island_count
+        self.__inboxes = [mp.Queue() for __ in range(island_count)]
+        self.__island_index = None
+
+    def open(self, island_index):
+        """Called in the process of island {island_index} before it sends or receives."""
+        self.__island_index = island_index
+
+        # Migrants still in flight to an island that has finished are dropped instead of blocking this one's exit
+        for inbox in self.__inboxes:
+            inbox.cancel_join_thread()
+
+    def send(self, island_index, payload):
+        self.__inboxes[island_index].put(payload)
+
+    def receive(self):
+        """Returns every payload sent to this island since the last call, without waiting."""
+        payloads = []
+        while True:
+            try:
+                payloads.append(self.__inboxes[self.__island_index].get_nowait())
+            except queue.Empty:
+                return payloads
+
+    def close(self):
+        pass
+
+
+class SocketChannel:
+    """
+    Carries migrants between islands over TCP, so islands can run on several machines.
+    Island i listens on addresses[i], a (host, port) pair, and every payload is sent over a new connection.
+    Migration is best effort: payloads to islands that are not listening (yet or anymore) are dropped.
+
+    Anyone who can reach an island can send it genomes. With a {secret} shared by all islands, every payload
+    carries an HMAC-SHA256 of it, and payloads without a valid one are dropped and counted in rejected_count.
+    """
+
+    __header = struct.Struct("<Q")
+
+    def __init__(self, addresses, timeout=5.0, secret=None, bind_host=None):
+        # Island i listens on {bind_host}, by default the host of addresses[i], "" listens on every interface,
+        # e.g. when other machines reach this one through an address it doesn't have
+        self.addresses = [tuple(address) for address in addresses]
+        self.island_count = len(self.addresses)
+        self.timeout = timeout
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.bind_host = bind_host
+        self.rejected_count = 0
+        self.__server = None
+
+    @classmethod
+    def localhost(cls, island_count, base_port=47000, timeout=5.0, secret=None):
+        """A channel for {island_count} islands on this machine, listening on consecutive ports from {base_port}."""
+        return cls(
+            [("127.0.0.1", base_port + island_index) for island_index in range(island_count)], timeout, secret
+        )
+
+    @staticmethod
+    def parse_addresses(text):
+        """Parses "host:port,host:port,..." into a list of (host, port), one per island."""
+        addresses = []
+        for address in text.split(","):
+            host, port = address.strip().rsplit(":", 1)
+            addresses.append((host, int(port)))
+
+        return addresses
+
+    def open(self, island_index):
+        host, port = self.addresses[island_index]
+
+        self.__server = socket.create_server((host if self.bind_host is None else self.bind_host, port))
+
+    def __signature(self, payload):
+        return b"" if self.secret is None else hmac.digest(self.secret, payload, "sha256")
+
+    def send(self, island_index, payload):
+        try:
+            with socket.create_connection(self.addresses[island_index], timeout=self.timeout) as connection:
+                connection.sendall(self.__header.pack(len(payload)) + self.__signature(payload) + payload)
+        except OSError:
+            pass
+
+    def receive(self):
+        payloads = []
+        while select.select([self.__server], [], [], 0)[0]:
+            connection, __ = self.__server.accept()
+            try:
+                with connection:
+                    connection.settimeout(self.timeout)
+                    (payload_length,) = self.__header.unpack(self.__receive_exactly(connection, self.__header.size))
+                    signature = self.__receive_exactly(connection, len(self.__signature(b"")))
+                    payload = self.__receive_exactly(connection, payload_length)
+            except (OSError, ConnectionError):
+                continue
+
+            if not hmac.compare_digest(signature, self.__signature(payload)):
+                self.rejected_count += 1
+                continue
+            payloads.append(payload)
+
+        return payloads
+
+    @staticmethod
+    def __receive_exactly(connection, length):
+        chunks = []
+        while length:
+            chunk = connection.recv(min(length, 1 << 20))
+            if not chunk:
+                raise ConnectionError("Connection closed mid payload.")
+            chunks.append(chunk)
+            length -= len(chunk)
+
+        return b"".join(chunks)
+
+    def close(self):
+        if self.__server is not None:
+            self.__server.close()
+            self.__server = None
+
+
+class Migration:
+    """
+    Evolver observer that sends the best {migrant_count} genomes of an island to {targets} every {interval} generations,
+    and puts the migrants it received in place of the newest offspring before the next evaluation.
+    Attach it with attach(evolver).
+    """
+
+    def __init__(self, channel, targets, interval=5, migrant_count=2):
+        self.channel = channel
+        self.targets = targets
+        self.interval = interval
+        self.migrant_count = migrant_count
+
+        self.sent_count = 0
+        self.received_count = 0
+
+    def attach(self, evolver):
+        evolver.add_observer(self.immigrate, event="start")
+        evolver.add_observer(self.emigrate, event="ranked")
+
+    def detach(self, evolver):
+        evolver.remove_observer(self.immigrate, event="start")
+        evolver.remove_observer(self.emigrate, event="ranked")
+
+    def emigrate(self, evolver):
+        if not self.targets or evolver.generation == 0 or evolver.generation % self.interval != 0:
+            return
+
+        payload = pack_migrants(evolver.population[: self.migrant_count])
+        for target in self.targets:
+            self.channel.send(target, payload)
+        self.sent_count += self.migrant_count * len(self.targets)
+
+    def immigrate(self, evolver):
+        migrants = []
+        for payload in self.channel.receive():
+            migrants += unpack_migrants(payload)
+
+        # Survivors are kept, only offspring (the tail of the bred population) are replaced
+        migrants = migrants[: evolver.population_size - evolver.survivor_count]
+        if migrants:
+            evolver.population[-len(migrants) :] = migrants
+            self.received_count += len(migrants)
+
+
+def _island_main(island_index, channel, targets, parameters, stop_event, result_queue):
+    try:
+        random.seed(parameters["seed"] + island_index)
+        channel.open(island_index)
+
+        evolver_parameters = parameters["evolver_parameters"]
+        if evolver_parameters.get("rng") is not None:
+            # Every island mutates with its own stream, the same one whichever machine runs it
+            evolver_parameters = {**evolver_parameters, "rng": evolver_parameters["rng"].spawn(island_index + 1)[-1]}
+
+        evolver = Evolver(**evolver_parameters)
+        migration = Migration(channel, targets, parameters["migration_interval"], parameters["migrant_count"])
+        migration.attach(evolver)
+
+        def report(evolver):
+            result_queue.put(("progress", island_index, evolver.generation, evolver.best_fitness))
+            if stop_event.is_set():
+                evolver.stop()
+
+        evolver.add_observer(report)
+
+        evolver.initialize()
+        evolver.run(generations=parameters["generations"], time_budget=parameters["time_budget"])
+        channel.close()
+
+        result_queue.put(
+            (
+                "done",
+                island_index,
+                pack_migrants([evolver.best_genome]),
+                {"generations": evolver.generation, "sent": migration.sent_count, "received": migration.received_count},
+            )
+        )
+    except BaseException:
+        result_queue.put(("error", island_index, traceback.format_exc(), None))
+
+
+class IslandModel:
+    """
+    Runs one Evolver per island, each in its own process, that periodically exchange their best genomes.
+
+    Migrants go to the islands given by {topology} ("ring" or "full") over {channel}, a QueueChannel by default.
+    With a SocketChannel islands can span several machines: every machine runs the islands in {island_indices}
+    out of the channel's island_count, and only those are reported.
+    Islands never wait on each other, a migrant that arrives late is simply used a generation later.
+    """
+
+    # Seconds between checks that every island process is still alive while waiting for results
+    poll_interval = 1.0
+
+    def __init__(
+        self,
+        island_count=None,
+        evolver_parameters=None,
+        topology="ring",
+        migration_interval=5,
+        migrant_count=2,
+        channel=None,
+        island_indices=None,
+        seed=None,
+    ):
+        if channel is None:
+            channel = QueueChannel(get_default_worker_count() if island_count is None else island_count)
+
+        self.channel = channel
+        self.island_count = channel.island_count
+        self.island_indices = list(range(self.island_count)) if island_indices is None else list(island_indices)
+        # Keyword arguments of every island's Evolver, which always evaluates in its own process
+        self.evolver_parameters = {**(evolver_parameters or {}), "workers": None}
+        self.topology = topology
+        self.migration_interval = migration_interval
+        self.migrant_count = migrant_count
+        self.seed = int.from_bytes(os.urandom(8), "little") if seed is None else seed
+
+        # Best genome, fitness and migration counts of each local island once run() has returned
+        self.best_genomes = {}
+        self.island_stats = {}
+
+        self.__observers = []
+        self.__stop_event = mp.Event()
+        # When each local island was first found exited without a result, see __check_alive
+        self.__exit_times = {}
+
+    def add_observer(self, observer):
+        """Registers observer(island_index, generation, best_fitness), called as islands rank each generation."""
+        self.__observers.append(observer)
+
+    def stop(self):
+        """Makes every local island return after its current generation."""
+        self.__stop_event.set()
+
+    def run(self, generations=None, time_budget=None):
+        """Runs every local island as Evolver.run(generations, time_budget) would, returns the best genome of all."""
+        self.__stop_event.clear()
+        self.__exit_times = {}
+        result_queue = mp.Queue()
+        parameters = {
+            "seed": self.seed,
+            "evolver_parameters": self.evolver_parameters,
+            "migration_interval": self.migration_interval,
+            "migrant_count": self.migrant_count,
+            "generations": generations,
+            "time_budget": time_budget,
+        }
+
+        processes = [
+            mp.Process(
+                target=_island_main,
+                args=(
+                    island_index,
+                    self.channel,
+                    migration_targets(self.topology, island_index, self.island_count),
+                    parameters,
+                    self.__stop_event,
+                    result_queue,
+                ),
+                daemon=True,
+            )
+            for island_index in self.island_indices
+        ]
+        for process in processes:
+            process.start()
+
+        errors = []
+        finished = set()
+        try:
+            while len(finished) < len(processes):
+                # Also while other islands keep posting progress
+                self.__check_alive(processes, finished)
+                try:
+                    kind, island_index, value, stats = result_queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    continue
+
+                if kind == "progress":
+                    for observer in self.__observers:
+                        observer(island_index, value, stats)
+                    continue
+
+                finished.add(island_index)
+                if kind == "error":
+                    errors.append(value)
+                    self.stop()
+                else:
+                    self.best_genomes[island_index] = unpack_migrants(value)[0]
+                    self.island_stats[island_index] = stats
+        except BaseException:
+            self.stop()
+            # Islands still running post a result when they stop, and cannot exit before it is read
+            while any(process.is_alive() for process in processes):
+                try:
+                    result_queue.get(timeout=self.poll_interval)
+                except queue.Empty:
+                    pass
+            raise
+        finally:
+            for process in processes:
+                process.join()
+
+        if errors:
+            raise RuntimeError("Island failed:\n" + errors[0])
+
+        return self.best_genome()
+
+    def __check_alive(self, processes, finished):
+        """Raises a RuntimeError if an island process exited without posting its result."""
+        for island_index, process in zip(self.island_indices, processes):
+            if island_index in finished or process.is_alive():
+                continue
+
+            # A result posted just before exiting may still be on its way, so it gets poll_interval to arrive
+            exit_time = self.__exit_times.setdefault(island_index, time.monotonic())
+            if time.monotonic() - exit_time > self.poll_interval:
+                raise RuntimeError(f"Island {island_index} process died with exit code {process.exitcode}.")
+
+    def best_genome(self):
+        if not self.best_genomes:
+            return None
+
+        return min(self.best_genomes.values(), key=lambda genome: genome.assignment_fitness)
@@ -1,148 +1,386 @@
-import numpy as np
+import argparse
+import os
 import random
-import tkinter as tk
-import pickle
-import time
+import numpy as np
 
-from truss import Truss
-from genetics import Genome
-from joblib import Parallel, delayed
+from contextlib import nullcontext
 from pathlib import Path
+from checkpoints import CheckpointStore, find_latest_log, new_log_path
+from genetics import Genome
+from stiffness import StiffnessSolver
+from geometry import GeometryChecker
+from evolver import Evolver
+from steady_state import SteadyStateEvolver
+from islands import IslandModel, QueueChannel, SocketChannel
+from refinement import PositionRefiner
+from initialization import PopulationBuilder
+from surrogate import KNNSurrogate, RidgeSurrogate, SurrogateScreen
+from mutation_control import MutationSchedule, OneFifthRule, OperatorCredit, StagnationRestart
+from metrics import GenerationProfiler, MetricsRecorder
+from visualizer import Visualizer
+from workers import WorkerPool
+
+
+def print_progress(evolver):
+    print(f"gen: {evolver.generation}, fit: {evolver.best_fitness}, cache hit rate: {Genome.fitness_cache.hit_rate():.2f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evolves a low cost truss bridge.")
+    parser.add_argument("--headless", action="store_true", help="run without opening a window")
+    parser.add_argument("--generations", type=int, default=None, help="stop after this many generations")
+    parser.add_argument("--time-budget", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--population-size", type=int, default=100)
+    parser.add_argument("--survivor-count", type=int, default=None, help="defaults to half the population")
+    parser.add_argument("--top-k", type=int, default=100, help="number of best trusses shown in the window")
+    parser.add_argument("--max-fps", type=float, default=5, help="maximum window redraws per second")
+    parser.add_argument(
+        "--checkpoint-path",
+        default=None,
+        help="checkpoint log, a new one in truss_checkpoints by default, or the latest one there with --resume",
+    )
+    parser.add_argument("--checkpoint-every", type=int, default=1, help="generations between checkpoints")
+    parser.add_argument(
+        "--checkpoint-keep", type=int, default=None, help="number of recent checkpoints to retain, all by default"
+    )
+    parser.add_argument(
+        "--checkpoint-best-only",
+        action="store_true",
+        help="only store the best truss of each checkpointed generation, which cannot be resumed from",
+    )
+    parser.add_argument("--metrics", default=None, help="per-generation metrics file, .csv or .jsonl")
+    parser.add_argument("--profile-generations", type=int, default=0, help="run cProfile over this many generations")
+    parser.add_argument("--profile-output", default="truss_profile.prof")
+    parser.add_argument("--resume", action="store_true", help="continue from the latest checkpoint")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="worker processes, defaults to the core count, 0 runs in-process"
+    )
+    parser.add_argument(
+        "--prescreen",
+        action="store_true",
+        help="reject trusses that can never be solved before solving them",
+    )
+    parser.add_argument(
+        "--check-geometry",
+        action="store_true",
+        help="reject trusses with crossing members or nodes too close to each other or to members before solving them,"
+        " and grow only starting trusses that pass",
+    )
+    parser.add_argument(
+        "--min-node-distance", type=float, default=0.5, help="closest two nodes may be with --check-geometry, in m"
+    )
+    parser.add_argument(
+        "--load-cases",
+        choices=("own", "bridge"),
+        default="own",
+        help="size members for the deck loads only, or for the envelope of Genome.bridge_load_cases",
+    )
+    parser.add_argument(
+        "--infeasible-retries",
+        type=int,
+        default=0,
+        help="times an offspring that can never be solved is mutated again before it is kept",
+    )
+    parser.add_argument(
+        "--reuse-factorizations",
+        action="store_true",
+        help="re-solve offspring by updating their parent's factorization, requires --workers 0 (or --islands)",
+    )
+    parser.add_argument(
+        "--solver",
+        choices=("joints", "stiffness"),
+        default="joints",
+        help="method of joints, or the sparse stiffness method which also solves indeterminate trusses",
+    )
+    parser.add_argument(
+        "--axial-stiffness", type=float, default=8e7, help="member E*A in newtons for --solver stiffness"
+    )
+    parser.add_argument(
+        "--new-member-chance",
+        type=float,
+        default=0,
+        help="chance an offspring gains a redundant member, only useful with --solver stiffness",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="seeds every random draw, for reproducible runs")
+    parser.add_argument(
+        "--vectorized-mutation",
+        action="store_true",
+        help="mutate the whole population at once with a numpy Generator, see Genome.mutate_population",
+    )
+    parser.add_argument(
+        "--deduplicate",
+        action="store_true",
+        help="replace offspring that build the same truss as another genome with fresh offspring",
+    )
+    parser.add_argument(
+        "--latin-hypercube",
+        action="store_true",
+        help="place the nodes of the starting pool by Latin hypercube sampling, redrawing unsolvable layouts",
+    )
+    parser.add_argument(
+        "--initial-candidates",
+        type=int,
+        default=4,
+        help="layouts sampled per starting truss with --latin-hypercube, the cheapest one being kept",
+    )
+    parser.add_argument(
+        "--warm-start",
+        nargs="?",
+        const="truss_checkpoints",
+        default=None,
+        help="seed part of the starting pool with the best trusses of the checkpoints in this directory",
+    )
+    parser.add_argument(
+        "--warm-start-fraction", type=float, default=0.25, help="share of the starting pool taken from checkpoints"
+    )
+    parser.add_argument(
+        "--steady-state",
+        action="store_true",
+        help="stream small breed-and-evaluate jobs through the workers instead of waiting for whole generations",
+    )
+    parser.add_argument("--steady-state-batch", type=int, default=4, help="offspring per job with --steady-state")
+    parser.add_argument(
+        "--adaptive-mutation",
+        action="store_true",
+        help="adapt the position mutation rate with the 1/5th rule and shift chances towards successful operators",
+    )
+    parser.add_argument(
+        "--restart-patience",
+        type=int,
+        default=0,
+        help="replace part of the offspring with new random trusses after this many generations without improvement",
+    )
+    parser.add_argument(
+        "--restart-fraction", type=float, default=0.5, help="fraction of the offspring replaced by a restart"
+    )
+    parser.add_argument(
+        "--surrogate",
+        choices=("knn", "ridge"),
+        default=None,
+        help="breed several offspring per slot and only solve the one a surrogate model predicts to be cheapest",
+    )
+    parser.add_argument(
+        "--surrogate-oversample", type=int, default=4, help="candidate offspring bred per slot with --surrogate"
+    )
+    parser.add_argument(
+        "--refine-top-k",
+        type=int,
+        default=0,
+        help="move the nodes of this many best trusses down the cost gradient every generation",
+    )
+    parser.add_argument("--refine-steps", type=int, default=3, help="gradient steps per refined truss")
+    parser.add_argument(
+        "--islands",
+        type=int,
+        default=0,
+        help="evolve this many populations in their own processes with migration, headless and without checkpoints",
+    )
+    parser.add_argument("--topology", choices=("ring", "full"), default="ring", help="islands migrants are sent to")
+    parser.add_argument("--migration-interval", type=int, default=5, help="generations between migrations")
+    parser.add_argument("--migrant-count", type=int, default=2, help="best genomes sent by each migration")
+    parser.add_argument(
+        "--island-hosts",
+        default=None,
+        help="host:port of every island, comma separated, to migrate over TCP instead of local queues",
+    )
+    parser.add_argument(
+        "--island-secret",
+        default=os.environ.get("TRUSS_ISLAND_SECRET"),
+        help="secret shared by the islands of --island-hosts to sign migrants, $TRUSS_ISLAND_SECRET by default",
+    )
+    parser.add_argument(
+        "--island-bind-host",
+        default=None,
+        help="address islands listen on with --island-hosts, their own host there by default, \"\" for all",
+    )
+    parser.add_argument(
+        "--local-islands",
+        default=None,
+        help="comma separated indices of the islands run on this machine with --island-hosts, all by default",
+    )
+
+    args = parser.parse_args()
+    # Factorizations stay in the process that solved the parent, islands always evaluate in their own process
+    if args.reuse_factorizations and args.workers != 0 and not args.islands:
+        parser.error("--reuse-factorizations only works with --workers 0, worker processes solve every offspring anew")
+
+    return args
+
+
+def get_evolver_parameters(args):
+    return {
+        "population_size": args.population_size,
+        "survivor_count": args.survivor_count,
+        "mutation_parameters": {
+            "infeasible_retries": args.infeasible_retries,
+            "new_member_chance": args.new_member_chance,
+        },
+        "reuse_factorizations": args.reuse_factorizations,
+        "prescreen": args.prescreen,
+        "load_cases": Genome.bridge_load_cases() if args.load_cases == "bridge" else None,
+        "solver": StiffnessSolver(args.axial_stiffness) if args.solver == "stiffness" else None,
+        "rng": np.random.default_rng(args.seed) if args.vectorized_mutation else None,
+        "deduplicate": args.deduplicate,
+        "initializer": get_initializer(args),
+        "geometry_checker": GeometryChecker(args.min_node_distance) if args.check_geometry else None,
+    }
+
+
+def get_initializer(args):
+    if not args.latin_hypercube and args.warm_start is None:
+        return None
+
+    return PopulationBuilder(
+        latin_hypercube=args.latin_hypercube,
+        candidate_count=args.initial_candidates,
+        warm_start_directory=args.warm_start,
+        warm_start_fraction=args.warm_start_fraction,
+    )
+
+
+def get_mutation_schedule(args):
+    policies = []
+    if args.adaptive_mutation:
+        policies += [OneFifthRule(), OperatorCredit()]
+    if args.restart_patience:
+        policies.append(StagnationRestart(patience=args.restart_patience, fraction=args.restart_fraction))
+
+    return MutationSchedule(policies) if policies else None
+
+
+def run_islands(args):
+    if args.island_hosts is None:
+        channel = QueueChannel(args.islands)
+    else:
+        channel = SocketChannel(
+            SocketChannel.parse_addresses(args.island_hosts),
+            secret=args.island_secret,
+            bind_host=args.island_bind_host,
+        )
+
+    island_indices = None
+    if args.local_islands is not None:
+        island_indices = [int(island_index) for island_index in args.local_islands.split(",")]
+
+    islands = IslandModel(
+        evolver_parameters=get_evolver_parameters(args),
+        topology=args.topology,
+        migration_interval=args.migration_interval,
+        migrant_count=args.migrant_count,
+        channel=channel,
+        island_indices=island_indices,
+        seed=args.seed,
+    )
+    islands.add_observer(
+        lambda island_index, generation, best_fitness: print(
+            f"island: {island_index}, gen: {generation}, fit: {best_fitness}"
+        )
+    )
 
+    best_genome = islands.run(generations=args.generations, time_budget=args.time_budget)
+    print(f"best fit: {best_genome.assignment_fitness}")
 
-def map(x, old_min, old_max, new_min, new_max):
-    return ((x - old_min) / (old_max - old_min)) * (new_max - new_min) + new_min
 
-node_radius = 5
-member_thickness = 2.5
+# Settings fitnesses depend on, a run can only be resumed with the ones it was started with
+fitness_settings = ("load_cases", "solver", "axial_stiffness", "check_geometry", "min_node_distance")
 
-def draw(truss: Truss, x, y, width, height):
-    min_x = min(n.x for n in truss.nodes)
-    max_x = max(n.x for n in truss.nodes)
-    min_y = min(n.y for n in truss.nodes)
-    max_y = max(n.y for n in truss.nodes)
 
-    # Dealing with aspect ratio scaling
-    if max_x - min_x >= max_y - min_y:
-        output_x_min = x
-        output_x_max = x + width
-        output_y_span = height * (max_y - min_y) / (max_x - min_x)
-        output_y_min = y + (height - output_y_span) / 2
-        output_y_max = y + height - (height - output_y_span) / 2
+def get_checkpoints(args):
+    """Opens the log of a new run, or with --resume the log to continue, refusing to mix two runs in one log."""
+    path = args.checkpoint_path
+    if args.resume:
+        path = path if path is not None else find_latest_log()
+        if path is None:
+            raise SystemExit("There is no checkpoint log in truss_checkpoints to resume from.")
     else:
-        output_y_min = y
-        output_y_max = y + height
-        output_x_span = width * (max_x - min_x) / (max_y - min_y)
-        output_x_min = x + (width - output_x_span) / 2
-        output_x_max = x + width - (width - output_x_span) / 2
-
-    # Flipping y-coords because of screen-space coordiante disagreement
-    output_y_min, output_y_max = output_y_max, output_y_min
-
-    # Drawing nodes
-    for node in truss.nodes:
-        mapped_x = map(node.x, min_x, max_x, output_x_min, output_x_max)
-        mapped_y = map(node.y, min_y, max_y, output_y_min, output_y_max)
-
-        canvas.create_oval(
-            mapped_x - node_radius,
-            mapped_y - node_radius,
-            mapped_x + node_radius,
-            mapped_y + node_radius,
+        path = path if path is not None else new_log_path()
+        if Path(path).exists() and Path(path).stat().st_size:
+            raise SystemExit(f"{path} already holds a run, use --resume to continue it or another --checkpoint-path.")
+
+    return CheckpointStore(
+        path,
+        every=args.checkpoint_every,
+        keep=args.checkpoint_keep,
+        store_population=not args.checkpoint_best_only,
+        configuration=vars(args),
+    )
+
+
+def check_resumed_configuration(args, configuration):
+    # Logs written before configurations were stored cannot be checked
+    if configuration is None:
+        return
+
+    changed = [name for name in fitness_settings if configuration.get(name) != getattr(args, name)]
+    if changed:
+        raise SystemExit(
+            "The run was started with other "
+            + ", ".join(f"--{name.replace('_', '-')} ({configuration.get(name)})" for name in changed)
+            + ", its fitnesses would not be comparable."
         )
 
-    # Drawing members
-    for member in truss.members:
-        mapped_a_x = map(member.connected_node_a.x, min_x, max_x, output_x_min, output_x_max)
-        mapped_a_y = map(member.connected_node_a.y, min_y, max_y, output_y_min, output_y_max)
-        mapped_b_x = map(member.connected_node_b.x, min_x, max_x, output_x_min, output_x_max)
-        mapped_b_y = map(member.connected_node_b.y, min_y, max_y, output_y_min, output_y_max)
-
-        canvas.create_line(mapped_a_x, mapped_a_y, mapped_b_x, mapped_b_y)
-
-
-canvas_width = 800
-canvas_height = 800
-
-root = tk.Tk()
-root.geometry(f"{canvas_width}x{canvas_height}")
-root.title("Truss Optimizer 9001")
-
-canvas = tk.Canvas(root, width=canvas_width, height=canvas_height, bg="white")
-canvas.pack(anchor=tk.CENTER, expand=True)
-
-canvas_truss_rows = 10
-canvas_truss_cols = 10
-
-# margin between truss visuals, px
-cell_margins = 20
-
-# creating truss_checkpoints folder
-Path("truss_checkpoints").mkdir(parents=True, exist_ok=True)
-
-# evolution parameters
-batch_size = 100
-cut_limit = batch_size // 2
-
-selection_weights_array = [(batch_size - i - 1) ** 2 for i in range(batch_size)]
-
-pool = [Genome() for __ in range(batch_size)]
-print("Generating starting pool")
-for __ in range(10):
-    pool = [g.create_mutation(position_mutation_chance=0.5,
-                position_mutation_rate=0.1,
-                new_node_chance=0.25,
-                remove_node_chance=0.1,
-                change_member_connection_chance=0,
-            ) for g in pool]
-
-initial_rate = 0.5
-last_fitness = pool[0].to_truss().get_assignment_cost()
-
-while True:
-    root.update_idletasks()
-    root.update()
-    canvas.delete("all")
-
-    fitnesses = Parallel(n_jobs=15)(delayed(Genome.get_assignment_fitness_gentle)(g) for g in pool)
-    
-    pool_fitnesses = zip(fitnesses, pool)
-    pool_fitnesses = sorted(pool_fitnesses, key=lambda x: x[0])
-
-    cur_fitness = pool_fitnesses[0][0]
-
-    fitnesses, pool = zip(*pool_fitnesses)
-    pool = list(pool)
-
-    rate = 0.5
-
-    print(f"fit: {cur_fitness}, rate:{rate}")
-    try:
-        with open("truss_checkpoints/" + str(time.time()) + " " + str(cur_fitness) + ".truss", 'wb+') as f:
-            pickle.dump(pool[0], f)
-    except:
-        print("Could not write truss checkpoint. Check directory permissions.")
-
-    # Drawing trusses
-    for r in range(canvas_truss_rows):
-        for c in range(canvas_truss_cols):
-            w = (canvas_width - (canvas_truss_cols + 1) * cell_margins) / canvas_truss_cols
-            h = (canvas_width - (canvas_truss_rows + 1) * cell_margins) / canvas_truss_cols
-            x = cell_margins + c * (w + cell_margins)
-            y = cell_margins + r * (h + cell_margins)
-            draw(pool[c + r * canvas_truss_cols].to_truss(), x, y, w, h)
-
-    selection = random.sample(pool, k=cut_limit, counts=selection_weights_array)
-    pool[:cut_limit] = selection
-
-    pool[cut_limit:] = Parallel(n_jobs=15)(delayed(Genome.create_mutation)(
-            g,
-            position_mutation_chance=0.5,
-            position_mutation_rate=0.1,
-            new_node_chance=0.25,
-            remove_node_chance=0.1,
-            change_member_connection_chance=0,
-        )
-    for g in pool[:cut_limit])
 
-    last_fitness = cur_fitness
+def main():
+    args = parse_args()
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    if args.islands or args.island_hosts is not None:
+        run_islands(args)
+        return
+
+    checkpoints = get_checkpoints(args)
+
+    # Started before any window is created so forked workers don't inherit it
+    with (nullcontext() if args.workers == 0 else WorkerPool(args.workers, seed=args.seed)) as workers:
+        if args.steady_state:
+            evolver = SteadyStateEvolver(
+                workers=workers, batch_size=args.steady_state_batch, **get_evolver_parameters(args)
+            )
+        else:
+            evolver = Evolver(workers=workers, **get_evolver_parameters(args))
+        if args.refine_top_k:
+            PositionRefiner(top_k=args.refine_top_k, steps=args.refine_steps).attach(evolver)
+        surrogate_screen = None
+        if args.surrogate is not None:
+            model = KNNSurrogate() if args.surrogate == "knn" else RidgeSurrogate()
+            surrogate_screen = SurrogateScreen(model, oversample=args.surrogate_oversample)
+            surrogate_screen.attach(evolver)
+        mutation_schedule = get_mutation_schedule(args)
+        if mutation_schedule is not None:
+            mutation_schedule.attach(evolver)
+        evolver.add_observer(print_progress)
+
+        if args.resume:
+            checkpoint = checkpoints.load()
+            if not checkpoint["complete_population"]:
+                raise SystemExit("The latest checkpoint only stores the best truss and cannot be resumed from.")
+            check_resumed_configuration(args, checkpoint["configuration"])
+
+            print(f"Resuming from generation {checkpoint['generation']}")
+            evolver.restore(checkpoint["generation"], checkpoint["population"], checkpoint["random_state"])
+        else:
+            print("Generating starting pool")
+            evolver.initialize()
+
+        evolver.add_observer(checkpoints.observe)
+
+        metrics = None
+        if args.metrics is not None:
+            metrics = MetricsRecorder(args.metrics, sources=[surrogate_screen] if surrogate_screen is not None else [])
+            metrics.attach(evolver)
+        if args.profile_generations:
+            GenerationProfiler(args.profile_generations, args.profile_output).attach(evolver)
+
+        if args.headless:
+            evolver.run(generations=args.generations, time_budget=args.time_budget)
+        else:
+            visualizer = Visualizer(top_k=args.top_k, max_fps=args.max_fps)
+            visualizer.run(evolver, generations=args.generations, time_budget=args.time_budget)
+
+        if metrics is not None:
+            metrics.close()
+
+
+if __name__ == "__main__":
+    main()
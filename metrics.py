@@ -0,0 +1,211 @@
+import cProfile
+import csv
+import json
+import time
+import numpy as np
+
+from collections import deque
+from pathlib import Path
+from genetics import Genome, population_diversity
+
+
+class MetricsRecorder:
+    """
+    Evolver observer that builds a metrics record per generation and streams it to a .csv or .jsonl file.
+
+    A record holds the wall time of every phase (evaluation, ranking, each ranked observer, selection, mutation),
+    solve, failure, pre-screen and geometry rejection and cache counts, fitness statistics, genome size statistics,
+    population diversity and the member utilizations of the best genome.
+    Records need not all have the same fields, e.g. phases only some generations go through.
+    A .csv file gets a column per field of any record, left empty in the records without it.
+    Attach it with attach(evolver) so it sees the whole generation.
+    """
+
+    def __init__(self, path=None, file_format=None, kept_records=1000, sources=(), best_utilization=True):
+        # {file_format} is "csv" or "jsonl", taken from the extension of {path} by default.
+        # The last {kept_records} records are also kept in memory, in self.records.
+        # Every record also gets the fields returned by metrics() of each of {sources}, e.g. a SurrogateScreen.
+        # With {best_utilization} the best genome is solved again whenever it changes, for its member utilizations.
+        self.sources = list(sources)
+        self.best_utilization = best_utilization
+        self.path = None if path is None else Path(path)
+        self.file_format = file_format
+        if self.file_format is None and self.path is not None:
+            self.file_format = "csv" if self.path.suffix == ".csv" else "jsonl"
+
+        self.records = deque(maxlen=kept_records)
+
+        self.__file = None
+        self.__csv_writer = None
+        self.__csv_fieldnames = []
+        self.__generation_start = None
+        self.__counters_at_start = None
+        # Node and member counts of the ranked population, which breeding replaces before the record is built
+        self.__ranked_sizes = None
+        # (best genome, its member utilizations), kept until another genome is the best
+        self.__best_utilizations = (None, None)
+
+    def attach(self, evolver):
+        evolver.add_observer(self.start_generation, event="start")
+        evolver.add_observer(self.ranked_generation, event="ranked")
+        evolver.add_observer(self.end_generation, event="end")
+
+    def detach(self, evolver):
+        evolver.remove_observer(self.start_generation, event="start")
+        evolver.remove_observer(self.ranked_generation, event="ranked")
+        evolver.remove_observer(self.end_generation, event="end")
+
+    @staticmethod
+    def __counters():
+        return {
+            "solves": Genome.solve_count,
+            "solve_failures": Genome.solve_failure_count,
+            "prescreen_rejections": Genome.prescreen_rejection_count,
+            "geometry_rejections": Genome.geometry_rejection_count,
+            "cache_hits": Genome.fitness_cache.hits,
+            "cache_misses": Genome.fitness_cache.misses,
+        }
+
+    def start_generation(self, evolver):
+        self.__generation_start = time.perf_counter()
+        self.__counters_at_start = self.__counters()
+        self.__ranked_sizes = None
+
+    def ranked_generation(self, evolver):
+        self.__ranked_sizes = (
+            np.array([genome.node_count() for genome in evolver.population], dtype=np.float64),
+            np.array([genome.member_count() for genome in evolver.population], dtype=np.float64),
+        )
+
+    def end_generation(self, evolver):
+        # Attached part way through a generation
+        if self.__generation_start is None or self.__ranked_sizes is None:
+            return
+
+        record = self.build_record(evolver)
+        self.records.append(record)
+
+        if self.path is not None:
+            self.__write(record)
+
+    def build_record(self, evolver):
+        counters = self.__counters()
+        counter_deltas = {
+            name: counters[name] - self.__counters_at_start[name] for name in counters
+        }
+        lookups = counter_deltas["cache_hits"] + counter_deltas["cache_misses"]
+
+        # Genome sizes and fitnesses are of the ranked population, before breeding replaced it
+        node_counts, member_counts = self.__ranked_sizes
+        solved_fitnesses = evolver.fitnesses[evolver.fitnesses < Genome.unsolvable_fitness]
+
+        record = {
+            "generation": evolver.generation,
+            "timestamp": time.time(),
+            "wall_time_s": time.perf_counter() - self.__generation_start,
+            **{f"{phase}_s": duration for phase, duration in evolver.phase_times.items()},
+            **counter_deltas,
+            "cache_hit_rate": counter_deltas["cache_hits"] / lookups if lookups else 0.0,
+            "population_size": len(evolver.population),
+            "best_fitness": float(evolver.best_fitness),
+            "median_fitness": float(np.median(evolver.fitnesses)),
+            "unsolvable_count": int(len(evolver.fitnesses) - len(solved_fitnesses)),
+            "mean_nodes": float(node_counts.mean()),
+            "min_nodes": int(node_counts.min()),
+            "max_nodes": int(node_counts.max()),
+            "mean_members": float(member_counts.mean()),
+            "min_members": int(member_counts.min()),
+            "max_members": int(member_counts.max()),
+            # Of the bred population the next generation evaluates, duplicates being counted before replacement
+            **population_diversity(evolver.population, evolver.position_quantum),
+            "duplicates": evolver.duplicate_count,
+            "remaining_duplicates": evolver.remaining_duplicate_count,
+            # Mutation parameters the next generation is bred with, which a MutationSchedule may adapt
+            **{
+                name: value
+                for name, value in evolver.mutation_parameters.items()
+                if name.endswith(("_chance", "_rate"))
+            },
+        }
+
+        for source in self.sources:
+            record.update(source.metrics())
+
+        if self.best_utilization:
+            utilizations = self.__get_best_utilizations(evolver)
+            record["best_max_utilization"] = float(utilizations.max())
+            record["best_mean_utilization"] = float(utilizations.mean())
+
+        return record
+
+    def __get_best_utilizations(self, evolver):
+        best_genome, utilizations = self.__best_utilizations
+        if best_genome is not evolver.best_genome:
+            # Solved again, as populations are evaluated without keeping internal forces
+            best_result = evolver.best_genome.get_assignment_result(evolver.load_cases, evolver.solver)
+            utilizations = best_result.utilizations if best_result.is_feasible() else np.full(1, np.nan)
+            self.__best_utilizations = (evolver.best_genome, utilizations)
+
+        return utilizations
+
+    def __write(self, record):
+        if self.__file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.__file = open(self.path, "w+", newline="")
+
+        if self.file_format == "csv":
+            new_fieldnames = [name for name in record if name not in self.__csv_fieldnames]
+            if new_fieldnames:
+                self.__widen_csv(new_fieldnames)
+            self.__csv_writer.writerow(record)
+        else:
+            self.__file.write(json.dumps(record) + "\n")
+
+        self.__file.flush()
+
+    def __widen_csv(self, new_fieldnames):
+        """Rewrites the .csv file with columns added for {new_fieldnames}, rows written before leaving them empty."""
+        self.__file.seek(0)
+        rows = list(csv.DictReader(self.__file))
+
+        self.__csv_fieldnames += new_fieldnames
+        self.__file.seek(0)
+        self.__file.truncate()
+        self.__csv_writer = csv.DictWriter(self.__file, fieldnames=self.__csv_fieldnames)
+        self.__csv_writer.writeheader()
+        self.__csv_writer.writerows(rows)
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+
+class GenerationProfiler:
+    """Runs cProfile over the next {generations} generations of an Evolver and writes the stats to {path}."""
+
+    def __init__(self, generations, path="truss_profile.prof"):
+        self.generations = generations
+        self.path = path
+
+        self.__profiler = cProfile.Profile()
+        self.__profiled_generations = 0
+
+    def attach(self, evolver):
+        evolver.add_observer(self.start_generation, event="start")
+        evolver.add_observer(self.end_generation, event="end")
+
+    def detach(self, evolver):
+        evolver.remove_observer(self.start_generation, event="start")
+        evolver.remove_observer(self.end_generation, event="end")
+
+    def start_generation(self, evolver):
+        self.__profiler.enable()
+
+    def end_generation(self, evolver):
+        self.__profiler.disable()
+        self.__profiled_generations += 1
+
+        if self.__profiled_generations >= self.generations:
+            self.__profiler.dump_stats(self.path)
+            self.detach(evolver)
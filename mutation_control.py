@@ -0,0 +1,230 @@
+import numpy as np
+
+from genetics import Genome
+
+
+class MutationPolicy:
+    """
+    Adapts an evolver's mutation between generations, driven by a MutationSchedule.
+    Subclasses override the hooks they need, every hook does nothing by default.
+    """
+
+    def update(self, evolver, outcomes):
+        """
+        Called once the offspring bred last generation are ranked, with {outcomes} a list of
+        (mutation_operators, improved) per offspring, improved being whether it beat its parent's fitness.
+        """
+
+    def after_breed(self, evolver):
+        """Called once the next population is bred, returns True if it replaced part of it with new genomes."""
+        return False
+
+    def reset(self, evolver):
+        """Forgets what the policy learned, called after any policy restarted part of the population."""
+
+
+class OneFifthRule(MutationPolicy):
+    """
+    Rechenberg's 1/5th success rule for position_mutation_rate: the rate grows when more than {target}
+    of the offspring whose nodes moved beat their parent, and shrinks when fewer did.
+    """
+
+    def __init__(self, target=0.2, factor=0.85, bounds=(1e-3, 2.0), min_samples=5):
+        # The rate is divided by {factor} on success and multiplied by it otherwise, within {bounds}.
+        # Generations with fewer than {min_samples} moved offspring leave it unchanged.
+        self.target = target
+        self.factor = factor
+        self.bounds = bounds
+        self.min_samples = min_samples
+
+        # Fraction of moved offspring that improved in the last updated generation
+        self.success_rate = None
+
+    def update(self, evolver, outcomes):
+        moved = [improved for operators, improved in outcomes if operators & Genome.MutationOperators.POSITION]
+        if len(moved) < self.min_samples:
+            return
+
+        self.success_rate = sum(moved) / len(moved)
+        rate = evolver.mutation_parameters["position_mutation_rate"]
+        rate = rate / self.factor if self.success_rate > self.target else rate * self.factor
+        evolver.mutation_parameters["position_mutation_rate"] = float(np.clip(rate, *self.bounds))
+
+    def reset(self, evolver):
+        self.success_rate = None
+
+
+class OperatorCredit(MutationPolicy):
+    """
+    Adaptive operator selection: every mutation operator earns credit, an exponential moving average with
+    {decay} of the success rate of the offspring it took part in, and the chances of the operators are shifted
+    towards the ones with the most credit.
+    Operator i of K gets probability p_i = credit_i / sum(credit), at least {min_probability},
+    and its chance becomes its chance when attached times K * p_i, so equal credit changes nothing.
+    Operators that were disabled when attached stay disabled.
+    """
+
+    operator_parameters = {
+        Genome.MutationOperators.POSITION: "position_mutation_chance",
+        Genome.MutationOperators.ADD_NODE: "new_node_chance",
+        Genome.MutationOperators.REMOVE_NODE: "remove_node_chance",
+        Genome.MutationOperators.REWIRE: "change_member_connection_chance",
+    }
+
+    def __init__(self, decay=0.8, min_probability=0.05, initial_credit=0.2):
+        self.decay = decay
+        self.min_probability = min_probability
+        self.initial_credit = initial_credit
+
+        # Chances every probability scales, taken from the evolver on the first update
+        self.base_chances = None
+        self.credits = {operator: initial_credit for operator in self.operator_parameters}
+        self.probabilities = {}
+
+    def update(self, evolver, outcomes):
+        if self.base_chances is None:
+            self.base_chances = {
+                operator: evolver.mutation_parameters[name] for operator, name in self.operator_parameters.items()
+            }
+
+        enabled = [operator for operator in self.operator_parameters if self.base_chances[operator] > 0]
+        if not enabled:
+            return
+
+        for operator in enabled:
+            results = [improved for operators, improved in outcomes if operators & operator]
+            if results:
+                success_rate = sum(results) / len(results)
+                self.credits[operator] = self.decay * self.credits[operator] + (1 - self.decay) * success_rate
+
+        total_credit = sum(self.credits[operator] for operator in enabled)
+        for operator in enabled:
+            share = self.credits[operator] / total_credit if total_credit > 0 else 1 / len(enabled)
+            self.probabilities[operator] = max(self.min_probability, share)
+
+        normalization = sum(self.probabilities[operator] for operator in enabled)
+        for operator in enabled:
+            chance = self.base_chances[operator] * len(enabled) * self.probabilities[operator] / normalization
+            evolver.mutation_parameters[self.operator_parameters[operator]] = min(1.0, chance)
+
+    def reset(self, evolver):
+        self.credits = {operator: self.initial_credit for operator in self.operator_parameters}
+        self.probabilities = {}
+
+
+class StagnationRestart(MutationPolicy):
+    """
+    Partial restart: once the best fitness has not improved by more than {tolerance} (relative) for {patience}
+    generations, {fraction} of the freshly bred offspring, those of the worst ranked parents, are replaced by
+    new random genomes, grown as Evolver.initialize grows them, see Evolver.grow.
+    Survivors are left as Evolver.breed selected them, a rank weighted sample that may miss the best genome.
+    A SteadyStateEvolver has no parents to go by, the worst genomes of its ranking are replaced instead.
+    """
+
+    def __init__(self, patience=20, fraction=0.5, tolerance=1e-6):
+        self.patience = patience
+        self.fraction = fraction
+        self.tolerance = tolerance
+
+        self.restart_count = 0
+        self.__best_fitness = None
+        self.__stalled_generations = 0
+
+    def update(self, evolver, outcomes):
+        self.observe_best(evolver)
+
+    def observe_best(self, evolver):
+        best_fitness = float(evolver.best_fitness)
+        if self.__best_fitness is None or best_fitness < self.__best_fitness - self.tolerance * abs(self.__best_fitness):
+            self.__best_fitness = best_fitness
+            self.__stalled_generations = 0
+        else:
+            self.__stalled_generations += 1
+
+    def after_breed(self, evolver):
+        if self.__stalled_generations < self.patience:
+            return False
+
+        offspring_count = evolver.population_size - evolver.survivor_count
+        restart_count = int(round(offspring_count * self.fraction))
+        if not restart_count:
+            return False
+
+        genomes = evolver.grow(restart_count)
+
+        offspring_slots = [slot for slot, parent in enumerate(evolver.parents) if parent is not None]
+        if offspring_slots:
+            # Survivors are selected in random order, so slots are ordered by their parent's ranked fitness
+            offspring_slots.sort(
+                key=lambda slot: np.inf
+                if evolver.parents[slot].assignment_fitness is None
+                else evolver.parents[slot].assignment_fitness
+            )
+        else:
+            # A SteadyStateEvolver pairs no offspring with parents, but its population is its ranking
+            offspring_slots = list(range(len(evolver.population)))
+        for slot, genome in zip(offspring_slots[-restart_count:], genomes):
+            evolver.population[slot] = genome
+            if slot < len(evolver.parents):
+                evolver.parents[slot] = None
+
+        self.restart_count += 1
+        self.__stalled_generations = 0
+        return True
+
+
+class MutationSchedule:
+    """
+    Evolver observer that lets its {policies} (MutationPolicy instances) adapt the evolver's mutation parameters.
+    At "end" it remembers the parent of every offspring, at the next "ranked" it tells the policies which
+    operators made each offspring and whether it beat its parent, then lets them restart part of the bred population.
+    When one restarts, the mutation parameters go back to those the evolver had when attached.
+    Attach it with attach(evolver), before observers that read the mutation parameters.
+    """
+
+    def __init__(self, policies):
+        self.policies = list(policies)
+
+        self.base_mutation_parameters = None
+        # Fraction of the offspring of the last ranked generation that beat their parent
+        self.success_rate = None
+        self.__pairs = []
+
+    def attach(self, evolver):
+        self.base_mutation_parameters = dict(evolver.mutation_parameters)
+        evolver.add_observer(self.ranked, event="ranked")
+        evolver.add_observer(self.bred, event="end")
+
+    def detach(self, evolver):
+        evolver.remove_observer(self.ranked, event="ranked")
+        evolver.remove_observer(self.bred, event="end")
+
+    def ranked(self, evolver):
+        outcomes = []
+        for genome, parent in self.__pairs:
+            # Replaced before being evaluated, e.g. by migrants
+            if genome.assignment_fitness is None or parent.assignment_fitness is None:
+                continue
+            # Unchanged offspring say nothing about the operators
+            if not genome.mutation_operators:
+                continue
+            outcomes.append((genome.mutation_operators, genome.assignment_fitness < parent.assignment_fitness))
+        self.__pairs = []
+
+        self.success_rate = sum(improved for __, improved in outcomes) / len(outcomes) if outcomes else None
+        for policy in self.policies:
+            policy.update(evolver, outcomes)
+
+    def bred(self, evolver):
+        restarted = False
+        for policy in self.policies:
+            restarted = policy.after_breed(evolver) or restarted
+
+        if restarted:
+            evolver.mutation_parameters.update(self.base_mutation_parameters)
+            for policy in self.policies:
+                policy.reset(evolver)
+
+        self.__pairs = [
+            (genome, parent) for genome, parent in zip(evolver.population, evolver.parents) if parent is not None
+        ]
@@ -0,0 +1,218 @@
+import numpy as np
+
+from truss import Truss
+from genetics import evaluate_population
+
+
+class PositionRefiner:
+    """
+    Memetic local search: moves the mutable nodes of the best genomes of every generation down the gradient
+    of a smooth version of their cost, instead of only relying on random position mutations.
+
+    The smooth cost sizes members like Truss.get_fitness_cost with max(1, utilization) rounded off
+    (see Truss.Member.get_smooth_costs), members being sized for the envelope of the load cases.
+    Its gradient with respect to every node coordinate comes from an adjoint solve against the same inverse
+    as the forward solve, so it costs one solve. A step is only kept if the true assignment fitness improves, otherwise it is halved.
+    Only the method of joints is differentiated, evolvers with a StiffnessSolver are left alone.
+    Candidates are scored by evaluate_population with the evolver's prescreen and geometry_checker,
+    so refined fitnesses mean the same as ranked ones and moves the checker rejects are never kept.
+    Attach it with attach(evolver), before observers that should see the refined ranking.
+    """
+
+    def __init__(
+        self,
+        top_k=5,
+        steps=3,
+        step_length=0.5,
+        max_backtracks=3,
+        position_bounds=(-10, 10),
+        smoothing=0.1,
+    ):
+        # The first step moves the node with the largest gradient by {step_length} m,
+        # nodes are kept within {position_bounds} on both axes, the box Genome.randomize_position draws from
+        self.top_k = top_k
+        self.steps = steps
+        self.step_length = step_length
+        self.max_backtracks = max_backtracks
+        self.position_bounds = position_bounds
+        self.smoothing = smoothing
+
+        # Solves done by refinement, gradients included, and genomes it improved
+        self.solve_count = 0
+        self.improved_count = 0
+
+    def attach(self, evolver):
+        evolver.add_observer(self.refine_population)
+
+    def detach(self, evolver):
+        evolver.remove_observer(self.refine_population)
+
+    def refine_population(self, evolver):
+        """Refines the top {top_k} of the ranked population of {evolver} in place and ranks it again."""
+        if evolver.solver is not None:
+            return
+
+        for rank in range(min(self.top_k, len(evolver.population))):
+            genome = evolver.population[rank]
+            if evolver.fitnesses[rank] >= genome.unsolvable_fitness:
+                continue
+
+            refined_genome = self.refine(genome, evolver.load_cases, evolver.prescreen, evolver.geometry_checker)
+            if refined_genome is not genome:
+                evolver.population[rank] = refined_genome
+                evolver.fitnesses[rank] = refined_genome.assignment_fitness
+
+        order = np.argsort(evolver.fitnesses, kind="stable")
+        evolver.population = [evolver.population[i] for i in order]
+        evolver.fitnesses = evolver.fitnesses[order]
+        evolver.best_genome = evolver.population[0]
+        evolver.best_fitness = evolver.fitnesses[0]
+
+    def refine(self, genome, load_cases=None, prescreen=False, geometry_checker=None):
+        """
+        Returns a genome with a lower assignment fitness than {genome}, or {genome} itself if none was found,
+        fitnesses being those of evaluate_population(..., prescreen=prescreen, load_cases=load_cases,
+        geometry_checker=geometry_checker).
+        """
+        evaluation_parameters = {"prescreen": prescreen, "load_cases": load_cases, "geometry_checker": geometry_checker}
+        best_genome = genome
+        best_fitness = self.__evaluate(genome, evaluation_parameters)
+        step_length = self.step_length
+
+        for __ in range(self.steps):
+            gradient = self.get_smooth_cost_gradient(best_genome, load_cases)
+            if gradient is None:
+                break
+
+            gradient[~best_genome.position_is_mutable] = 0
+            largest_move = np.abs(gradient).max()
+            if largest_move == 0:
+                break
+
+            for __ in range(self.max_backtracks + 1):
+                positions = np.clip(
+                    best_genome.positions - step_length / largest_move * gradient, *self.position_bounds
+                )
+                candidate = best_genome.moved(positions)
+                # Moves the geometry checker rejects score unsolvable_fitness, without a solve
+                fitness = self.__evaluate(candidate, evaluation_parameters)
+
+                if fitness < best_fitness:
+                    best_genome, best_fitness = candidate, fitness
+                    break
+                step_length /= 2
+            else:
+                break
+
+        if best_genome is not genome:
+            self.improved_count += 1
+
+        return best_genome
+
+    def __evaluate(self, genome, evaluation_parameters):
+        solves_before = genome.solve_count
+        fitness = float(evaluate_population([genome], **evaluation_parameters)[0])
+        self.solve_count += genome.solve_count - solves_before
+
+        return fitness
+
+    def get_smooth_cost(self, genome, load_cases=None):
+        """Returns the smooth cost of {genome}'s members, None if its truss cannot be solved."""
+        result = self.__solve(genome, load_cases)
+
+        return None if result is None else result[0]
+
+    def get_smooth_cost_gradient(self, genome, load_cases=None):
+        """Returns the (n, 2) gradient of the smooth cost of {genome} with respect to node positions, or None."""
+        result = self.__solve(genome, load_cases)
+        if result is None:
+            return None
+
+        __, d_costs_d_lengths, d_costs_d_forces, inverse, solutions, directions, lengths, worst_case = result
+        member_count = genome.member_count()
+        node_a_index = genome.members[:, 0]
+        node_b_index = genome.members[:, 1]
+        __, distributed_forces = genome.get_load_case_forces(load_cases)
+        if load_cases is None:
+            distributed_forces = distributed_forces[None]
+
+        # Adjoint system A^T lambda = dJ/dx, a column per load case, only the worst one of each member counts
+        cost_gradient = np.zeros(solutions.shape)
+        cost_gradient[worst_case, np.arange(member_count)] = d_costs_d_forces
+        adjoints = (inverse.T @ cost_gradient.T).T.reshape(len(solutions), -1, 2)
+
+        # dJ/dd of member delta d = b - a, through the lengths and, by the adjoint, through the force coefficients
+        # (columns N (a - b) d / L) and the distributed forces lumped at the joints (w_x |d_y| / 2, w_y |d_x| / 2)
+        adjoint_difference = adjoints[:, node_a_index] - adjoints[:, node_b_index]
+        member_forces = solutions[:, :member_count, None]
+        projected = np.sum(adjoint_difference * directions, axis=2, keepdims=True)
+        coefficient_gradient = member_forces * (adjoint_difference - projected * directions) / lengths[:, None]
+
+        adjoint_sum = adjoints[:, node_a_index] + adjoints[:, node_b_index]
+        member_signs = np.sign(directions)
+        load_gradient = np.stack(
+            [
+                -distributed_forces[:, :, 1] / 2 * member_signs[:, 0] * adjoint_sum[:, :, 1],
+                -distributed_forces[:, :, 0] / 2 * member_signs[:, 1] * adjoint_sum[:, :, 0],
+            ],
+            axis=2,
+        )
+
+        delta_gradient = d_costs_d_lengths[:, None] * directions - np.sum(
+            coefficient_gradient - load_gradient, axis=0
+        )
+
+        gradient = np.zeros(genome.positions.shape)
+        np.add.at(gradient, node_b_index, delta_gradient)
+        np.add.at(gradient, node_a_index, -delta_gradient)
+
+        return gradient
+
+    def __solve(self, genome, load_cases):
+        applied_forces, distributed_forces = genome.get_load_case_forces(load_cases)
+        force_coefficient_matrix, resultant_force_vector, lengths, valid = Truss.assemble_arrays(
+            genome.positions[None],
+            genome.members[None],
+            genome.support_types,
+            applied_forces[None],
+            distributed_forces[None],
+        )
+        if force_coefficient_matrix is None or not valid[0]:
+            return None
+
+        try:
+            inverse = np.linalg.inv(force_coefficient_matrix[0])
+        except np.linalg.LinAlgError:
+            return None
+        self.solve_count += 1
+
+        # Solutions are (L, 2n), with a single row without load cases
+        resultant_force_vector = resultant_force_vector[0]
+        solutions = (inverse @ resultant_force_vector.reshape(len(inverse), -1)).T
+        if not np.all(np.isfinite(solutions)):
+            return None
+
+        member_count = genome.member_count()
+        lengths = lengths[0]
+        member_delta = genome.positions[genome.members[:, 1]] - genome.positions[genome.members[:, 0]]
+        directions = member_delta / lengths[:, None]
+
+        # Members are sized for the load case they are most utilized in
+        member_forces = solutions[:, :member_count]
+        worst_case = Truss.Member.get_utilizations(member_forces).argmax(axis=0)
+        worst_forces = member_forces[worst_case, np.arange(member_count)]
+
+        costs, d_costs_d_lengths, d_costs_d_forces = Truss.Member.get_smooth_costs(
+            lengths, worst_forces, self.smoothing
+        )
+
+        return (
+            float(costs.sum()),
+            d_costs_d_lengths,
+            d_costs_d_forces,
+            inverse,
+            solutions,
+            directions,
+            lengths,
+            worst_case,
+        )
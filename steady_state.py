@@ -0,0 +1,204 @@
+import bisect
+import random
+import numpy as np
+
+from contextlib import contextmanager
+
+from evolver import Evolver
+from genetics import evaluate_population
+
+
+class RankedPopulation:
+    """
+    The best {capacity} genomes seen so far, kept sorted by fitness as they are inserted one by one.
+    Genomes of equal fitness keep their insertion order, like the stable sort of Evolver.rank.
+    With {position_quantum} set, genomes building the same truss as one already kept are turned away,
+    see Genome.canonical_fingerprint.
+    """
+
+    def __init__(self, capacity, position_quantum=None):
+        self.capacity = capacity
+        self.position_quantum = position_quantum
+
+        self.genomes = []
+        # (fitness, insertion count) of each genome, sorted
+        self.__keys = []
+        self.__fingerprints = {}
+        self.__insertion_count = 0
+
+    def __len__(self):
+        return len(self.genomes)
+
+    def fitnesses(self):
+        return np.array([fitness for fitness, __ in self.__keys], dtype=np.float64)
+
+    def insert(self, genome, fitness):
+        """Inserts {genome} at its rank, dropping the worst genome when full. Returns whether it was kept."""
+        if len(self.genomes) >= self.capacity and fitness >= self.__keys[-1][0]:
+            return False
+
+        fingerprint = None
+        if self.position_quantum is not None:
+            fingerprint = genome.canonical_fingerprint(self.position_quantum)
+            if fingerprint in self.__fingerprints:
+                return False
+
+        key = (fitness, self.__insertion_count)
+        self.__insertion_count += 1
+        rank = bisect.bisect(self.__keys, key)
+        self.__keys.insert(rank, key)
+        self.genomes.insert(rank, genome)
+        if fingerprint is not None:
+            self.__fingerprints[fingerprint] = key
+
+        if len(self.genomes) > self.capacity:
+            self.__keys.pop()
+            dropped_genome = self.genomes.pop()
+            if self.position_quantum is not None:
+                del self.__fingerprints[dropped_genome.canonical_fingerprint(self.position_quantum)]
+
+        return True
+
+
+class SteadyStateEvolver(Evolver):
+    """
+    Evolver without a generation barrier: offspring are bred and evaluated in small jobs of {batch_size}
+    that stream through the workers, every finished job being merged into a RankedPopulation right away,
+    and new parents are always drawn from the current ranking.
+    With a WorkerPool, {jobs_per_worker} jobs per worker are kept queued so no worker waits on the others,
+    on slow solves or on this process. Offspring are then merged in the order jobs finish,
+    so runs with a WorkerPool are not reproducible from a seed, unlike those without.
+
+    To keep observers, checkpoints and metrics working, a "generation" is counted every
+    population_size - survivor_count merged offspring, the population then being the current ranking,
+    which the first generation evaluates as a whole.
+    Offspring worse than the whole ranking, or building the same truss as a ranked genome when deduplicating,
+    are dropped, the best genome is never lost. Genomes observers put in the population are ranked again with it.
+    Offspring are not paired with their parents, so a MutationSchedule only gets to restart.
+    """
+
+    def __init__(self, *args, batch_size=4, jobs_per_worker=2, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = batch_size
+        self.jobs_per_worker = jobs_per_worker
+
+        self.ranking = RankedPopulation(
+            self.population_size, self.position_quantum if self.deduplicate else None
+        )
+        # Offspring merged into the ranking during the last generation, and how many of them were kept
+        self.offspring_count = 0
+        self.accepted_count = 0
+
+    def rank(self):
+        """Evaluates and ranks the whole population the first time, then streams a generation of offspring into it."""
+        # Also when observers replaced genomes since the last generation, e.g. migrants or refined genomes
+        if len(self.population) != len(self.ranking) or any(
+            genome is not ranked_genome for genome, ranked_genome in zip(self.population, self.ranking.genomes)
+        ):
+            self.ranking = RankedPopulation(self.population_size, self.ranking.position_quantum)
+        if not self.ranking.genomes:
+            super().rank()
+
+            for genome, fitness in zip(self.population, self.fitnesses):
+                self.ranking.insert(genome, float(fitness))
+            # The ranking turns duplicates away, so it can hold fewer genomes than were ranked
+            self.__take_ranking()
+            return
+
+        offspring_target = self.population_size - self.survivor_count
+        self.offspring_count = 0
+        self.accepted_count = 0
+
+        with self.timed("evaluation"):
+            if self.workers is None:
+                while self.offspring_count < offspring_target:
+                    self.__merge(self.__breed_batch(self.select_parents(self.batch_size)))
+            else:
+                job_count = self.workers.n_workers * self.jobs_per_worker
+                while self.offspring_count < offspring_target:
+                    while self.workers.pending_breed_count() < job_count:
+                        self.__submit()
+                    __, offspring = self.workers.collect_breed()
+                    self.__merge(offspring)
+
+        with self.timed("ranking"):
+            self.__take_ranking()
+
+    def __take_ranking(self):
+        self.population = list(self.ranking.genomes)
+        self.fitnesses = self.ranking.fitnesses()
+        self.best_genome = self.population[0]
+        self.best_fitness = self.fitnesses[0]
+
+    def breed(self):
+        # The ranking is bred continuously by rank(), nothing waits for a whole generation
+        self.parents = []
+
+    def select_parents(self, count):
+        """Draws {count} parents from the current ranking, with the rank weights of Evolver.breed."""
+        return random.choices(
+            self.ranking.genomes, weights=self.selection_weights[: len(self.ranking)], k=count
+        )
+
+    def evaluate(self, genomes):
+        with self.__without_busy_workers():
+            return super().evaluate(genomes)
+
+    def mutate(self, genomes):
+        with self.__without_busy_workers():
+            return super().mutate(genomes)
+
+    @contextmanager
+    def __without_busy_workers(self):
+        # Blocking worker calls would pick up the results of queued jobs, so while there are any
+        # (e.g. an observer mutating between generations) this process does the work itself
+        workers = self.workers
+        if workers is not None and workers.pending_breed_count():
+            self.workers = None
+        try:
+            yield
+        finally:
+            self.workers = workers
+
+    def run(self, generations=None, time_budget=None):
+        try:
+            return super().run(generations=generations, time_budget=time_budget)
+        finally:
+            self.drain()
+
+    def drain(self):
+        """Waits for the jobs still queued on the workers and merges their offspring."""
+        if self.workers is None:
+            return
+
+        while self.workers.pending_breed_count():
+            __, offspring = self.workers.collect_breed()
+            self.__merge(offspring)
+
+    def __submit(self):
+        self.workers.submit_breed(
+            self.select_parents(self.batch_size),
+            rng=None if self.rng is None else self.rng.spawn(1)[0],
+            prescreen=self.prescreen,
+            load_cases=self.load_cases,
+            solver=self.solver,
+            geometry_checker=self.geometry_checker,
+            **self.mutation_parameters,
+        )
+
+    def __breed_batch(self, parents):
+        offspring = self.mutate(parents)
+        evaluate_population(
+            offspring,
+            prescreen=self.prescreen,
+            load_cases=self.load_cases,
+            solver=self.solver,
+            geometry_checker=self.geometry_checker,
+        )
+
+        return offspring
+
+    def __merge(self, offspring):
+        for genome in offspring:
+            self.offspring_count += 1
+            self.accepted_count += self.ranking.insert(genome, genome.assignment_fitness)
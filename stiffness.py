@@ -0,0 +1,193 @@
+import numpy as np
+from truss import Truss
+
+
+class StiffnessSolver:
+    """
+    Solves trusses with the direct stiffness method, as an alternative to the method of joints of Truss.solve.
+
+    Every member is an axial spring of stiffness EA / L, so trusses with redundant members (statically indeterminate)
+    can be solved as well as determinate ones, for which both methods give the same internal forces.
+    The stiffness matrix of a whole stack of trusses is assembled as one sparse block diagonal matrix
+    and factorized once, which scales to trusses with thousands of members.
+
+    Needs scipy, which is only imported once a truss is solved.
+    """
+
+    def __init__(self, axial_stiffness=8e7, singular_pivot_tolerance=1e-10, zero_force_tolerance=1e-9):
+        # {axial_stiffness} is the E·A of every member in newtons, a scalar or one value per member.
+        # Trusses with a pivot below {singular_pivot_tolerance} times their largest one are mechanisms.
+        # Internal forces below {zero_force_tolerance} times the largest one of their truss are set to 0.
+        self.axial_stiffness = axial_stiffness
+        self.singular_pivot_tolerance = singular_pivot_tolerance
+        self.zero_force_tolerance = zero_force_tolerance
+
+    def key(self):
+        """Identifies the solver in FitnessCache kinds, fitnesses depend on the stiffness of indeterminate trusses."""
+        return (
+            "stiffness",
+            np.asarray(self.axial_stiffness, dtype=np.float64).tobytes(),
+            self.singular_pivot_tolerance,
+            self.zero_force_tolerance,
+        )
+
+    def solve(self, truss):
+        """
+        Returns (internal_forces, displacements) of {truss}, positive internal forces being tension.
+        Raises np.linalg.LinAlgError if it is a mechanism or has coincident nodes.
+        """
+        positions, members, support_types, applied_forces, distributed_forces = truss.to_arrays()
+        internal_forces, displacements, __, solved = self.solve_arrays(
+            positions[None], members[None], support_types, applied_forces[None], distributed_forces[None]
+        )
+        if not solved[0]:
+            raise np.linalg.LinAlgError("Truss is a mechanism.")
+
+        return internal_forces[0], displacements[0]
+
+    def solve_arrays(self, positions, members, support_types, applied_forces, distributed_forces):
+        """
+        Solves a stack of trusses sharing node count, member count and support layout,
+        taking the arguments of Truss.solve_arrays, load case axis included.
+
+        Returns (internal_forces, displacements, lengths, solved): internal_forces is (B, m), or (B, L, m) with
+        load cases, and can be costed by Truss.get_assignment_cost_arrays. displacements is (B, n, 2) or (B, L, n, 2).
+        Unlike Truss.solve_arrays any member count works, trusses that are mechanisms are not solved.
+        """
+        from scipy.sparse import coo_matrix
+        from scipy.sparse.linalg import splu
+
+        batch_size, node_count = positions.shape[:2]
+        member_count = members.shape[1]
+        single_load_case = applied_forces.ndim == 3
+        load_case_count = 1 if single_load_case else applied_forces.shape[1]
+
+        batch_index = np.arange(batch_size)[:, None]
+        node_a_index = members[:, :, 0]
+        node_b_index = members[:, :, 1]
+
+        member_delta = positions[batch_index, node_b_index] - positions[batch_index, node_a_index]
+        lengths = np.hypot(member_delta[:, :, 0], member_delta[:, :, 1])
+
+        solved = np.all(lengths > 0, axis=1)
+        safe_lengths = np.where(lengths > 0, lengths, 1)
+        directions = member_delta / safe_lengths[:, :, None]
+        spring_stiffness = np.broadcast_to(self.axial_stiffness, (batch_size, member_count)) / safe_lengths
+
+        # Degrees of freedom held by the supports, the others are numbered in order across the stack
+        fixed = np.zeros((node_count, 2), dtype=bool)
+        for node_index, support_type in enumerate(support_types):
+            match Truss.Node.SupportTypes(support_type):
+                case Truss.Node.SupportTypes.FIXED:
+                    fixed[node_index] = True
+                case Truss.Node.SupportTypes.ROLLER_HORIZONTAL:
+                    fixed[node_index, 1] = True
+                case Truss.Node.SupportTypes.ROLLER_VERTICAL:
+                    fixed[node_index, 0] = True
+
+        free_dof_count = int((~fixed).sum())
+        free_index = np.full((batch_size, 2 * node_count), -1, dtype=np.int64)
+        free_index[:, ~fixed.ravel()] = (
+            free_dof_count * np.arange(batch_size)[:, None] + np.arange(free_dof_count)[None, :]
+        )
+
+        # Member stiffness matrices k * [[cc^T, -cc^T], [-cc^T, cc^T]] over the dofs (ax, ay, bx, by)
+        member_dofs = free_index[
+            batch_index[:, :, None],
+            np.stack([2 * node_a_index, 2 * node_a_index + 1, 2 * node_b_index, 2 * node_b_index + 1], axis=2),
+        ]
+        signed_directions = np.concatenate([-directions, directions], axis=2)
+        member_stiffness = (
+            spring_stiffness[:, :, None, None] * signed_directions[:, :, :, None] * signed_directions[:, :, None, :]
+        )
+
+        # Entries on fixed dofs drop out, trusses with coincident nodes only keep an identity block
+        rows = np.broadcast_to(member_dofs[:, :, :, None], member_stiffness.shape)
+        columns = np.broadcast_to(member_dofs[:, :, None, :], member_stiffness.shape)
+        kept = (rows >= 0) & (columns >= 0) & solved[:, None, None, None]
+        unsolved_dofs = free_index[~solved].ravel()
+        unsolved_dofs = unsolved_dofs[unsolved_dofs >= 0]
+
+        total_free_dof_count = batch_size * free_dof_count
+        stiffness_matrix = coo_matrix(
+            (
+                np.concatenate([member_stiffness[kept], np.ones(len(unsolved_dofs))]),
+                (np.concatenate([rows[kept], unsolved_dofs]), np.concatenate([columns[kept], unsolved_dofs])),
+            ),
+            shape=(total_free_dof_count, total_free_dof_count),
+        ).tocsc()
+
+        # The resultant force vectors hold minus the loads, laid out as (B, L, 2n)
+        loads = -Truss.get_resultant_force_vectors(positions, members, applied_forces, distributed_forces)
+        loads = loads[:, None] if single_load_case else loads.transpose(0, 2, 1)
+        free_loads = loads[:, :, ~fixed.ravel()].transpose(0, 2, 1).reshape(total_free_dof_count, load_case_count)
+
+        free_displacements = np.zeros((total_free_dof_count, load_case_count))
+        if total_free_dof_count:
+            try:
+                factorization = splu(stiffness_matrix)
+            except RuntimeError:
+                # Exactly singular, solving the trusses one at a time finds which ones
+                return self.__solve_one_at_a_time(
+                    positions, members, support_types, applied_forces, distributed_forces
+                )
+
+            # A near zero pivot means the truss it belongs to is a mechanism, perm_c maps columns to pivots
+            pivots = np.abs(factorization.U.diagonal())[factorization.perm_c].reshape(batch_size, free_dof_count)
+            solved &= np.all(pivots > self.singular_pivot_tolerance * pivots.max(axis=1, keepdims=True), axis=1)
+
+            free_displacements = factorization.solve(free_loads)
+
+        displacements = np.zeros((batch_size, load_case_count, 2 * node_count))
+        displacements[:, :, ~fixed.ravel()] = free_displacements.reshape(
+            batch_size, free_dof_count, load_case_count
+        ).transpose(0, 2, 1)
+        solved &= np.all(np.isfinite(displacements), axis=(1, 2))
+        displacements = displacements.reshape(batch_size, load_case_count, node_count, 2)
+
+        # N = EA / L * (u_b - u_a) . c, the elongation times the spring stiffness
+        member_elongation = np.sum(
+            (displacements[batch_index, :, node_b_index] - displacements[batch_index, :, node_a_index])
+            * directions[:, :, None],
+            axis=3,
+        )
+        internal_forces = (spring_stiffness[:, :, None] * member_elongation).transpose(0, 2, 1)
+
+        # Zero force members come out as round-off, which would size them for a beam depending on the batch
+        internal_forces[
+            np.abs(internal_forces) <= self.zero_force_tolerance * np.abs(internal_forces).max(axis=2, keepdims=True)
+        ] = 0
+
+        if single_load_case:
+            internal_forces = internal_forces[:, 0]
+            displacements = displacements[:, 0]
+
+        return internal_forces, displacements, lengths, solved
+
+    def __solve_one_at_a_time(self, positions, members, support_types, applied_forces, distributed_forces):
+        results = [
+            self.solve_arrays(
+                positions[truss_index : truss_index + 1],
+                members[truss_index : truss_index + 1],
+                support_types,
+                applied_forces[truss_index : truss_index + 1],
+                distributed_forces[truss_index : truss_index + 1],
+            )
+            if len(positions) > 1
+            else self.__unsolved(positions, members, applied_forces)
+            for truss_index in range(len(positions))
+        ]
+
+        return tuple(np.concatenate([result[output_index] for result in results]) for output_index in range(4))
+
+    @staticmethod
+    def __unsolved(positions, members, applied_forces):
+        batch_index = np.arange(len(positions))[:, None]
+        member_delta = positions[batch_index, members[:, :, 1]] - positions[batch_index, members[:, :, 0]]
+
+        return (
+            np.zeros(applied_forces.shape[:-2] + (members.shape[1],)),
+            np.zeros(applied_forces.shape),
+            np.hypot(member_delta[:, :, 0], member_delta[:, :, 1]),
+            np.zeros(len(positions), dtype=bool),
+        )
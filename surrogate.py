@@ -0,0 +1,217 @@
+import numpy as np
+
+from collections import deque
+
+
+def genome_features(genome):
+    """
+    Returns a fixed length feature vector of {genome} for surrogate models: node and member counts,
+    member length statistics, the extent of the nodes, member direction shares and node degrees.
+    """
+    positions = genome.positions
+    member_delta = positions[genome.members[:, 1]] - positions[genome.members[:, 0]]
+    lengths = np.hypot(member_delta[:, 0], member_delta[:, 1])
+    # 0 for horizontal members, 1 for vertical ones
+    steepness = np.abs(np.arctan2(member_delta[:, 1], member_delta[:, 0]))
+    steepness = np.minimum(steepness, np.pi - steepness) / (np.pi / 2)
+    degrees = np.bincount(genome.members.ravel(), minlength=genome.node_count())
+    mutable_positions = positions[genome.position_is_mutable]
+    if not len(mutable_positions):
+        mutable_positions = positions
+
+    return np.array(
+        [
+            genome.node_count(),
+            genome.member_count(),
+            lengths.sum(),
+            lengths.mean(),
+            lengths.max(),
+            lengths.min(),
+            np.count_nonzero(lengths < 1),
+            positions[:, 1].min(),
+            positions[:, 1].max(),
+            mutable_positions[:, 1].mean(),
+            mutable_positions[:, 1].std(),
+            mutable_positions[:, 0].std(),
+            steepness.mean(),
+            np.count_nonzero(steepness > 0.9),
+            np.count_nonzero(steepness < 0.1),
+            degrees.max(),
+            degrees.min(),
+        ],
+        dtype=np.float64,
+    )
+
+
+def fitness_target(fitnesses):
+    """Surrogates model log fitness, which keeps penalties and unsolvable_fitness from swamping real costs."""
+    return np.log(np.maximum(fitnesses, 1.0))
+
+
+class RidgeSurrogate:
+    """Ridge regression of log fitness on standardized genome features, with a {alpha} penalty on the weights."""
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+        self.__mean = None
+        self.__scale = None
+        self.__weights = None
+        self.__intercept = 0.0
+
+    def fit(self, features, targets):
+        self.__mean = features.mean(axis=0)
+        self.__scale = np.where(features.std(axis=0) > 0, features.std(axis=0), 1.0)
+        standardized = (features - self.__mean) / self.__scale
+
+        self.__intercept = float(targets.mean())
+        self.__weights = np.linalg.solve(
+            standardized.T @ standardized + self.alpha * np.eye(features.shape[1]),
+            standardized.T @ (targets - self.__intercept),
+        )
+
+    def predict(self, features):
+        return (features - self.__mean) / self.__scale @ self.__weights + self.__intercept
+
+
+class KNNSurrogate:
+    """Mean log fitness of the {k} nearest training genomes in standardized feature space."""
+
+    def __init__(self, k=5):
+        self.k = k
+        self.__mean = None
+        self.__scale = None
+        self.__features = None
+        self.__targets = None
+
+    def fit(self, features, targets):
+        self.__mean = features.mean(axis=0)
+        self.__scale = np.where(features.std(axis=0) > 0, features.std(axis=0), 1.0)
+        self.__features = (features - self.__mean) / self.__scale
+        self.__targets = targets
+
+    def predict(self, features):
+        standardized = (features - self.__mean) / self.__scale
+        squared_distances = (
+            np.sum(standardized**2, axis=1)[:, None]
+            - 2 * standardized @ self.__features.T
+            + np.sum(self.__features**2, axis=1)[None, :]
+        )
+        k = min(self.k, len(self.__targets))
+        nearest = np.argpartition(squared_distances, k - 1, axis=1)[:, :k]
+
+        return self.__targets[nearest].mean(axis=1)
+
+
+def rank_correlation(predictions, targets):
+    """Spearman rank correlation of {predictions} and {targets}, ties broken by order."""
+    if len(predictions) < 2:
+        return np.nan
+
+    prediction_ranks = np.argsort(np.argsort(predictions, kind="stable"), kind="stable")
+    target_ranks = np.argsort(np.argsort(targets, kind="stable"), kind="stable")
+
+    return float(np.corrcoef(prediction_ranks, target_ranks)[0, 1])
+
+
+class SurrogateScreen:
+    """
+    Evolver observer that breeds {oversample} candidate offspring per offspring slot and only keeps the one
+    a surrogate model ({model}, a KNNSurrogate by default) predicts to be the cheapest, so only that one is solved.
+
+    The model is fitted every generation to the genome features (see genome_features) and real fitnesses
+    of the last {max_samples} evaluated genomes, and only screens once it has seen {min_samples}.
+    Before refitting, its predictions for the offspring it chose are compared with their real fitnesses:
+    rank_correlation and log_error hold the last generation's accuracy.
+    Solves saved are counted as the candidates bred but never sent to the solver.
+    Attach it with attach(evolver), before observers that read the bred population at "end" (e.g. a MutationSchedule)
+    so they see the offspring that were kept.
+    Only generational evolvers are screened, a SteadyStateEvolver breeds no offspring for it.
+    """
+
+    def __init__(self, model=None, oversample=4, min_samples=100, max_samples=2000):
+        self.model = KNNSurrogate() if model is None else model
+        self.oversample = oversample
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+
+        self.__features = deque(maxlen=max_samples)
+        self.__targets = deque(maxlen=max_samples)
+        self.__trained = False
+        # Offspring bred at the last "end", and their predicted targets when they were screened
+        self.__offspring = None
+        self.__predictions = None
+
+        # Accuracy on the last screened generation, and totals over the run
+        self.rank_correlation = np.nan
+        self.log_error = np.nan
+        self.candidate_count = 0
+        self.screened_out_count = 0
+
+    def attach(self, evolver):
+        evolver.add_observer(self.learn, event="ranked")
+        evolver.add_observer(self.screen, event="end")
+
+    def detach(self, evolver):
+        evolver.remove_observer(self.learn, event="ranked")
+        evolver.remove_observer(self.screen, event="end")
+
+    def metrics(self):
+        """Fields for MetricsRecorder records."""
+        return {
+            "surrogate_rank_correlation": self.rank_correlation,
+            "surrogate_log_error": self.log_error,
+            "surrogate_candidates": self.candidate_count,
+            "surrogate_screened_out": self.screened_out_count,
+        }
+
+    def learn(self, evolver):
+        # Every ranked genome at first, then only what was bred since, survivors are already known
+        learned_genomes = evolver.population if self.__offspring is None else self.__offspring
+
+        if self.__predictions is not None:
+            evaluated = [
+                (prediction, genome.assignment_fitness)
+                for genome, prediction in zip(self.__offspring, self.__predictions)
+                if genome.assignment_fitness is not None
+            ]
+            if evaluated:
+                predictions, fitnesses = np.array(evaluated).T
+                targets = fitness_target(fitnesses)
+                self.rank_correlation = rank_correlation(predictions, targets)
+                self.log_error = float(np.mean(np.abs(predictions - targets)))
+
+        for genome in learned_genomes:
+            if genome.assignment_fitness is not None:
+                self.__features.append(genome_features(genome))
+                self.__targets.append(fitness_target(genome.assignment_fitness))
+
+        if len(self.__targets) >= self.min_samples:
+            self.model.fit(np.array(self.__features), np.array(self.__targets))
+            self.__trained = True
+
+    def screen(self, evolver):
+        slots = [slot for slot, parent in enumerate(evolver.parents) if parent is not None]
+        self.__offspring = [evolver.population[slot] for slot in slots]
+        self.__predictions = None
+        if not self.__trained or not slots:
+            return
+
+        # Candidates of a slot are the offspring already bred and oversample - 1 more mutations of its parent
+        candidates = [[genome] for genome in self.__offspring]
+        parents = [evolver.parents[slot] for slot in slots]
+        for __ in range(self.oversample - 1):
+            for slot_candidates, candidate in zip(candidates, evolver.mutate(parents)):
+                slot_candidates.append(candidate)
+
+        flat_candidates = [candidate for slot_candidates in candidates for candidate in slot_candidates]
+        predictions = self.model.predict(np.array([genome_features(candidate) for candidate in flat_candidates]))
+        predictions = predictions.reshape(len(slots), self.oversample)
+        best_candidates = predictions.argmin(axis=1)
+
+        self.__offspring = [slot_candidates[best] for slot_candidates, best in zip(candidates, best_candidates)]
+        self.__predictions = predictions[np.arange(len(slots)), best_candidates]
+        for slot, genome in zip(slots, self.__offspring):
+            evolver.population[slot] = genome
+
+        self.candidate_count += len(flat_candidates)
+        self.screened_out_count += len(flat_candidates) - len(slots)
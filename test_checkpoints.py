@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+import pytest
+
+from checkpoints import CheckpointStore
+from evolver import Evolver
+
+
+def seeded_evolver(seed, use_rng):
+    random.seed(seed)
+    return Evolver(population_size=30, rng=np.random.default_rng(seed) if use_rng else None)
+
+
+@pytest.mark.parametrize("use_rng", [False, True], ids=["random", "rng"])
+def test_resumed_run_matches_uninterrupted_run(tmp_path, use_rng):
+    configuration = {"population_size": 30}
+    checkpoints = CheckpointStore(tmp_path / "run.trusslog", configuration=configuration)
+    evolver = seeded_evolver(0, use_rng)
+    evolver.add_observer(checkpoints.observe)
+    evolver.run(generations=6)
+
+    # Reopened as a resumed run would, with the index read back from disk
+    checkpoints = CheckpointStore(tmp_path / "run.trusslog")
+    assert [entry.generation for entry in checkpoints.entries()] == list(range(6))
+    checkpoint = checkpoints.load(checkpoints.entries()[3])
+    assert checkpoint["configuration"] == configuration
+    assert checkpoint["complete_population"]
+
+    # Seeded differently, restore has to bring back every random state
+    resumed_evolver = seeded_evolver(1, use_rng)
+    resumed_evolver.restore(checkpoint["generation"], checkpoint["population"], checkpoint["random_state"])
+    resumed_evolver.run(generations=2)
+
+    assert resumed_evolver.generation == evolver.generation
+    assert [genome.fingerprint() for genome in resumed_evolver.population] == [
+        genome.fingerprint() for genome in evolver.population
+    ]
+    assert np.array_equal(resumed_evolver.fitnesses, evolver.fitnesses)
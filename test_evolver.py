@@ -0,0 +1,34 @@
+import random
+
+import numpy as np
+
+from evolver import Evolver
+from workers import WorkerPool
+
+
+def seeded_run(seed, generations=5, workers=None):
+    # Seeds drawn by Genome() still come from random
+    random.seed(seed)
+    evolver = Evolver(population_size=30, rng=np.random.default_rng(seed), workers=workers)
+    evolver.run(generations=generations)
+
+    return [genome.fingerprint() for genome in evolver.population], evolver.fitnesses
+
+
+def test_seeded_runs_are_reproducible():
+    fingerprints, fitnesses = seeded_run(0)
+    other_fingerprints, other_fitnesses = seeded_run(0)
+
+    assert other_fingerprints == fingerprints
+    assert np.array_equal(other_fitnesses, fitnesses)
+    assert seeded_run(1)[0] != fingerprints
+
+
+def test_seeded_runs_with_workers_do_not_depend_on_the_worker_seeds():
+    with WorkerPool(n_workers=2, seed=0) as workers:
+        fingerprints, fitnesses = seeded_run(0, generations=3, workers=workers)
+    with WorkerPool(n_workers=2, seed=1) as workers:
+        other_fingerprints, other_fitnesses = seeded_run(0, generations=3, workers=workers)
+
+    assert other_fingerprints == fingerprints
+    assert np.array_equal(other_fitnesses, fitnesses)
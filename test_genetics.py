@@ -0,0 +1,160 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from genetics import Genome, pack_population, unpack_population
+
+
+@pytest.fixture(autouse=True)
+def debug_invariants(monkeypatch):
+    monkeypatch.setattr(Genome, "debug_invariants", True)
+
+
+def grown_genome(seed, added_nodes=6):
+    """Genome() with removable nodes, some of them the child of members of other nodes."""
+    random.seed(seed)
+    genome = Genome()
+    for __ in range(added_nodes):
+        node_a, node_b = random.sample(range(genome.node_count()), k=2)
+        new_node_index = genome.add_node(20 * (random.random() - 0.5), 20 * (random.random() - 0.5), node_a, node_b)
+        genome.add_member(random.randrange(new_node_index), new_node_index)
+
+    return genome
+
+
+def check_removed(before, after, removed_node_indices):
+    """Checks {after} against {before} rebuilt by hand without the nodes at {removed_node_indices}, by node id."""
+    removed_ids = set(before.node_ids[removed_node_indices].tolist())
+    kept = [node_index for node_index in range(before.node_count()) if before.node_ids[node_index] not in removed_ids]
+
+    assert sorted(after.node_ids.tolist()) == sorted(before.node_ids[kept].tolist())
+    after_indices = {node_id: node_index for node_index, node_id in enumerate(after.node_ids.tolist())}
+    for node_index in kept:
+        after_index = after_indices[int(before.node_ids[node_index])]
+        for name in ("positions", "support_types", "applied_forces", "position_is_mutable", "existance_is_mutable"):
+            assert np.array_equal(getattr(after, name)[after_index], getattr(before, name)[node_index])
+
+    # Members leaving a removed node are dropped, those hanging off one get another child
+    kept_members = Counter()
+    rewired_parents = Counter()
+    for parent_id, child_id in before.node_ids[before.members].tolist():
+        if parent_id in removed_ids:
+            continue
+        if child_id in removed_ids:
+            rewired_parents[parent_id] += 1
+        else:
+            kept_members[parent_id, child_id] += 1
+
+    remaining_members = Counter(map(tuple, after.node_ids[after.members].tolist()))
+    assert remaining_members & kept_members == kept_members
+    remaining_members -= kept_members
+    remaining_parents = Counter()
+    for (parent_id, child_id), count in remaining_members.items():
+        assert parent_id != child_id
+        remaining_parents[parent_id] += count
+    assert remaining_parents == rewired_parents
+
+    after.check_invariants()
+    for node_index in range(after.node_count()):
+        assert after.incident_members(node_index) == {
+            member_index for member_index, ends in enumerate(after.members.tolist()) if node_index in ends
+        }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_remove_node_matches_rebuild(seed):
+    genome = grown_genome(seed)
+    rng = np.random.default_rng(seed)
+
+    while genome.existance_is_mutable.any():
+        node_index = int(rng.choice(np.flatnonzero(genome.existance_is_mutable)))
+        before = genome.copy()
+        # Also with the incidence index built and kept up to date from earlier removals
+        genome.remove_node(node_index, rng=rng if seed % 2 else None)
+        check_removed(before, genome, [node_index])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_remove_nodes_matches_rebuild(seed):
+    genome = grown_genome(seed)
+    rng = np.random.default_rng(seed)
+    removable = np.flatnonzero(genome.existance_is_mutable)
+    removed_node_indices = np.sort(rng.choice(removable, size=len(removable) // 2, replace=False))
+
+    before = genome.copy()
+    genome.remove_nodes(removed_node_indices, rng)
+    check_removed(before, genome, removed_node_indices)
+
+    # The other nodes keep their order
+    kept = np.setdiff1d(np.arange(before.node_count()), removed_node_indices)
+    assert np.array_equal(genome.node_ids, before.node_ids[kept])
+
+
+def test_node_ids_survive_pack_and_unpack():
+    rng = np.random.default_rng(0)
+    random.seed(0)
+    genomes = [Genome() for __ in range(20)]
+    for __ in range(10):
+        genomes = Genome.mutate_population(genomes, rng, new_node_chance=0.5, remove_node_chance=0.2)
+
+    unpacked = unpack_population(pack_population(genomes))
+
+    assert any(genome.next_node_id > 9 for genome in genomes)
+    for genome, unpacked_genome in zip(genomes, unpacked):
+        assert np.array_equal(unpacked_genome.node_ids, genome.node_ids)
+        assert unpacked_genome.next_node_id == genome.next_node_id
+        assert unpacked_genome.fingerprint() == genome.fingerprint()
+        unpacked_genome.check_invariants()
+
+        # New nodes of unpacked genomes get ids no node had
+        new_node_index = unpacked_genome.add_node(0, 0, 0, 1)
+        assert unpacked_genome.node_ids[new_node_index] not in genome.node_ids
+
+
+def permuted(genome, node_order, member_order, flipped_members):
+    """Returns {genome} with its nodes and members reordered and the ends of {flipped_members} swapped."""
+    state = genome.__getstate__()
+    node_array_names = (
+        "node_ids",
+        "positions",
+        "support_types",
+        "applied_forces",
+        "position_is_mutable",
+        "existance_is_mutable",
+    )
+    for name in node_array_names:
+        state[name] = state[name][node_order]
+    node_indices = np.argsort(node_order)
+    members = node_indices[state["members"][member_order]]
+    members[flipped_members] = members[flipped_members, ::-1]
+    state["members"] = members.astype(np.int32)
+    state["child_is_mutable"] = state["child_is_mutable"][member_order]
+
+    permuted_genome = Genome.__new__(Genome)
+    permuted_genome.__setstate__(state)
+
+    return permuted_genome
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_canonical_fingerprint_ignores_node_and_member_order(seed):
+    genome = grown_genome(seed)
+    rng = np.random.default_rng(seed)
+
+    permuted_genome = permuted(
+        genome,
+        rng.permutation(genome.node_count()),
+        rng.permutation(genome.member_count()),
+        rng.random(genome.member_count()) < 0.5,
+    )
+    permuted_genome.check_invariants()
+
+    assert permuted_genome.canonical_fingerprint() == genome.canonical_fingerprint()
+    assert permuted_genome.fingerprint() != genome.fingerprint()
+
+    # Moving a node by more than the quantum makes it another truss
+    moved_positions = genome.positions.copy()
+    moved_positions[-1] += 0.01
+    assert genome.moved(moved_positions).canonical_fingerprint() != genome.canonical_fingerprint()
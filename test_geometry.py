@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from geometry import GeometryChecker, GeometryStatus
+
+
+def random_truss(rng, node_count=60, member_count=90, clash_count=5):
+    """Random positions and members, with {clash_count} nodes placed on members and as many next to other nodes."""
+    positions = 20 * (rng.random((node_count, 2)) - 0.5)
+    members = np.stack(
+        [rng.integers(node_count, size=member_count), rng.integers(node_count - 1, size=member_count)], axis=1
+    )
+    members[:, 1] += members[:, 1] >= members[:, 0]
+
+    for node_index in rng.choice(node_count, size=clash_count, replace=False):
+        node_a, node_b = members[rng.integers(member_count)]
+        if node_index not in (node_a, node_b):
+            positions[node_index] = (positions[node_a] + positions[node_b]) / 2
+    for node_index in rng.choice(node_count, size=clash_count, replace=False):
+        positions[node_index] = positions[rng.integers(node_count)] + 0.1 * rng.random(2)
+
+    return positions, members
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_grid_finds_the_violations_comparing_every_pair_finds(seed):
+    positions, members = random_truss(np.random.default_rng(seed))
+    grid = GeometryChecker(brute_force_size=0).find_violations(positions, members)
+    brute_force = GeometryChecker(brute_force_size=10**6).find_violations(positions, members)
+
+    for name, pairs in brute_force.items():
+        assert len(pairs), name
+        assert np.array_equal(np.unique(grid[name], axis=0), np.unique(pairs, axis=0)), name
+
+
+@pytest.mark.parametrize("node_count", [6, 60])
+def test_check_batch_matches_check(node_count):
+    rng = np.random.default_rng(node_count)
+    checker = GeometryChecker()
+    statuses = []
+
+    for member_count, clash_count in [(node_count + 4, 2), (3, 0)]:
+        trusses = [random_truss(rng, node_count, member_count, clash_count) for __ in range(50)]
+        positions = np.stack([truss_positions for truss_positions, __ in trusses])
+        members = np.stack([truss_members for __, truss_members in trusses])
+
+        batch_statuses = checker.check_batch(positions, members)
+        assert batch_statuses == [checker.check(*truss) for truss in trusses]
+        statuses += batch_statuses
+
+    assert GeometryStatus.VALID in statuses
+    assert len(set(statuses)) > 1
@@ -0,0 +1,34 @@
+import random
+
+import numpy as np
+import pytest
+
+from genetics import Genome
+from refinement import PositionRefiner
+
+
+def finite_difference_gradient(refiner, genome, load_cases, step=1e-6):
+    gradient = np.zeros(genome.positions.shape)
+    for index in np.ndindex(*gradient.shape):
+        costs = []
+        for offset in (step, -step):
+            moved_genome = genome.copy()
+            moved_genome.positions[index] += offset
+            costs.append(refiner.get_smooth_cost(moved_genome, load_cases))
+        gradient[index] = (costs[0] - costs[1]) / (2 * step)
+
+    return gradient
+
+
+@pytest.mark.parametrize("load_cases", [None, Genome.bridge_load_cases()], ids=["applied_forces", "load_cases"])
+@pytest.mark.parametrize("seed", range(3))
+def test_smooth_cost_gradient_matches_finite_differences(seed, load_cases):
+    random.seed(seed)
+    genome = Genome()
+    refiner = PositionRefiner()
+
+    gradient = refiner.get_smooth_cost_gradient(genome, load_cases)
+    expected = finite_difference_gradient(refiner, genome, load_cases)
+
+    assert gradient is not None
+    assert np.abs(gradient - expected).max() <= 1e-6 * np.abs(expected).max()
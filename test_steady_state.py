@@ -0,0 +1,18 @@
+import random
+
+from steady_state import SteadyStateEvolver
+
+
+def test_duplicates_in_the_first_generation_do_not_stall_breeding():
+    random.seed(0)
+    evolver = SteadyStateEvolver(population_size=40, deduplicate=True)
+    evolver.initialize()
+    evolver.population[1] = evolver.population[0]
+
+    evolver.step()
+    assert len(evolver.population) == len(evolver.ranking) == 39
+
+    for __ in range(3):
+        evolver.step()
+        assert evolver.offspring_count >= evolver.population_size - evolver.survivor_count
+    assert len(evolver.population) == evolver.population_size
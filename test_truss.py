@@ -0,0 +1,21 @@
+import itertools
+
+import numpy as np
+
+from truss import Truss
+
+
+def test_vectorized_assignment_costs_match_the_scalar_version():
+    lengths = [0.5, 1.0, 4.0]
+    internal_forces = [-1e6, -5000.0, 0.0, 5000.0, 1e6, np.nan]
+
+    for length, internal_force in itertools.product(lengths, internal_forces):
+        member = Truss.Member(Truss.Node(0, 0), Truss.Node(length, 0))
+        cost = Truss.Member.get_assignment_costs(np.array([length]), np.array([internal_force]))[0]
+
+        try:
+            expected = member.get_assignment_cost(internal_force)
+        except ValueError:
+            assert np.isnan(cost)
+        else:
+            assert cost == expected
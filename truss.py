@@ -56,6 +56,11 @@ class Truss:
         def get_fitness_cost(self):
             return self.cost()
 
+        @classmethod
+        def get_nodes_cost(cls, node_count):
+            """Returns cost of {node_count} gusset plates, works on arrays of counts."""
+            return cls.__node_cost * node_count
+
     class Member:
         class DistributedForce:
             def __init__(self, mag_per_dist_x, mag_per_dist_y):
@@ -113,6 +118,228 @@ class Truss:
 
             return self.cost() * math.ceil(beams_needed)
 
+        @classmethod
+        def get_utilizations(cls, internal_forces):
+            """
+            Returns the utilization of members with {internal_forces}, their tension over the allowable tensile force
+            or compression over the allowable compressive force. It is the number of beams a member needs,
+            members above 1 are overloaded as a single beam.
+            """
+            return np.where(
+                internal_forces < 0,
+                -internal_forces / cls.__max_compressive_force,
+                internal_forces / cls.__max_tensile_force,
+            )
+
+        @classmethod
+        def get_fitness_costs(cls, lengths, internal_forces):
+            """Vectorized get_fitness_cost over arrays of member lengths and internal forces."""
+            # fmax ignores nan forces like max() does in the scalar version
+            beams_needed = np.fmax(1, cls.get_utilizations(internal_forces))
+
+            costs = cls.__cost_per_length * lengths * beams_needed
+            costs[(beams_needed > 3) | (lengths < 1)] = 999999999
+
+            return costs
+
+        @classmethod
+        def get_smooth_costs(cls, lengths, internal_forces, smoothing=0.1):
+            """
+            Differentiable stand-in for get_fitness_costs, max(1, utilization) being replaced by a smooth maximum
+            whose corner is rounded over {smoothing}. The beam count cap and minimum length are left out.
+            Returns (costs, d_costs_d_lengths, d_costs_d_internal_forces), all shaped like {lengths}.
+            """
+            utilizations = cls.get_utilizations(internal_forces)
+            d_utilizations = np.where(
+                internal_forces < 0, -1 / cls.__max_compressive_force, 1 / cls.__max_tensile_force
+            )
+
+            root = np.sqrt((utilizations - 1) ** 2 + smoothing**2)
+            beams_needed = (1 + utilizations + root) / 2
+            d_beams_needed = (1 + (utilizations - 1) / root) / 2
+
+            costs = cls.__cost_per_length * lengths * beams_needed
+            return (
+                costs,
+                cls.__cost_per_length * beams_needed,
+                cls.__cost_per_length * lengths * d_beams_needed * d_utilizations,
+            )
+
+        @classmethod
+        def get_assignment_costs(cls, lengths, internal_forces):
+            """
+            Vectorized get_assignment_cost over arrays of member lengths and internal forces.
+            With an extra load case axis before the member axis of {internal_forces}, members are sized for
+            the envelope, the largest tension or compression they see in any load case.
+            """
+            beams_needed = cls.get_utilizations(internal_forces)
+            if beams_needed.ndim > lengths.ndim:
+                beams_needed = beams_needed.max(axis=-2)
+
+            costs = cls.__cost_per_length * lengths * np.ceil(beams_needed)
+            # Mirrors math.ceil raising on a nan force in the scalar version, which checks the length first
+            costs[np.isnan(beams_needed)] = np.nan
+            costs[(beams_needed > 3) | (lengths < 1)] = 999999999
+
+            return costs
+
+    class LoadCase:
+        """
+        One way of loading a truss: {node_forces}, a dict of node index to Force, added at those nodes and
+        {distributed_force} added along every member, on top of the truss' own applied and distributed forces
+        unless {include_own_forces} is False.
+        """
+
+        def __init__(self, node_forces=None, distributed_force=None, include_own_forces=True, name=None):
+            self.node_forces = {} if node_forces is None else node_forces
+            self.distributed_force = (
+                Truss.Member.DistributedForce(0, 0) if distributed_force is None else distributed_force
+            )
+            self.include_own_forces = include_own_forces
+            self.name = name
+
+        @classmethod
+        def moving_load(cls, node_indices, force, include_own_forces=True):
+            """Returns one load case per node of {node_indices} with {force} at that node, e.g. a truck crossing."""
+            return [
+                cls({node_index: force}, include_own_forces=include_own_forces, name=f"moving_load_{node_index}")
+                for node_index in node_indices
+            ]
+
+        def get_applied_forces(self, applied_forces):
+            """Returns the (n, 2) applied forces of this load case, given the truss' own {applied_forces}."""
+            forces = applied_forces.copy() if self.include_own_forces else np.zeros_like(applied_forces)
+            for node_index, force in self.node_forces.items():
+                forces[node_index] += force.magnitude_x, force.magnitude_y
+
+            return forces
+
+        def get_distributed_forces(self, distributed_forces):
+            """Returns the (m, 2) distributed forces of this load case, given the truss' own {distributed_forces}."""
+            forces = distributed_forces.copy() if self.include_own_forces else np.zeros_like(distributed_forces)
+            forces += self.distributed_force.mag_per_dist_x, self.distributed_force.mag_per_dist_y
+
+            return forces
+
+        def key(self):
+            """Returns a hashable summary of the loads, equal for load cases that load a truss the same way."""
+            return (
+                self.include_own_forces,
+                tuple(
+                    (node_index, force.magnitude_x, force.magnitude_y)
+                    for node_index, force in sorted(self.node_forces.items())
+                ),
+                self.distributed_force.mag_per_dist_x,
+                self.distributed_force.mag_per_dist_y,
+            )
+
+        def __repr__(self):
+            return f"Truss.LoadCase({self.name or self.key()})"
+
+        @staticmethod
+        def stack(load_cases, applied_forces, distributed_forces):
+            """Returns the (L, n, 2) applied and (L, m, 2) distributed forces of {load_cases} for one truss."""
+            return (
+                np.stack([load_case.get_applied_forces(applied_forces) for load_case in load_cases]),
+                np.stack([load_case.get_distributed_forces(distributed_forces) for load_case in load_cases]),
+            )
+
+    class Factorization:
+        """
+        Inverse of one truss' force coefficient matrix, kept with the arrays it was built from.
+        A truss differing from it in only a few members is re-solved with a Sherman-Morrison-Woodbury update
+        of this inverse in O(k n^2), instead of a full O(n^3) inversion.
+        """
+
+        # Updates of more than this many member columns are done as a full inversion instead
+        max_update_rank = 8
+        # An update is numerically unsafe, and a full inversion is done instead, when the capacitance matrix
+        # or the updated matrix is worse conditioned than this or the updated solution's relative residual
+        # is larger than this. Inverses failing the same checks are never kept, see is_accurate.
+        max_condition = 1e8
+        max_relative_residual = 1e-8
+        # Rounding errors add up over chained updates, so every this many updates a full inversion is done
+        max_chained_updates = 32
+
+        def __init__(self, positions, members, support_types, force_coefficient_matrix, inverse, chained_updates=0):
+            # The arrays must not be modified afterwards, genomes never modify shared arrays in place
+            self.positions = positions
+            self.members = members
+            self.support_types = support_types
+            self.force_coefficient_matrix = force_coefficient_matrix
+            self.inverse = inverse
+            self.chained_updates = chained_updates
+
+        def changed_members(self, positions, members, support_types):
+            """
+            Returns the indices of members whose column in the force coefficient matrix differs for the given truss,
+            or None if the truss has a different node count, member count or support layout.
+            """
+            if (
+                positions.shape != self.positions.shape
+                or members.shape != self.members.shape
+                or not np.array_equal(support_types, self.support_types)
+            ):
+                return None
+
+            moved_nodes = np.any(positions != self.positions, axis=1)
+            changed = np.any(members != self.members, axis=1) | np.any(moved_nodes[members], axis=1)
+
+            return np.flatnonzero(changed)
+
+        @classmethod
+        def is_accurate(cls, force_coefficient_matrix, inverse, full_solution, resultant_force_vector):
+            """
+            Returns whether {inverse} is safe to keep: the matrix is conditioned within max_condition,
+            estimated in O(n^2) from the 1-norms of the matrix and its inverse,
+            and {full_solution} solves the system within max_relative_residual.
+            A single residual is not enough, numerically singular matrices (e.g. with duplicate members)
+            can have one while their inverse is far off.
+            """
+            condition = np.linalg.norm(force_coefficient_matrix, 1) * np.linalg.norm(inverse, 1)
+            if not condition <= cls.max_condition:
+                return False
+
+            residual = np.linalg.norm(force_coefficient_matrix @ full_solution - resultant_force_vector)
+
+            return residual <= cls.max_relative_residual * max(np.linalg.norm(resultant_force_vector), 1)
+
+        def updated(self, positions, members, force_coefficient_matrix, resultant_force_vector, changed_members):
+            """
+            Returns (factorization, full_solution) for the given truss through a low-rank update,
+            or None if the update is numerically unsafe.
+            """
+            if self.chained_updates >= self.max_chained_updates:
+                return None
+
+            # A' = A + U E^T where E selects the changed columns
+            column_change = (
+                force_coefficient_matrix[:, changed_members] - self.force_coefficient_matrix[:, changed_members]
+            )
+            inverse_column_change = self.inverse @ column_change
+            capacitance = np.eye(len(changed_members)) + inverse_column_change[changed_members]
+
+            if np.linalg.cond(capacitance) > self.max_condition:
+                return None
+
+            inverse = self.inverse - inverse_column_change @ np.linalg.solve(
+                capacitance, self.inverse[changed_members]
+            )
+            full_solution = inverse @ resultant_force_vector
+
+            if not self.is_accurate(force_coefficient_matrix, inverse, full_solution, resultant_force_vector):
+                return None
+
+            factorization = Truss.Factorization(
+                positions,
+                members,
+                self.support_types,
+                force_coefficient_matrix,
+                inverse,
+                self.chained_updates + 1,
+            )
+            return factorization, full_solution
+
     def __init__(self, nodes, members):
         self.nodes = nodes
         self.members = members
@@ -225,30 +452,399 @@ class Truss:
             )
             # raise e
 
+    def get_member_lengths(self):
+        """Returns an array of member lengths, in the order of self.members."""
+        endpoints = np.array(
+            [
+                (m.connected_node_a.x, m.connected_node_a.y, m.connected_node_b.x, m.connected_node_b.y)
+                for m in self.members
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 4)
+
+        return np.hypot(endpoints[:, 2] - endpoints[:, 0], endpoints[:, 3] - endpoints[:, 1])
+
+    def get_member_utilizations(self, load_cases=None):
+        """
+        Returns an array of member utilizations (see Member.get_utilizations) in the order of self.members,
+        for the worst of {load_cases} when they are given. Raises if the truss cannot be solved.
+        """
+        if load_cases is None:
+            internal_forces = self.solve()[: len(self.members)]
+            return Truss.Member.get_utilizations(internal_forces)
+
+        solutions = self.solve_load_cases(load_cases)
+        if solutions is None:
+            raise np.linalg.LinAlgError("Unable to solve system, over/underconstrained.")
+
+        return Truss.Member.get_utilizations(solutions[:, : len(self.members)]).max(axis=0)
+
     def get_fitness_cost(self):
-        cost = 0
+        internal_forces = self.solve()[: len(self.members)]
+        member_costs = Truss.Member.get_fitness_costs(self.get_member_lengths(), internal_forces)
 
-        sol = self.solve()
-        for member_index, member in enumerate(self.members):
-            cost += member.get_fitness_cost(sol[member_index])
+        return float(member_costs.sum()) + Truss.Node.get_nodes_cost(len(self.nodes))
 
-        for node in self.nodes:
-            cost += node.get_fitness_cost()
+    def get_assignment_cost(self, load_cases=None):
+        if load_cases is not None:
+            return self.get_envelope_assignment_cost(load_cases)
+
+        internal_forces = self.solve()[: len(self.members)]
+        member_costs = Truss.Member.get_assignment_costs(self.get_member_lengths(), internal_forces)
+
+        cost = float(member_costs.sum()) + Truss.Node.get_nodes_cost(len(self.nodes))
+        if math.isnan(cost):
+            # Sizing a member for a nan force raised in math.ceil before this was vectorized
+            raise ValueError("Unable to size members for non-finite internal forces.")
 
         return cost
-    
-    def get_assignment_cost(self):
-        cost = 0
 
-        sol = self.solve()
-        for member_index, member in enumerate(self.members):
-            cost += member.get_assignment_cost(sol[member_index])
+    def solve_load_cases(self, load_cases):
+        """
+        Solves every load case of {load_cases} with a single factorization of the force coefficient matrix.
+        Returns an (L, m + r - 3) array with a row per load case as solve() returns it, None if it cannot be solved.
+        """
+        positions, members, support_types, applied_forces, distributed_forces = self.to_arrays()
+        applied_forces, distributed_forces = Truss.LoadCase.stack(load_cases, applied_forces, distributed_forces)
+
+        solutions, __, solved = Truss.solve_arrays(
+            positions[None], members[None], support_types, applied_forces[None], distributed_forces[None]
+        )
 
-        for node in self.nodes:
-            cost += node.cost()
+        return solutions[0] if solved[0] else None
+
+    def get_envelope_assignment_cost(self, load_cases):
+        """get_assignment_cost with every member sized for the worst of {load_cases}, raises if it cannot be solved."""
+        solutions = self.solve_load_cases(load_cases)
+        if solutions is None:
+            raise np.linalg.LinAlgError("Unable to solve system, over/underconstrained.")
+
+        member_costs = Truss.Member.get_assignment_costs(self.get_member_lengths(), solutions[:, : len(self.members)])
+
+        cost = float(member_costs.sum()) + Truss.Node.get_nodes_cost(len(self.nodes))
+        if math.isnan(cost):
+            raise ValueError("Unable to size members for non-finite internal forces.")
 
         return cost
 
+    def to_arrays(self):
+        """Returns (positions, members, support_types, applied_forces, distributed_forces) as numpy arrays."""
+        node_index_dict = {node: ind for ind, node in enumerate(self.nodes)}
+
+        positions = np.array([(node.x, node.y) for node in self.nodes], dtype=np.float64)
+        support_types = np.array(
+            [node.support_type.value for node in self.nodes], dtype=np.int8
+        )
+        applied_forces = np.array(
+            [
+                (node.applied_force.magnitude_x, node.applied_force.magnitude_y)
+                for node in self.nodes
+            ],
+            dtype=np.float64,
+        )
+        members = np.array(
+            [
+                (node_index_dict[m.connected_node_a], node_index_dict[m.connected_node_b])
+                for m in self.members
+            ],
+            dtype=np.int32,
+        ).reshape(-1, 2)
+        distributed_forces = np.array(
+            [
+                (m.distributed_force.mag_per_dist_x, m.distributed_force.mag_per_dist_y)
+                for m in self.members
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+
+        return positions, members, support_types, applied_forces, distributed_forces
+
+    @staticmethod
+    def assemble_arrays(positions, members, support_types, applied_forces, distributed_forces):
+        """
+        Builds the force coefficient matrices and resultant force vectors of a stack of trusses
+        sharing node count, member count and support layout, see solve_arrays for the argument shapes.
+        Returns (force_coefficient_matrices, resultant_force_vectors, lengths, valid), the matrices being None
+        when the systems are not square. Trusses with coincident nodes are not valid and get an identity matrix.
+        With a load case axis in the forces, resultant_force_vectors is (B, 2n, L), one column per load case.
+        """
+        batch_size, node_count = positions.shape[:2]
+        member_count = members.shape[1]
+
+        reaction_rows = []
+        for node_index, support_type in enumerate(support_types):
+            match Truss.Node.SupportTypes(support_type):
+                case Truss.Node.SupportTypes.FIXED:
+                    reaction_rows += [2 * node_index, 2 * node_index + 1]
+                case Truss.Node.SupportTypes.ROLLER_HORIZONTAL:
+                    reaction_rows.append(2 * node_index + 1)
+                case Truss.Node.SupportTypes.ROLLER_VERTICAL:
+                    reaction_rows.append(2 * node_index)
+
+        batch_index = np.arange(batch_size)[:, None]
+        node_a_index = members[:, :, 0]
+        node_b_index = members[:, :, 1]
+
+        member_delta = positions[batch_index, node_b_index] - positions[batch_index, node_a_index]
+        lengths = np.hypot(member_delta[:, :, 0], member_delta[:, :, 1])
+
+        # Only square systems can be solved, matching the ValueError/IndexError paths of solve()
+        if member_count + len(reaction_rows) != 2 * node_count:
+            return None, None, lengths, np.zeros(batch_size, dtype=bool)
+
+        # Coincident nodes raise ZeroDivisionError in solve()
+        valid = np.all(lengths > 0, axis=1)
+        safe_lengths = np.where(lengths > 0, lengths, 1)
+        member_cos = member_delta[:, :, 0] / safe_lengths
+        member_sin = member_delta[:, :, 1] / safe_lengths
+
+        force_coefficient_matrix = np.zeros((batch_size, 2 * node_count, 2 * node_count))
+        member_columns = np.arange(member_count)[None, :]
+
+        force_coefficient_matrix[batch_index, 2 * node_a_index, member_columns] = member_cos
+        force_coefficient_matrix[batch_index, 2 * node_a_index + 1, member_columns] = member_sin
+        force_coefficient_matrix[batch_index, 2 * node_b_index, member_columns] = -member_cos
+        force_coefficient_matrix[batch_index, 2 * node_b_index + 1, member_columns] = -member_sin
+        force_coefficient_matrix[
+            :, reaction_rows, member_count + np.arange(len(reaction_rows))
+        ] = 1
+
+        # Unsolvable trusses get an identity system so they don't poison a batched solve
+        force_coefficient_matrix[~valid] = np.eye(2 * node_count)
+
+        resultant_force_vector = Truss.get_resultant_force_vectors(
+            positions, members, applied_forces, distributed_forces
+        )
+
+        return force_coefficient_matrix, resultant_force_vector, lengths, valid
+
+    @staticmethod
+    def get_resultant_force_vectors(positions, members, applied_forces, distributed_forces):
+        """
+        Returns the right hand sides of the joint equilibrium equations of a stack of trusses,
+        minus the applied forces and the distributed forces lumped at the joints, with 2 rows per node.
+        See solve_arrays for the argument shapes, with a load case axis the vectors are (B, 2n, L).
+        """
+        batch_size, node_count = positions.shape[:2]
+
+        batch_index = np.arange(batch_size)[:, None]
+        node_a_index = members[:, :, 0]
+        node_b_index = members[:, :, 1]
+        member_delta = positions[batch_index, node_b_index] - positions[batch_index, node_a_index]
+
+        # Load cases are laid out as a batch of B * L trusses sharing their geometry
+        single_load_case = applied_forces.ndim == 3
+        if single_load_case:
+            applied_forces = applied_forces[:, None]
+            distributed_forces = distributed_forces[:, None]
+        load_case_count = applied_forces.shape[1]
+
+        # Distributed forces are split evenly between both joints of a member
+        force_x_per_joint = distributed_forces[:, :, :, 0] * np.abs(member_delta[:, None, :, 1]) / 2
+        force_y_per_joint = distributed_forces[:, :, :, 1] * np.abs(member_delta[:, None, :, 0]) / 2
+
+        flat_offset = 2 * node_count * np.arange(batch_size * load_case_count).reshape(batch_size, load_case_count, 1)
+        node_a_offset = flat_offset + 2 * node_a_index[:, None]
+        node_b_offset = flat_offset + 2 * node_b_index[:, None]
+        resultant_force_vector = -applied_forces.reshape(batch_size, load_case_count, 2 * node_count)
+        resultant_force_vector -= np.bincount(
+            np.concatenate(
+                [
+                    node_a_offset.ravel(),
+                    (node_a_offset + 1).ravel(),
+                    node_b_offset.ravel(),
+                    (node_b_offset + 1).ravel(),
+                ]
+            ),
+            weights=np.concatenate([force_x_per_joint.ravel(), force_y_per_joint.ravel()] * 2),
+            minlength=batch_size * load_case_count * 2 * node_count,
+        ).reshape(batch_size, load_case_count, 2 * node_count)
+
+        if single_load_case:
+            resultant_force_vector = resultant_force_vector[:, 0]
+        else:
+            resultant_force_vector = resultant_force_vector.transpose(0, 2, 1)
+
+        return resultant_force_vector
+
+    @staticmethod
+    def solve_arrays(positions, members, support_types, applied_forces, distributed_forces):
+        """
+        Solves a stack of trusses sharing node count, member count and support layout.
+
+        positions (B, n, 2), members (B, m, 2), applied_forces (B, n, 2) and distributed_forces (B, m, 2)
+        are per truss, support_types (n,) is shared. Returns (solutions, lengths, solved) where
+        solutions matches the output of solve() for every truss with solved set.
+
+        Several load cases are solved at once with forces of shape (B, L, n, 2) and (B, L, m, 2),
+        factorizing each matrix once for all of them. Solutions then have shape (B, L, m + r - 3).
+        """
+        batch_size, node_count = positions.shape[:2]
+        single_load_case = applied_forces.ndim == 3
+        load_case_shape = () if single_load_case else (applied_forces.shape[1],)
+
+        force_coefficient_matrix, resultant_force_vector, lengths, solved = Truss.assemble_arrays(
+            positions, members, support_types, applied_forces, distributed_forces
+        )
+
+        if force_coefficient_matrix is None:
+            reaction_count = sum(
+                Truss.Node.SupportTypes.get_reaction_component_count(Truss.Node.SupportTypes(support_type))
+                for support_type in support_types
+            )
+            return (
+                np.zeros((batch_size, *load_case_shape, members.shape[1] + reaction_count - 3)),
+                lengths,
+                solved,
+            )
+
+        if single_load_case:
+            resultant_force_vector = resultant_force_vector[:, :, None]
+
+        try:
+            full_solutions = np.linalg.solve(force_coefficient_matrix, resultant_force_vector)
+        except np.linalg.LinAlgError:
+            # At least one singular system, fall back to solving them one at a time
+            full_solutions = np.zeros(resultant_force_vector.shape)
+            for truss_index in range(batch_size):
+                try:
+                    full_solutions[truss_index] = np.linalg.solve(
+                        force_coefficient_matrix[truss_index],
+                        resultant_force_vector[truss_index],
+                    )
+                except np.linalg.LinAlgError:
+                    solved[truss_index] = False
+
+        # Load cases go before the unknowns, dropping the unused reaction forces as in solve()
+        full_solutions = full_solutions.transpose(0, 2, 1)
+        if single_load_case:
+            full_solutions = full_solutions[:, 0]
+
+        return full_solutions[..., :-3], lengths, solved
+
+    @staticmethod
+    def solve_with_factorization(
+        positions, members, support_types, applied_forces, distributed_forces, factorization=None
+    ):
+        """
+        Solves a single truss given as arrays, see solve_arrays for their shapes without the batch dimension.
+        When {factorization} belongs to a truss differing in at most Factorization.max_update_rank members,
+        its inverse is updated instead of inverting from scratch.
+        Returns (solution, lengths, factorization), solution and factorization being None if the truss cannot be solved.
+        Factorizations too inaccurate to solve the truss itself (see Factorization.is_accurate) are not returned.
+        With load cases the solution is (L, m + r - 3), as for solve_arrays.
+        """
+        force_coefficient_matrix, resultant_force_vector, lengths, valid = Truss.assemble_arrays(
+            positions[None], members[None], support_types, applied_forces[None], distributed_forces[None]
+        )
+        lengths = lengths[0]
+
+        if force_coefficient_matrix is None or not valid[0]:
+            return None, lengths, None
+
+        force_coefficient_matrix = force_coefficient_matrix[0]
+        resultant_force_vector = resultant_force_vector[0]
+
+        if factorization is not None:
+            changed_members = factorization.changed_members(positions, members, support_types)
+
+            if changed_members is not None and len(changed_members) == 0:
+                # Transposing puts load cases first, single load case solutions are vectors and stay as they are
+                return (factorization.inverse @ resultant_force_vector)[:-3].T, lengths, factorization
+
+            if changed_members is not None and len(changed_members) <= factorization.max_update_rank:
+                update = factorization.updated(
+                    positions, members, force_coefficient_matrix, resultant_force_vector, changed_members
+                )
+                if update is not None:
+                    factorization, full_solution = update
+                    return full_solution[:-3].T, lengths, factorization
+
+        try:
+            inverse = np.linalg.inv(force_coefficient_matrix)
+        except np.linalg.LinAlgError:
+            return None, lengths, None
+
+        full_solution = inverse @ resultant_force_vector
+        if not Truss.Factorization.is_accurate(
+            force_coefficient_matrix, inverse, full_solution, resultant_force_vector
+        ):
+            # Numerically singular, e.g. duplicate members: solved as solve_arrays does and not kept for offspring
+            try:
+                full_solution = np.linalg.solve(force_coefficient_matrix, resultant_force_vector)
+            except np.linalg.LinAlgError:
+                return None, lengths, None
+            return full_solution[:-3].T, lengths, None
+
+        factorization = Truss.Factorization(
+            positions, members, support_types, force_coefficient_matrix, inverse
+        )
+        return full_solution[:-3].T, lengths, factorization
+
+    @staticmethod
+    def solve_batch(trusses):
+        """
+        Solves many trusses at once, grouping them by (node count, member count, support layout)
+        so each group is assembled and solved in a single stacked numpy call.
+        Returns a list of solutions in the same order, None where the truss could not be solved.
+        """
+        results = [None] * len(trusses)
+
+        for truss_indices, solutions, __, solved in Truss._solve_groups(trusses):
+            for group_index, truss_index in enumerate(truss_indices):
+                if solved[group_index]:
+                    results[truss_index] = solutions[group_index]
+
+        return results
+
+    @staticmethod
+    def _solve_groups(trusses):
+        truss_arrays = [truss.to_arrays() for truss in trusses]
+
+        groups = {}
+        for truss_index, (positions, members, support_types, __, __) in enumerate(truss_arrays):
+            group_key = (len(positions), len(members), support_types.tobytes())
+            groups.setdefault(group_key, []).append(truss_index)
+
+        for truss_indices in groups.values():
+            group_arrays = [truss_arrays[truss_index] for truss_index in truss_indices]
+            solutions, lengths, solved = Truss.solve_arrays(
+                np.stack([arrays[0] for arrays in group_arrays]),
+                np.stack([arrays[1] for arrays in group_arrays]),
+                group_arrays[0][2],
+                np.stack([arrays[3] for arrays in group_arrays]),
+                np.stack([arrays[4] for arrays in group_arrays]),
+            )
+
+            yield truss_indices, solutions, lengths, solved
+
+    @staticmethod
+    def get_assignment_cost_arrays(solutions, lengths, solved, node_count):
+        """
+        Vectorized get_assignment_cost for the output of solve_arrays, nan where unsolved.
+        Solutions with load cases are costed for their envelope, see Member.get_assignment_costs.
+        """
+        member_count = lengths.shape[1]
+
+        costs = Truss.Member.get_assignment_costs(lengths, solutions[..., :member_count]).sum(axis=1)
+        costs += Truss.Node.get_nodes_cost(node_count)
+        costs[~solved] = np.nan
+
+        return costs
+
+    @staticmethod
+    def get_assignment_cost_batch(trusses):
+        """Batched get_assignment_cost, returns an array of costs with nan where a truss could not be solved."""
+        costs = np.full(len(trusses), np.nan)
+
+        for truss_indices, solutions, lengths, solved in Truss._solve_groups(trusses):
+            node_count = len(trusses[truss_indices[0]].nodes)
+            costs[truss_indices] = Truss.get_assignment_cost_arrays(
+                solutions, lengths, solved, node_count
+            )
+
+        return costs
+
     def __repr__(self):
         node_indices = {node: i for i, node in enumerate(self.nodes)}
 
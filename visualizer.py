@@ -0,0 +1,167 @@
+import math
+import threading
+import numpy as np
+
+node_radius = 5
+
+# margin between truss visuals, px
+cell_margins = 20
+
+
+def map_to_cell(positions, x, y, width, height):
+    """Maps truss {positions} to screen space, fitting them in the given cell while keeping their aspect ratio."""
+    min_x, min_y = positions.min(axis=0)
+    max_x, max_y = positions.max(axis=0)
+    span_x = max(max_x - min_x, 1e-9)
+    span_y = max(max_y - min_y, 1e-9)
+
+    # Dealing with aspect ratio scaling
+    if span_x >= span_y:
+        output_x_min = x
+        output_x_span = width
+        output_y_span = height * span_y / span_x
+        output_y_min = y + (height - output_y_span) / 2
+    else:
+        output_y_min = y
+        output_y_span = height
+        output_x_span = width * span_x / span_y
+        output_x_min = x + (width - output_x_span) / 2
+
+    mapped = np.empty_like(positions)
+    mapped[:, 0] = output_x_min + (positions[:, 0] - min_x) / span_x * output_x_span
+    # Flipping y-coords because of screen-space coordiante disagreement
+    mapped[:, 1] = output_y_min + output_y_span - (positions[:, 1] - min_y) / span_y * output_y_span
+
+    return mapped
+
+
+class Visualizer:
+    """
+    Shows the top {top_k} genomes of an Evolver running in a background thread.
+    The evolver only hands over a snapshot each generation, the window redraws at most {max_fps} times a second
+    and moves its existing canvas items instead of recreating them.
+    """
+
+    def __init__(self, top_k=100, width=800, height=800, max_fps=5, title="Truss Optimizer 9001"):
+        self.top_k = top_k
+        self.width = width
+        self.height = height
+        self.max_fps = max_fps
+        self.title = title
+
+        self.columns = math.ceil(math.sqrt(top_k))
+        self.rows = math.ceil(top_k / self.columns)
+
+        self.__snapshot_lock = threading.Lock()
+        self.__snapshot = None
+        self.__snapshot_version = 0
+        self.__drawn_version = 0
+
+        # Per cell canvas item ids, grown as genomes gain nodes and members and hidden when unused
+        self.__cell_ovals = [[] for __ in range(top_k)]
+        self.__cell_lines = [[] for __ in range(top_k)]
+
+    def observe(self, evolver):
+        """Evolver observer, stores references to the top genomes' arrays, which genomes never modify in place."""
+        snapshot = [
+            (genome.positions, genome.members) for genome in evolver.population[: self.top_k]
+        ]
+
+        with self.__snapshot_lock:
+            self.__snapshot = snapshot
+            self.__snapshot_version += 1
+
+    def run(self, evolver, **run_kwargs):
+        """Runs evolver.run(**run_kwargs) in a background thread while showing its progress, returns its result."""
+        import tkinter as tk
+
+        self.root = tk.Tk()
+        self.root.geometry(f"{self.width}x{self.height}")
+        self.root.title(self.title)
+        self.root.protocol("WM_DELETE_WINDOW", evolver.stop)
+
+        self.canvas = tk.Canvas(self.root, width=self.width, height=self.height, bg="white")
+        self.canvas.pack(anchor=tk.CENTER, expand=True)
+
+        evolver.add_observer(self.observe)
+
+        result = {}
+
+        def run_evolver():
+            try:
+                result["best_genome"] = evolver.run(**run_kwargs)
+            except BaseException as e:
+                result["error"] = e
+
+        evolver_thread = threading.Thread(target=run_evolver, daemon=True)
+        evolver_thread.start()
+
+        def poll():
+            self.redraw()
+
+            if evolver_thread.is_alive():
+                self.root.after(max(1, int(1000 / self.max_fps)), poll)
+            else:
+                self.root.destroy()
+
+        poll()
+        self.root.mainloop()
+
+        # The window may have been closed while a generation was still running
+        evolver.stop()
+        evolver_thread.join()
+        evolver.remove_observer(self.observe)
+
+        if "error" in result:
+            raise result["error"]
+
+        return result["best_genome"]
+
+    def redraw(self):
+        with self.__snapshot_lock:
+            snapshot = self.__snapshot
+            version = self.__snapshot_version
+
+        if snapshot is None or version == self.__drawn_version:
+            return
+        self.__drawn_version = version
+
+        cell_width = (self.width - (self.columns + 1) * cell_margins) / self.columns
+        cell_height = (self.height - (self.rows + 1) * cell_margins) / self.rows
+
+        for cell_index in range(self.top_k):
+            if cell_index < len(snapshot):
+                positions, members = snapshot[cell_index]
+                r, c = divmod(cell_index, self.columns)
+                mapped = map_to_cell(
+                    positions,
+                    cell_margins + c * (cell_width + cell_margins),
+                    cell_margins + r * (cell_height + cell_margins),
+                    cell_width,
+                    cell_height,
+                )
+            else:
+                mapped = np.zeros((0, 2))
+                members = np.zeros((0, 2), dtype=np.int32)
+
+            self.__update_items(
+                self.__cell_ovals[cell_index],
+                np.hstack([mapped - node_radius, mapped + node_radius]).tolist(),
+                self.canvas.create_oval,
+            )
+            self.__update_items(
+                self.__cell_lines[cell_index],
+                np.hstack([mapped[members[:, 0]], mapped[members[:, 1]]]).tolist(),
+                self.canvas.create_line,
+            )
+
+    def __update_items(self, item_ids, coordinates, create_item):
+        while len(item_ids) < len(coordinates):
+            item_ids.append(create_item(0, 0, 0, 0))
+
+        for item_id, item_coordinates in zip(item_ids, coordinates):
+            self.canvas.coords(item_id, *item_coordinates)
+            self.canvas.itemconfigure(item_id, state="normal")
+
+        for item_id in item_ids[len(coordinates) :]:
+            self.canvas.itemconfigure(item_id, state="hidden")
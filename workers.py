@@ -0,0 +1,430 @@
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+import traceback
+import numpy as np
+
+from multiprocessing import resource_tracker, shared_memory
+from genetics import Genome, evaluate_population, pack_population, unpack_population
+
+
+def get_default_worker_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class SharedArrays:
+    """A dict of numpy arrays laid out back to back in a single shared memory block."""
+
+    def __init__(self, arrays):
+        self.layout = {}
+
+        offset = 0
+        for name, array in arrays.items():
+            # Keeping every array 8 byte aligned
+            offset = (offset + 7) // 8 * 8
+            self.layout[name] = (offset, array.dtype.str, array.shape)
+            offset += array.nbytes
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+
+        # Views must not outlive this function, close() fails while they exist
+        views = self.views()
+        for name in views:
+            views[name][...] = arrays[name]
+        del views
+
+    @classmethod
+    def attach(cls, name, layout):
+        shared_arrays = cls.__new__(cls)
+        shared_arrays.layout = layout
+        shared_arrays.shm = shared_memory.SharedMemory(name=name)
+
+        return shared_arrays
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def views(self):
+        """Returns arrays backed directly by the shared memory block, valid until close()."""
+        return {
+            name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.shm.buf, offset=offset)
+            for name, (offset, dtype, shape) in self.layout.items()
+        }
+
+    def close(self):
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _worker_main(task_queue, result_queue, seed):
+    # Forked workers would otherwise all inherit the parent's random state
+    random.seed(seed)
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            return
+
+        kind, task_index, shm_name, layout, start, stop, task_parameters = task
+
+        try:
+            result = _run_task(kind, shm_name, layout, start, stop, task_parameters)
+            result_queue.put((task_index, None) + result)
+        except Exception:
+            result_queue.put((task_index, traceback.format_exc(), None, None))
+
+
+def _run_task(kind, shm_name, layout, start, stop, task_parameters):
+    shared_population = SharedArrays.attach(shm_name, layout)
+    views = shared_population.views()
+    genomes = unpack_population(views, start, stop)
+
+    if kind == "evaluate":
+        rejections_before = Genome.prescreen_rejection_count
+        geometry_rejections_before = Genome.geometry_rejection_count
+        views["output_fitness"][start:stop] = evaluate_population(genomes, **task_parameters)
+        # Only the chunk's totals are needed, stored at its first genome
+        views["output_prescreen_rejections"][start] = Genome.prescreen_rejection_count - rejections_before
+        views["output_geometry_rejections"][start] = Genome.geometry_rejection_count - geometry_rejections_before
+
+    del views
+    shared_population.close()
+
+    if kind == "mutate":
+        offspring = _mutate(genomes, task_parameters)
+
+        # The parent process unlinks the offspring block once it has read it
+        shared_offspring = SharedArrays(pack_population(offspring))
+        shared_offspring.close()
+        return shared_offspring.name, shared_offspring.layout
+
+    if kind == "breed":
+        offspring = _mutate(genomes, task_parameters["mutation"])
+
+        counters_before = _counters()
+        evaluate_population(offspring, **task_parameters["evaluation"])
+        counters = _counters() - counters_before
+
+        shared_offspring = SharedArrays({**pack_population(offspring), "output_counters": counters})
+        shared_offspring.close()
+        return shared_offspring.name, shared_offspring.layout
+
+    return None, None
+
+
+def _counters():
+    return np.array(
+        [
+            Genome.solve_count,
+            Genome.solve_failure_count,
+            Genome.prescreen_rejection_count,
+            Genome.geometry_rejection_count,
+        ]
+    )
+
+
+def _mutate(genomes, mutation_parameters):
+    if "rng" in mutation_parameters:
+        return Genome.mutate_population(genomes, **mutation_parameters)
+
+    return [genome.create_mutation(**mutation_parameters) for genome in genomes]
+
+
+class WorkerPool:
+    """
+    Long-lived worker processes that evaluate and mutate populations.
+    Populations are handed over as flat arrays in shared memory instead of pickled genomes.
+
+    Besides the blocking evaluate() and mutate(), breeding jobs can be queued with submit_breed() and their
+    offspring picked up with collect_breed() as they finish. Collect every submitted job before the next blocking call.
+    """
+
+    # Seconds between checks that every worker is still alive while waiting for results
+    poll_interval = 1.0
+
+    def __init__(self, n_workers=None, seed=None):
+        self.n_workers = get_default_worker_count() if n_workers is None else n_workers
+
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "little")
+
+        # Workers have to share the parent's resource tracker, otherwise shared memory created by a worker
+        # and unlinked by the parent is reported as leaked when the worker exits
+        resource_tracker.ensure_running()
+
+        self.__task_queue = mp.Queue()
+        self.__result_queue = mp.Queue()
+        # Input blocks of submitted breeding jobs by task index, unlinked once collected
+        self.__breed_jobs = {}
+        self.__next_breed_task_index = 0
+        self.__processes = [
+            mp.Process(
+                target=_worker_main,
+                args=(self.__task_queue, self.__result_queue, seed + worker_index),
+                daemon=True,
+            )
+            for worker_index in range(self.n_workers)
+        ]
+
+        for process in self.__processes:
+            process.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        for __ in self.__processes:
+            self.__task_queue.put(None)
+
+        for process in self.__processes:
+            process.join()
+
+        self.__processes = []
+
+    def __get_result(self, timeout=None):
+        """
+        Waits up to {timeout} seconds (forever by default) for the next result, raising queue.Empty on timeout.
+        Raises a RuntimeError if a worker process died meanwhile, as its task would never finish.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.poll_interval
+            if deadline is not None:
+                wait = min(wait, max(deadline - time.monotonic(), 0))
+
+            try:
+                return self.__result_queue.get(timeout=wait)
+            except queue.Empty:
+                for process in self.__processes:
+                    if not process.is_alive():
+                        raise RuntimeError(f"Worker process {process.pid} died with exit code {process.exitcode}.")
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+
+    def __chunks(self, count):
+        chunk_count = min(self.n_workers, count)
+        bounds = np.linspace(0, count, chunk_count + 1).astype(int)
+
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def __run(self, kind, genomes, extra_arrays, task_parameters, chunk_parameters=None):
+        # {chunk_parameters} optionally holds extra task parameters per chunk, given the chunk count
+        if self.__breed_jobs:
+            raise RuntimeError("Breeding jobs are still pending, collect them first.")
+
+        shared_population = SharedArrays({**pack_population(genomes), **extra_arrays})
+        chunks = self.__chunks(len(genomes))
+        if chunk_parameters is None:
+            chunk_parameters = [{}] * len(chunks)
+        else:
+            chunk_parameters = chunk_parameters(len(chunks))
+
+        try:
+            for task_index, (start, stop) in enumerate(chunks):
+                self.__task_queue.put(
+                    (
+                        kind,
+                        task_index,
+                        shared_population.name,
+                        shared_population.layout,
+                        start,
+                        stop,
+                        {**task_parameters, **chunk_parameters[task_index]},
+                    )
+                )
+
+            results = [None] * len(chunks)
+            errors = []
+            for __ in chunks:
+                task_index, error, shm_name, layout = self.__get_result()
+                results[task_index] = (shm_name, layout)
+                if error is not None:
+                    errors.append(error)
+
+            if errors:
+                for shm_name, __ in results:
+                    if shm_name is not None:
+                        shared_memory.SharedMemory(name=shm_name).unlink()
+
+                raise RuntimeError("Worker task failed:\n" + errors[0])
+
+            return shared_population, results
+        except BaseException:
+            shared_population.unlink()
+            raise
+
+    def evaluate(self, genomes, cache=None, prescreen=False, load_cases=None, solver=None, geometry_checker=None):
+        """
+        Returns the same fitness array as evaluate_population(genomes, prescreen=prescreen, load_cases=load_cases,
+        solver=solver, geometry_checker=geometry_checker), computed across the workers.
+        Only genomes without a stored fitness or an entry in {cache} (Genome.fitness_cache by default) are sent.
+        """
+        if cache is None:
+            cache = Genome.fitness_cache
+
+        fitnesses = np.zeros(len(genomes), dtype=np.float64)
+
+        pending = {}
+        for genome in genomes:
+            if genome.assignment_fitness is not None:
+                continue
+
+            cache_key = cache.key(genome, Genome.assignment_cache_kind(load_cases, solver, geometry_checker))
+            genome.assignment_fitness = cache.get(cache_key)
+            if genome.assignment_fitness is None:
+                pending.setdefault(cache_key, []).append(genome)
+
+        if pending:
+            unique_genomes = [same_genomes[0] for same_genomes in pending.values()]
+            shared_population, __ = self.__run(
+                "evaluate",
+                unique_genomes,
+                {
+                    "output_fitness": np.zeros(len(unique_genomes), dtype=np.float64),
+                    "output_prescreen_rejections": np.zeros(len(unique_genomes), dtype=np.int64),
+                    "output_geometry_rejections": np.zeros(len(unique_genomes), dtype=np.int64),
+                },
+                {
+                    "prescreen": prescreen,
+                    "load_cases": load_cases,
+                    "solver": solver,
+                    "geometry_checker": geometry_checker,
+                },
+            )
+            views = shared_population.views()
+            output_fitnesses = views["output_fitness"].tolist()
+            rejections = int(views["output_prescreen_rejections"].sum())
+            geometry_rejections = int(views["output_geometry_rejections"].sum())
+            del views
+            shared_population.unlink()
+
+            # Solves happen in the workers, but are counted here so they show up in this process
+            unsolved_count = rejections + geometry_rejections
+            Genome.solve_count += len(unique_genomes) - unsolved_count
+            Genome.solve_failure_count += output_fitnesses.count(Genome.unsolvable_fitness) - unsolved_count
+            Genome.prescreen_rejection_count += rejections
+            Genome.geometry_rejection_count += geometry_rejections
+
+            for (cache_key, same_genomes), fitness in zip(pending.items(), output_fitnesses):
+                cache.put(cache_key, fitness)
+                for genome in same_genomes:
+                    genome.assignment_fitness = fitness
+
+        for genome_index, genome in enumerate(genomes):
+            fitnesses[genome_index] = genome.assignment_fitness
+
+        return fitnesses
+
+    def mutate(self, genomes, rng=None, **mutation_parameters):
+        """
+        Returns one Genome.create_mutation(**mutation_parameters) offspring per genome, in order.
+        With a numpy Generator as {rng} every chunk is mutated by Genome.mutate_population with its own stream
+        spawned from {rng}, so offspring don't depend on which worker mutates which chunk.
+        """
+        if not genomes:
+            return []
+
+        chunk_parameters = None
+        if rng is not None:
+            chunk_parameters = lambda chunk_count: [{"rng": chunk_rng} for chunk_rng in rng.spawn(chunk_count)]
+
+        shared_population, results = self.__run("mutate", genomes, {}, mutation_parameters, chunk_parameters)
+        shared_population.unlink()
+
+        offspring = []
+        for shm_name, layout in results:
+            shared_offspring = SharedArrays.attach(shm_name, layout)
+            offspring += unpack_population(shared_offspring.views())
+            shared_offspring.unlink()
+
+        return offspring
+
+    def pending_breed_count(self):
+        return len(self.__breed_jobs)
+
+    def submit_breed(
+        self,
+        parents,
+        rng=None,
+        prescreen=False,
+        load_cases=None,
+        solver=None,
+        geometry_checker=None,
+        **mutation_parameters,
+    ):
+        """
+        Queues a job that mutates every genome of {parents} as mutate() would and evaluates the offspring
+        as evaluate_population(offspring, prescreen=prescreen, load_cases=load_cases, solver=solver,
+        geometry_checker=geometry_checker) would,
+        all in one worker. Returns the job's task index, which collect_breed() returns with its offspring.
+        """
+        task_index = self.__next_breed_task_index
+        self.__next_breed_task_index += 1
+
+        if rng is not None:
+            mutation_parameters = {**mutation_parameters, "rng": rng}
+
+        shared_parents = SharedArrays(pack_population(parents))
+        self.__breed_jobs[task_index] = shared_parents
+        self.__task_queue.put(
+            (
+                "breed",
+                task_index,
+                shared_parents.name,
+                shared_parents.layout,
+                0,
+                len(parents),
+                {
+                    "mutation": mutation_parameters,
+                    "evaluation": {
+                        "prescreen": prescreen,
+                        "load_cases": load_cases,
+                        "solver": solver,
+                        "geometry_checker": geometry_checker,
+                    },
+                },
+            )
+        )
+
+        return task_index
+
+    def collect_breed(self, timeout=None):
+        """
+        Waits up to {timeout} seconds (forever by default) for any submitted breeding job to finish,
+        raising a RuntimeError if a worker process died. Returns its (task index, offspring), the offspring having their assignment_fitness set, or None on timeout.
+        """
+        try:
+            task_index, error, shm_name, layout = self.__get_result(timeout)
+        except queue.Empty:
+            return None
+
+        self.__breed_jobs.pop(task_index).unlink()
+        if error is not None:
+            raise RuntimeError("Worker task failed:\n" + error)
+
+        shared_offspring = SharedArrays.attach(shm_name, layout)
+        views = shared_offspring.views()
+        offspring = unpack_population(views)
+        solves, solve_failures, prescreen_rejections, geometry_rejections = views["output_counters"].tolist()
+        del views
+        shared_offspring.unlink()
+
+        # Solves happen in the workers, but are counted here so they show up in this process
+        Genome.solve_count += solves
+        Genome.solve_failure_count += solve_failures
+        Genome.prescreen_rejection_count += prescreen_rejections
+        Genome.geometry_rejection_count += geometry_rejections
+
+        return task_index, offspring